@@ -9,6 +9,7 @@ export const endpoints = {
     services: '/services/',
     login: '/o/token/',
     current_user: '/users/current-user/',
+    logout: '/users/logout/',
     register: '/users/',
     bookings: '/bookings/',
     // Thêm endpoint thống kê nếu sau này dùng
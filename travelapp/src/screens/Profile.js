@@ -1,6 +1,7 @@
 import AsyncStorage from '@react-native-async-storage/async-storage';
 import { useContext } from 'react';
 import { Alert, Image, StyleSheet, Text, TouchableOpacity, View } from 'react-native';
+import { authApi, endpoints } from '../api/APIs';
 import { MyUserContext } from '../context/MyUserContext';
 
 const Profile = ({ navigation }) => {
@@ -18,6 +19,13 @@ const Profile = ({ navigation }) => {
                 { 
                     text: "Đồng ý", 
                     onPress: async () => {
+                        try {
+                            // Thu hồi token trên server (token bị xóa khỏi cache xác thực ngay)
+                            const token = await AsyncStorage.getItem("access-token");
+                            if (token) await authApi(token).post(endpoints['logout']);
+                        } catch (ex) {
+                            console.error(ex);
+                        }
                         await AsyncStorage.removeItem("access-token");
                         dispatch({ type: "logout" });
                         navigation.navigate("Login");
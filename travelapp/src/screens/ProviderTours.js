@@ -19,7 +19,10 @@ const ProviderTours = ({ navigation }) => {
             // Gọi API lấy danh sách services
             // Lưu ý: Nếu Backend đã lọc sẵn theo user thì tốt. 
             // Nếu không, ta lọc client-side như bên dưới:
-            const res = await API.get(endpoints['services']);
+            // Danh sách mặc định là bản gọn (không có description, provider): chọn thêm field cho màn sửa tour
+            const res = await API.get(endpoints['services'], {
+                params: { fields: 'id,name,description,price,location,start_date,image,category,provider' }
+            });
             const allTours = res.data.results || res.data;
             
             // 2. Lọc thông minh (Fix lỗi không hiện tour)
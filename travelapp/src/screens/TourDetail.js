@@ -37,7 +37,7 @@ const TourDetail = ({ route, navigation }) => {
 
             try {
                 const resComments = await API.get(`${endpoints.services}${tourId}/comments/`);
-                setComments(resComments.data);
+                setComments(resComments.data.results || resComments.data);
             } catch (ex) {
                 console.log("Lỗi tải Comments:", ex);
             }
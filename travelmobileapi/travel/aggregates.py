@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast
+
+from .cache import SERVICES, bump_version, get_versions
+from .models import Booking, Like, Rating, TravelService
+
+
+# Các cột thống kê lưu sẵn trên TravelService (rating_sum, rating_count,
+# avg_rating, booking_count, like_count) được cập nhật tăng dần trong cùng transaction
+# với thao tác gốc, để API danh sách không phải GROUP BY mỗi lần gọi.
+# booking_count là số đơn CONFIRMED (không tính đơn PENDING đang giữ chỗ), được cộng/trừ khi đơn
+# vào/ra trạng thái CONFIRMED cùng bảng tổng hợp doanh thu (travel/rollups.py),
+# like_count khi thích / bỏ thích trong travel/likes.py.
+
+def apply_rating(service_id, new_rate, old_rate=None):
+    """Cộng dồn một lượt đánh giá mới (hoặc sửa điểm của lượt cũ)"""
+    if old_rate is None:
+        changes = {'rating_sum': F('rating_sum') + new_rate, 'rating_count': F('rating_count') + 1}
+    else:
+        changes = {'rating_sum': F('rating_sum') + (new_rate - old_rate)}
+
+    services = TravelService.objects.filter(pk=service_id)
+    services.update(**changes)
+    # Tính lại điểm trung bình bằng câu UPDATE thứ hai để đọc được giá trị tổng mới
+    services.filter(rating_count__gt=0).update(
+        avg_rating=Cast(F('rating_sum'), FloatField()) / F('rating_count')
+    )
+    bump_version(SERVICES)
+
+
+def apply_booking(service_id, delta):
+    """Cộng (+1) / trừ (-1) số đơn CONFIRMED của dịch vụ"""
+    TravelService.objects.filter(pk=service_id).update(booking_count=F('booking_count') + delta)
+    bump_version(SERVICES)
+
+
+def rating_histogram(service_id):
+    """Số lượt đánh giá theo từng mức sao {1: .., 5: ..}, cache theo phiên bản dữ liệu dịch vụ"""
+    key = f'travel:histogram:{service_id}:{get_versions([SERVICES])[0]}'
+    histogram = cache.get(key)
+    if histogram is None:
+        counts = dict(Rating.objects.filter(service_id=service_id, active=True)
+                      .values('rate').annotate(count=Count('id')).values_list('rate', 'count'))
+        histogram = {star: counts.get(star, 0) for star in range(1, 6)}
+        cache.set(key, histogram, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+    return histogram
+
+
+def rebuild_service_aggregates(queryset=None, batch_size=1000):
+    """Tính lại toàn bộ cột thống kê từ bảng Rating, Booking và Like, trả về số dịch vụ đã cập nhật"""
+    if queryset is None:
+        queryset = TravelService.objects.all()
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+
+    for i in range(0, len(ids), batch_size):
+        _rebuild_batch(ids[i:i + batch_size])
+    bump_version(SERVICES)
+    return len(ids)
+
+
+def _rebuild_batch(ids):
+    # Các truy vấn GROUP BY riêng biệt để tránh nhân bản dòng khi JOIN nhiều quan hệ
+    ratings = {
+        # Đánh giá bị ẩn (active=False) không tính, giống biểu đồ số sao và danh sách bình luận
+        r['service']: r for r in Rating.objects.filter(service__in=ids, active=True)
+        .values('service').annotate(total=Sum('rate'), count=Count('id'))
+    }
+    bookings = dict(
+        Booking.objects.filter(service__in=ids, status=Booking.Status.CONFIRMED)
+        .values('service').annotate(count=Count('id')).values_list('service', 'count')
+    )
+    likes = dict(
+        Like.objects.filter(service__in=ids, active=True)
+        .values('service').annotate(count=Count('id')).values_list('service', 'count')
+    )
+
+    services = []
+    for service_id in ids:
+        rating = ratings.get(service_id, {'total': 0, 'count': 0})
+        services.append(TravelService(
+            id=service_id,
+            rating_sum=rating['total'],
+            rating_count=rating['count'],
+            avg_rating=rating['total'] / rating['count'] if rating['count'] else 0,
+            booking_count=bookings.get(service_id, 0),
+            like_count=likes.get(service_id, 0),
+        ))
+
+    TravelService.objects.bulk_update(
+        services, ['rating_sum', 'rating_count', 'avg_rating', 'booking_count', 'like_count']
+    )
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class TravelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'travel' # <--- Quan trọng
\ No newline at end of file
+    name = 'travel' # <--- Quan trọng
+
+    def ready(self):
+        from . import signals  # noqa: F401  Đăng ký signal (đồng bộ chỉ mục tìm kiếm...)
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import async_views
+
+# Bản async (ASGI) của các API đọc được gọi nhiều nhất, xem travel/async_views.py
+urlpatterns = [
+    path('categories/', async_views.categories),
+    path('services/', async_views.services),
+    path('services/<int:pk>/', async_views.service_detail),
+    path('services/<int:pk>/comments/', async_views.comments),
+    path('services/<int:pk>/overview/', async_views.service_overview),
+    path('users/current-user/', async_views.current_user),
+]
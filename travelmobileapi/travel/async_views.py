@@ -0,0 +1,243 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .aggregates import rating_histogram
+from .authentication import CachedOAuth2Authentication
+from .cache import CATEGORIES, SERVICES, aget_versions, etag_matches, make_etag, response_cache_key
+from .filters import filter_services
+from .likes import liked_queryset, mark_liked
+from .metrics import timed
+from .models import Category, Rating, TravelService
+from .paginators import CommentCursorPagination, ServiceCursorPagination
+from .renderers import ORJSONRenderer
+from .search import ServiceSearchFilter
+from .serializers import (
+    CategorySerializer, RatingSerializer, TravelServiceListSerializer, TravelServiceSerializer, UserSerializer,
+    load_only,
+)
+
+# Đường đọc async (ASGI) cho các API được gọi nhiều nhất, cùng định dạng phản hồi với bản DRF
+# trong views.py, mount dưới /async/ (xem travel/async_urls.py):
+# - Truy vấn dùng async ORM (aget, acount, async for) -> chờ CSDL không giữ worker
+# - Các phần độc lập của 1 request (chi tiết + bình luận + thống kê sao) chạy song song
+# - Serializer chỉ đọc dữ liệu đã nạp sẵn (select_related), không truy vấn thêm trong event loop
+# Chạy bằng uvicorn: uvicorn travelmobileapi.asgi:application
+
+JSON = 'application/json'
+PAGE_SIZE = settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+ORDERING_FIELDS = ['price', 'created_date', 'avg_rating', 'booking_count']
+
+
+def render(data, status=200):
+    return HttpResponse(ORJSONRenderer().render(data), status=status, content_type=JSON)
+
+
+def api_view(view):
+    """Chỉ nhận GET, trả lỗi DRF (ValidationError, NotFound...) dưới dạng JSON như view đồng bộ"""
+    @require_GET
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as e:
+            return render(e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}, e.status_code)
+    return wrapper
+
+
+async def cached(request, namespaces, build, personalize=None):
+    """
+    Cache phản hồi theo phiên bản dữ liệu + ETag/304, giống VersionedCacheMixin.
+    personalize: hàm async thêm phần riêng của user vào dữ liệu cache chung, như VersionedCacheMixin.personalize
+    """
+    versions = await aget_versions(namespaces)
+    key = response_cache_key(request, request.GET, JSON, versions)
+    entry = await cache.aget(key)
+    if entry is None:
+        data = await build()
+        entry = (make_etag(data, JSON), data)
+        await cache.aset(key, entry, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+    etag, data = entry
+    if personalize is not None:
+        data, extra = await personalize(data)
+        if extra:
+            etag = make_etag([etag, extra])
+    response = HttpResponse(status=304) if etag_matches(request, etag) else render(data)
+    response['ETag'] = etag
+    return response
+
+
+async def with_is_liked(request, data, serializer_class):
+    """is_liked của user đang đăng nhập (1 câu IN cho cả trang), giống TravelServiceViewSet.personalize"""
+    selected = serializer_class.selected_fields(request.GET)
+    if selected is not None and not {'id', 'is_liked'} <= selected:
+        return data, None
+    result = await CachedOAuth2Authentication().aauthenticate(request)
+    liked = set()
+    if result is not None:
+        liked = {service_id async for service_id in liked_queryset(result[0], data)}
+    return mark_liked(data, liked), sorted(liked)
+
+
+async def run_concurrently(*funcs):
+    """
+    Chạy song song các hàm đồng bộ có truy vấn CSDL, mỗi hàm ở 1 thread với kết nối riêng.
+    Async ORM của Django đưa mọi truy vấn trong cùng request về 1 thread nên asyncio.gather
+    các câu aget()/acount() vẫn chạy lần lượt; ở đây dùng thread_sensitive=False để chạy song song thật.
+    """
+    def isolated(func):
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return await asyncio.gather(*[sync_to_async(isolated, thread_sensitive=False)(func) for func in funcs])
+
+
+async def page_number(request, queryset, serialize):
+    """Phân trang ?page= giống PageNumberPagination của DRF: {count, next, previous, results}"""
+    try:
+        page = int(request.GET.get('page', 1))
+        if page < 1:
+            raise ValueError
+    except ValueError:
+        raise NotFound("Trang không hợp lệ.")
+
+    count = await queryset.acount()
+    rows = [row async for row in queryset[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]]
+    if not rows and page != 1:
+        raise NotFound("Trang không hợp lệ.")
+
+    url = request.build_absolute_uri()
+    if page == 1:
+        previous = None
+    elif page == 2:
+        previous = remove_query_param(url, 'page')
+    else:
+        previous = replace_query_param(url, 'page', page - 1)
+    return {
+        'count': count,
+        'next': replace_query_param(url, 'page', page + 1) if page * PAGE_SIZE < count else None,
+        'previous': previous,
+        'results': serialize(rows),
+    }
+
+
+@api_view
+async def categories(request):
+    async def build():
+        queryset = Category.objects.filter(active=True).order_by('id')
+        return await page_number(request, queryset, lambda rows: timed(CategorySerializer(rows, many=True)).data)
+    return await cached(request, [CATEGORIES], build)
+
+
+@api_view
+async def services(request):
+    # Giống TravelServiceViewSet.list: bản gọn, ?fields=... chọn field từ bản đầy đủ
+    serializer_class = TravelServiceSerializer if 'fields' in request.GET else TravelServiceListSerializer
+
+    async def build():
+        drf_request = Request(request)
+        queryset = filter_services(TravelService.objects.filter(active=True), request.GET)
+        queryset = ServiceSearchFilter().filter_queryset(drf_request, queryset, None)
+        queryset = load_only(queryset, serializer_class, request.GET)
+        context = {'request': drf_request}
+
+        if 'cursor' in request.GET or request.GET.get('pagination') == 'cursor':
+            paginator = ServiceCursorPagination()
+            page = await paginator.apaginate_queryset(queryset, drf_request)
+            return {'next': paginator.get_next_link(),
+                    'results': timed(serializer_class(page, many=True, context=context)).data}
+
+        ordering = request.GET.get('ordering', '').split(',')[0].strip()
+        if ordering.lstrip('-') in ORDERING_FIELDS or (
+                ordering.lstrip('-') == 'distance' and 'distance' in queryset.query.annotations):
+            queryset = queryset.order_by(ordering, 'id')
+        elif not queryset.ordered:
+            queryset = queryset.order_by('id')
+        return await page_number(request, queryset,
+                                 lambda rows: timed(serializer_class(rows, many=True, context=context)).data)
+    return await cached(request, [SERVICES], build,
+                        lambda data: with_is_liked(request, data, serializer_class))
+
+
+async def get_service(pk):
+    try:
+        return await TravelService.objects.select_related('category').aget(pk=pk, active=True)
+    except TravelService.DoesNotExist:
+        raise NotFound("Không tìm thấy.")
+
+
+@api_view
+async def service_detail(request, pk):
+    async def build():
+        service = await get_service(pk)
+        return timed(TravelServiceSerializer(service, context={'request': Request(request)})).data
+    return await cached(request, [SERVICES], build,
+                        lambda data: with_is_liked(request, data, TravelServiceSerializer))
+
+
+def comments_page(request, service_id):
+    paginator = CommentCursorPagination()
+    ratings = Rating.objects.filter(service_id=service_id, active=True).select_related('user')
+    page = paginator.paginate_queryset(ratings, Request(request))
+    return {'next': paginator.get_next_link(), 'results': timed(RatingSerializer(page, many=True)).data}
+
+
+@api_view
+async def comments(request, pk):
+    # Không cache toàn trang bình luận (giống bản đồng bộ), thống kê sao đã có cache riêng
+    if not await TravelService.objects.filter(pk=pk, active=True).aexists():
+        raise NotFound("Không tìm thấy.")
+    if 'cursor' in request.GET:
+        page, = await run_concurrently(lambda: comments_page(request, pk))
+        return render(page)
+
+    page, histogram = await run_concurrently(
+        lambda: comments_page(request, pk),
+        lambda: rating_histogram(pk),
+    )
+    return render({**page, 'histogram': histogram})
+
+
+@api_view
+async def service_overview(request, pk):
+    """
+    Màn TourDetail trong 1 request: chi tiết dịch vụ + trang bình luận đầu + thống kê sao,
+    3 phần chạy song song nên thời gian chờ ≈ phần chậm nhất thay vì tổng cả 3.
+    """
+    async def build():
+        service, page, histogram = await run_concurrently(
+            lambda: TravelService.objects.select_related('category').filter(pk=pk, active=True).first(),
+            lambda: comments_page(request, pk),
+            lambda: rating_histogram(pk),
+        )
+        if service is None:
+            raise NotFound("Không tìm thấy.")
+        return {
+            'service': timed(TravelServiceSerializer(service, context={'request': Request(request)})).data,
+            'comments': page,
+            'histogram': histogram,
+        }
+
+    async def personalize(data):
+        service, extra = await with_is_liked(request, data['service'], TravelServiceSerializer)
+        return {**data, 'service': service}, extra
+    return await cached(request, [SERVICES], build, personalize)
+
+
+@api_view
+async def current_user(request):
+    result = await CachedOAuth2Authentication().aauthenticate(request)
+    if result is None:
+        return render({'detail': "Thông tin xác thực không được cung cấp."}, 401)
+    return render(timed(UserSerializer(result[0])).data)
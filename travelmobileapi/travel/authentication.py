@@ -0,0 +1,64 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+
+# Cache kết quả xác thực access token -> (user, token) để các request liên tục của app
+# (current-user, bookings...) không phải SELECT oauth2_provider_accesstoken JOIN user mỗi lần.
+# Khóa là sha256 của token (giống cột token_checksum của django-oauth-toolkit),
+# thời gian cache không vượt quá lúc token hết hạn và bị xóa ngay khi token bị thu hồi / user thay đổi.
+TOKEN_KEY = 'travel:token:{}'
+
+
+def token_checksum(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def bearer_token(request):
+    auth = request.headers.get('Authorization', '').split()
+    if len(auth) == 2 and auth[0].lower() == 'bearer':
+        return auth[1]
+    return None
+
+
+def forget_tokens(checksums):
+    """Xóa cache ngay và xóa lại sau khi commit (tránh request khác kịp cache bản cũ trước lúc commit)"""
+    keys = [TOKEN_KEY.format(checksum) for checksum in checksums]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    def authenticate(self, request):
+        token = bearer_token(request)
+        if token is None:
+            # Token gửi qua body / query string: để oauthlib xử lý như cũ
+            return super().authenticate(request)
+
+        key = TOKEN_KEY.format(token_checksum(token))
+        access_token = cache.get(key)
+        if access_token is not None and not access_token.is_expired():
+            return access_token.user, access_token
+
+        result = super().authenticate(request)
+        if result is not None:
+            _, access_token = result
+            timeout = min(getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300),
+                          int((access_token.expires - timezone.now()).total_seconds()))
+            if timeout > 0:
+                cache.set(key, access_token, timeout)
+        return result
+
+    async def aauthenticate(self, request):
+        """Cho view async (travel/async_views.py): token có trong cache thì không cần luồng đồng bộ"""
+        token = bearer_token(request)
+        if token is not None:
+            access_token = await cache.aget(TOKEN_KEY.format(token_checksum(token)))
+            if access_token is not None and not access_token.is_expired():
+                return access_token.user, access_token
+        return await sync_to_async(self.authenticate)(request)
@@ -0,0 +1,122 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .renderers import dumps
+
+# Cache phản hồi GET theo "phiên bản" dữ liệu: mỗi nhóm dữ liệu (services, categories)
+# có một bộ đếm trong cache, tăng lên mỗi khi dữ liệu thay đổi (save, rate, book, cancel).
+# Khóa cache chứa số phiên bản nên khi bộ đếm tăng, mọi bản cache cũ tự động hết hiệu lực.
+SERVICES = 'services'
+CATEGORIES = 'categories'
+
+VERSION_KEY = 'travel:version:{}'
+
+
+def get_versions(namespaces):
+    keys = [VERSION_KEY.format(ns) for ns in namespaces]
+    versions = cache.get_many(keys)
+    missing = {key: 1 for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(namespaces):
+    # Bản async của get_versions cho các view ASGI
+    keys = [VERSION_KEY.format(ns) for ns in namespaces]
+    versions = await cache.aget_many(keys)
+    missing = {key: 1 for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def response_cache_key(request, params, media_type, versions):
+    query = '&'.join(sorted(f'{k}={v}' for k, values in params.lists() for v in values))
+    raw = f'{request.get_host()}{request.path}?{query}|{media_type}|{versions}'
+    return 'travel:response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _incr(namespace):
+    key = VERSION_KEY.format(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:  # Khóa chưa tồn tại (cache mới khởi động / đã bị xóa)
+        cache.set(key, 2, timeout=None)
+
+
+def bump_version(*namespaces):
+    """Tăng phiên bản sau khi transaction commit, tránh cache lại dữ liệu chưa commit"""
+    for namespace in namespaces:
+        transaction.on_commit(lambda ns=namespace: _incr(ns))
+
+
+def make_etag(data, media_type=''):
+    raw = dumps(data, sort_keys=True) + media_type.encode()
+    return '"%s"' % hashlib.sha1(raw).hexdigest()
+
+
+def etag_matches(request, etag):
+    # So sánh yếu: phản hồi nén gửi ETag dạng W/"..." (xem travel/compression.py), client gửi lại nguyên dạng đó
+    header = request.headers.get('If-None-Match', '')
+    return etag in [tag.strip().removeprefix('W/') for tag in header.split(',')] or header.strip() == '*'
+
+
+class VersionedCacheMixin:
+    """
+    Cache kết quả list/retrieve của ViewSet theo phiên bản dữ liệu + ETag.
+    Client gửi lại If-None-Match với ETag cũ sẽ nhận 304 (không có body).
+    """
+    cache_namespaces = [SERVICES]
+    cached_actions = ['list', 'retrieve']
+
+    def get_cache_key(self, request, versions):
+        return response_cache_key(request, request.query_params, request.accepted_media_type, versions)
+
+    def cached_response(self, request, render):
+        versions = get_versions(self.cache_namespaces)
+        key = self.get_cache_key(request, versions)
+        cached = cache.get(key)
+        if cached is None:
+            response = render()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = (make_etag(response.data, request.accepted_media_type), response.data)
+            cache.set(key, cached, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+        etag, data = cached
+        data, extra = self.personalize(request, data)
+        if extra:
+            etag = make_etag([etag, extra])
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
+
+    def personalize(self, request, data):
+        """
+        Thêm phần riêng của user đang đăng nhập vào dữ liệu cache chung (vd is_liked).
+        Trả về (data, extra): extra khác rỗng được ghép vào ETag để mỗi user có ETag riêng.
+        """
+        return data, None
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.cached_actions:
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(request, lambda: super(VersionedCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.cached_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self.cached_response(
+            request, lambda: super(VersionedCacheMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,89 @@
+import brotli
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+# Nén phản hồi theo Accept-Encoding của client: br (brotli) nếu client nhận, không thì gzip.
+# Chỉ nén phản hồi lớn (danh sách, thống kê, file xuất CSV / NDJSON dạng stream),
+# phản hồi nhỏ hơn COMPRESSION_MIN_BYTES gửi nguyên vì nén không lợi được bao nhiêu.
+# Brotli mức 4: nén nhỏ hơn gzip mức 6 mà vẫn nhanh (mức 11 mặc định quá chậm cho phản hồi động).
+
+
+def min_bytes():
+    return getattr(settings, 'COMPRESSION_MIN_BYTES', 1024)
+
+
+def brotli_quality():
+    return getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+
+
+def _quality(params):
+    """Giá trị q của 1 mục Accept-Encoding; thiếu hoặc không đọc được (vd `q=abc`) coi như q=1"""
+    for param in params.split(';'):
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                return float(value)
+            except ValueError:
+                return 1.0
+    return 1.0
+
+
+def accepts(request, coding):
+    """Client có nhận `coding` không (bỏ qua mục có q=0, vd `gzip;q=0`)"""
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = item.partition(';')
+        if name.strip().lower() in (coding, '*'):
+            return _quality(params) > 0
+    return False
+
+
+def _brotli_sequence(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        # flush sau mỗi lô để client nhận được dữ liệu ngay (NDJSON / CSV đọc dần)
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _abrotli_sequence(chunks, quality):
+    compressor = brotli.Compressor(quality=quality)
+    async for chunk in chunks:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < min_bytes():
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+        if not accepts(request, 'br'):
+            if not accepts(request, 'gzip'):
+                patch_vary_headers(response, ('Accept-Encoding',))
+                return response
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            sequence = _abrotli_sequence if response.is_async else _brotli_sequence
+            response.streaming_content = sequence(response.streaming_content, brotli_quality())
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=brotli_quality())
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # Giống GZipMiddleware: nội dung đã đổi nên ETag mạnh chuyển thành ETag yếu
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Value, When
+from django.db.models.functions import TruncMonth
+from rest_framework.exceptions import ValidationError
+
+# Số dịch vụ theo từng giá trị bộ lọc (danh mục, khoảng giá, tháng khởi hành) cho màn Home.
+# Cả 3 nhóm tính từ MỘT câu GROUP BY (danh mục, khoảng giá, tháng) trên danh sách đã lọc
+# rồi cộng dồn trong Python, thay vì 1 câu COUNT cho mỗi giá trị.
+
+MAX_PRICE_BUCKETS = 10
+
+
+def price_bounds(params):
+    """Các mốc giá chia khoảng: ?price_buckets=1000000,3000000 hoặc SERVICE_PRICE_BUCKETS"""
+    value = params.get('price_buckets')
+    if not value:
+        return list(getattr(settings, 'SERVICE_PRICE_BUCKETS', [1000000, 3000000, 5000000, 10000000]))
+    try:
+        bounds = sorted({int(v) for v in value.split(',') if v.strip()})
+    except ValueError:
+        raise ValidationError({'price_buckets': "Các mốc giá phải là số nguyên, cách nhau bởi dấu phẩy"})
+    if not bounds or len(bounds) > MAX_PRICE_BUCKETS or bounds[0] < 0:
+        raise ValidationError({'price_buckets': f"Cần từ 1 đến {MAX_PRICE_BUCKETS} mốc giá không âm"})
+    return bounds
+
+
+def service_facets(queryset, bounds):
+    """
+    Khoảng giá thứ i là (mốc i-1, mốc i], khớp với bộ lọc min_price / max_price (tính cả 2 đầu):
+    mỗi khoảng trả về sẵn min_price / max_price để app gửi lại làm bộ lọc.
+    """
+    bucket = Case(*[When(price__lte=bound, then=Value(i)) for i, bound in enumerate(bounds)],
+                  default=Value(len(bounds)), output_field=IntegerField())
+    rows = (queryset.order_by()
+            .values('category_id', 'category__name', bucket=bucket, month=TruncMonth('start_date'))
+            .annotate(count=Count('id')))
+
+    categories, prices, months = {}, [0] * (len(bounds) + 1), {}
+    for row in rows:
+        category = categories.setdefault(row['category_id'], {'id': row['category_id'],
+                                                             'name': row['category__name'], 'count': 0})
+        category['count'] += row['count']
+        prices[row['bucket']] += row['count']
+        key = (row['month'].year, row['month'].month)
+        months[key] = months.get(key, 0) + row['count']
+
+    lows = [None] + [bound + 1 for bound in bounds]  # Giá là số nguyên (VNĐ)
+    highs = bounds + [None]
+    return {
+        'count': sum(prices),
+        'categories': sorted(categories.values(), key=lambda c: (-c['count'], c['id'])),
+        'prices': [{'min_price': low, 'max_price': high, 'count': count}
+                   for low, high, count in zip(lows, highs, prices)],
+        'months': [{'year': year, 'month': month, 'count': count}
+                   for (year, month), count in sorted(months.items())],
+    }
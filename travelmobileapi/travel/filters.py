@@ -0,0 +1,158 @@
+import math
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .geo import filter_nearby
+from .inventory import MAX_STAY_NIGHTS, available_services
+from .models import Booking
+
+
+# Bộ lọc danh sách dịch vụ theo query params (category_id, location, min_price,
+# max_price, month, year, start_from, start_to, lat + lng + radius, check_in + check_out + quantity).
+# Mọi điều kiện đều so sánh trực tiếp trên cột (không bọc hàm như start_date__month)
+# để CSDL dùng được index, xem các index trong TravelService.Meta.
+
+DEFAULT_RADIUS_KM = 20
+MAX_RADIUS_KM = 200
+
+
+def _parse_int(params, name, low=None, high=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: "Giá trị phải là số nguyên"})
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ValidationError({name: f"Giá trị phải nằm trong khoảng {low} - {high}"})
+    return value
+
+
+def _parse_float(params, name, low=None, high=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = float(value)
+    except ValueError:
+        raise ValidationError({name: "Giá trị phải là số"})
+    if not math.isfinite(value) or (low is not None and value < low) or (high is not None and value > high):
+        raise ValidationError({name: f"Giá trị phải nằm trong khoảng {low} - {high}"})
+    return value
+
+
+def _parse_date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: "Ngày phải có dạng YYYY-MM-DD"})
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def month_range(month, year=None, today=None):
+    """
+    Trả về khoảng [đầu tháng, đầu tháng sau) của tháng cần lọc.
+    Không truyền năm -> lấy lần gần nhất sắp tới của tháng đó (tháng đã qua thì sang năm sau).
+    """
+    today = today or timezone.localdate()
+    if year is None:
+        year = today.year if month >= today.month else today.year + 1
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return _start_of_day(start), _start_of_day(end)
+
+
+def parse_stay(params):
+    """Khoảng ngày [check_in, check_out) trong query params, (None, None) nếu không lọc theo ngày ở"""
+    check_in = _parse_date(params, 'check_in')
+    check_out = _parse_date(params, 'check_out')
+    if check_in is None and check_out is None:
+        return None, None
+    if check_in is None or check_out is None:
+        raise ValidationError({'check_in' if check_in is None else 'check_out': "Cần gửi đủ cả check_in và check_out"})
+    if not 0 < (check_out - check_in).days <= MAX_STAY_NIGHTS:
+        raise ValidationError({'check_out': f"check_out phải sau check_in từ 1 đến {MAX_STAY_NIGHTS} đêm"})
+    return check_in, check_out
+
+
+def filter_services(queryset, params):
+    # Lọc theo danh mục (Tour/Hotel/Ve)
+    cate_id = _parse_int(params, 'category_id')
+    if cate_id is not None:
+        queryset = queryset.filter(category_id=cate_id)
+
+    # Lọc theo địa điểm (gần đúng) - tìm kiếm có xếp hạng dùng ?search=
+    location = params.get('location')
+    if location:
+        queryset = queryset.filter(location__icontains=location)
+
+    # Lọc theo khoảng giá (Min - Max)
+    min_price = _parse_int(params, 'min_price', low=0)
+    max_price = _parse_int(params, 'max_price', low=0)
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+
+    # Lọc theo tháng khởi hành -> khoảng ngày [đầu tháng, đầu tháng sau)
+    month = _parse_int(params, 'month', low=1, high=12)
+    year = _parse_int(params, 'year', low=1970, high=9999)
+    if month is not None:
+        start, end = month_range(month, year)
+        queryset = queryset.filter(start_date__gte=start, start_date__lt=end)
+    elif year is not None:
+        queryset = queryset.filter(start_date__gte=_start_of_day(date(year, 1, 1)),
+                                   start_date__lt=_start_of_day(date(year + 1, 1, 1)))
+
+    # Lọc theo khoảng ngày khởi hành (tính cả ngày start_to)
+    start_from = _parse_date(params, 'start_from')
+    start_to = _parse_date(params, 'start_to')
+    if start_from:
+        queryset = queryset.filter(start_date__gte=_start_of_day(start_from))
+    if start_to:
+        queryset = queryset.filter(start_date__lt=_start_of_day(start_to + timedelta(days=1)))
+
+    # Còn ít nhất `quantity` chỗ ở mọi đêm trong [check_in, check_out) -> chỉ dịch vụ bán theo đêm
+    check_in, check_out = parse_stay(params)
+    if check_in:
+        quantity = _parse_int(params, 'quantity', low=1, high=1000) or 1
+        queryset = queryset.filter(nightly=True, id__in=available_services(check_in, check_out, quantity))
+
+    # Dịch vụ gần 1 điểm: lọc thô theo ô lưới rồi tính khoảng cách haversine (km), mặc định gần nhất trước
+    lat = _parse_float(params, 'lat', low=-90, high=90)
+    lng = _parse_float(params, 'lng', low=-180, high=180)
+    if (lat is None) != (lng is None):
+        raise ValidationError({'lat' if lat is None else 'lng': "Cần gửi đủ cả lat và lng"})
+    if lat is not None:
+        radius = _parse_float(params, 'radius', low=0.1, high=MAX_RADIUS_KM)
+        queryset = filter_nearby(queryset, lat, lng, DEFAULT_RADIUS_KM if radius is None else radius)
+        queryset = queryset.order_by('distance', 'id')
+
+    return queryset
+
+
+def filter_bookings(queryset, params):
+    """Lọc đơn theo ngày đặt (date_from, date_to tính cả ngày cuối) và trạng thái (status=A,B)"""
+    date_from = _parse_date(params, 'date_from')
+    date_to = _parse_date(params, 'date_to')
+    if date_from:
+        queryset = queryset.filter(created_date__gte=_start_of_day(date_from))
+    if date_to:
+        queryset = queryset.filter(created_date__lt=_start_of_day(date_to + timedelta(days=1)))
+
+    statuses = [s for s in params.get('status', '').upper().split(',') if s]
+    if statuses:
+        invalid = set(statuses) - set(Booking.Status.values)
+        if invalid:
+            raise ValidationError({'status': f"Trạng thái không hợp lệ: {', '.join(sorted(invalid))}"})
+        queryset = queryset.filter(status__in=statuses)
+    return queryset
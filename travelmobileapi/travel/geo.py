@@ -0,0 +1,86 @@
+import math
+
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+from rest_framework import filters
+
+# Tìm dịch vụ gần 1 điểm (?lat=&lng=&radius=) không cần PostGIS:
+# - Mặt cầu được chia lưới ô CELL_DEG x CELL_DEG độ (~11 km), mỗi dịch vụ lưu số ô `geo_cell`
+#   = hàng * COLUMNS + cột, có index -> các ô phủ vùng tìm kiếm nằm trên cùng 1 hàng là 1 khoảng
+#   số liên tiếp, nên lọc thô bằng vài điều kiện BETWEEN trên index thay vì quét cả bảng
+# - Chỉ các dòng trong những ô đó mới được tính khoảng cách haversine chính xác (km)
+# Đổi CELL_DEG thì phải tính lại geo_cell cho mọi dịch vụ.
+
+CELL_DEG = 0.1
+COLUMNS = round(360 / CELL_DEG)
+ROWS = round(180 / CELL_DEG)
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+
+
+def grid_cell(lat, lng):
+    """Số ô lưới chứa điểm (lat, lng), None nếu chưa có tọa độ"""
+    if lat is None or lng is None:
+        return None
+    row = min(int((lat + 90) // CELL_DEG), ROWS - 1)
+    col = int((lng + 180) // CELL_DEG) % COLUMNS
+    return row * COLUMNS + col
+
+
+def cell_ranges(lat, lng, radius_km):
+    """Các khoảng [ô đầu, ô cuối] phủ hình vuông bao quanh vòng tròn bán kính radius_km"""
+    dlat = radius_km / KM_PER_DEG_LAT
+    row_from = max(int((lat - dlat + 90) // CELL_DEG), 0)
+    row_to = min(int((lat + dlat + 90) // CELL_DEG), ROWS - 1)
+
+    # 1 độ kinh tuyến ngắn dần về 2 cực: tính theo vĩ độ xa xích đạo nhất của hình bao
+    widest = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+    if widest < 1e-6 or radius_km / (KM_PER_DEG_LAT * widest) >= 180:
+        cols = [(0, COLUMNS - 1)]  # Gần cực: lấy cả hàng
+    else:
+        dlng = radius_km / (KM_PER_DEG_LAT * widest)
+        col_from = int((lng - dlng + 180) // CELL_DEG)
+        col_to = int((lng + dlng + 180) // CELL_DEG)
+        if col_from < 0:  # Vượt kinh tuyến 180: tách thành 2 khoảng
+            cols = [(col_from + COLUMNS, COLUMNS - 1), (0, col_to)]
+        elif col_to >= COLUMNS:
+            cols = [(col_from, COLUMNS - 1), (0, col_to - COLUMNS)]
+        else:
+            cols = [(col_from, col_to)]
+
+    ranges = []
+    for start, end in sorted((row * COLUMNS + start, row * COLUMNS + end)
+                             for row in range(row_from, row_to + 1) for start, end in cols):
+        if ranges and start <= ranges[-1][1] + 1:  # Các hàng lấy trọn liền nhau gộp thành 1 khoảng
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def distance_km(lat, lng):
+    """Biểu thức SQL khoảng cách haversine (km) từ (lat, lng) tới tọa độ của dòng"""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = Radians('latitude'), Radians('longitude')
+    a = (Power(Sin((lat2 - Value(lat1)) / 2), 2)
+         + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin((lng2 - Value(lng1)) / 2), 2))
+    # Least: sai số làm tròn có thể đẩy sqrt(a) vượt 1 một chút, ASIN khi đó trả NULL/NaN
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Least(Sqrt(a), Value(1.0)), output_field=FloatField())
+
+
+def filter_nearby(queryset, lat, lng, radius_km):
+    """Lọc dịch vụ trong bán kính radius_km quanh (lat, lng), gắn thêm cột `distance` (km)"""
+    cells = Q()
+    for start, end in cell_ranges(lat, lng, radius_km):
+        cells |= Q(geo_cell__gte=start, geo_cell__lte=end)
+    return queryset.filter(cells).annotate(distance=distance_km(lat, lng)).filter(distance__lte=radius_km)
+
+
+class DistanceOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter cho phép ?ordering=distance khi queryset đã gắn cột distance (có gửi lat/lng)"""
+
+    def get_valid_fields(self, queryset, view, context={}):
+        fields = super().get_valid_fields(queryset, view, context)
+        if 'distance' not in queryset.query.annotations:
+            fields = [(name, label) for name, label in fields if name != 'distance']
+        return fields
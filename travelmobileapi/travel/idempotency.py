@@ -0,0 +1,104 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600))
+
+
+def make_fingerprint(request):
+    body = json.dumps(request.data, cls=JSONEncoder, sort_keys=True, default=str)
+    return hashlib.sha1(f'{request.method} {request.path} {body}'.encode()).hexdigest()
+
+
+def replay(record):
+    response = Response(record.response, status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Giành key bằng INSERT: unique (user, key) bảo đảm chỉ 1 request thắng.
+    Trả về (bản ghi, True) nếu giành được, (bản ghi đang có hoặc None, False) nếu không.
+    """
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(user=user, key=key, fingerprint=fingerprint), True
+        except IntegrityError:
+            existing = IdempotencyKey.objects.filter(user=user, key=key).first()
+            if existing is None or existing.created_date >= timezone.now() - key_ttl():
+                return existing, False
+            # Key đã hết hạn coi như chưa từng dùng
+            existing.delete()
+    return None, False
+
+
+def idempotent(view_method):
+    """
+    Decorator cho action POST: request có header Idempotency-Key chỉ được thực thi 1 lần.
+    - Gửi lại cùng key + cùng nội dung -> trả lại phản hồi đã lưu, không giữ chỗ / hoàn chỗ lần nữa
+    - Cùng key nhưng khác nội dung -> 422
+    - Request đầu tiên chưa xử lý xong -> 409, app thử lại sau
+    Phản hồi lỗi 5xx không được lưu để app có thể thử lại.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response({"error": f"{HEADER} quá dài"}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = make_fingerprint(request)
+        record, claimed = claim_key(request.user, key, fingerprint)
+        if not claimed:
+            if record is not None and record.fingerprint != fingerprint:
+                return Response({"error": f"{HEADER} đã được dùng cho một request khác"},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record is None or record.status_code is None:
+                return Response({"error": "Request đang được xử lý, vui lòng thử lại"},
+                                status=status.HTTP_409_CONFLICT)
+            return replay(record)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(batch_size=5000):
+    """Xóa key quá hạn theo lô (mỗi lô một câu DELETE theo id) để không khóa bảng lâu"""
+    cutoff = timezone.now() - key_ttl()
+    total = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(created_date__lt=cutoff)
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,127 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from PIL import Image, ImageOps
+
+from .cache import SERVICES, bump_version
+from .models import TravelService, User
+
+logger = logging.getLogger(__name__)
+
+# Ảnh thu nhỏ theo chiều lớn nhất (px), không phóng to ảnh nhỏ hơn
+VARIANTS = {
+    'thumb': 200,   # Ô vuông trong danh sách, avatar bình luận
+    'card': 640,    # Thẻ dịch vụ trên trang chủ
+    'full': 1280,   # Trang chi tiết
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# (model, trường ảnh, trường đánh dấu đã tạo ảnh thu nhỏ)
+SOURCES = {
+    'service': (TravelService, 'image', 'image_derived'),
+    'avatar': (User, 'avatar', 'avatar_derived'),
+}
+
+# Pillow nhả GIL khi giải mã / resize / nén nên thread pool tận dụng được nhiều nhân CPU.
+# Tạo ảnh ngay trong tiến trình web (dự án chưa có hàng đợi tác vụ như Celery)
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'IMAGE_WORKERS', 2),
+                               thread_name_prefix='image-derivatives')
+
+
+def derivative_name(name, variant, fmt):
+    """services/2025/01/halong.png -> services/2025/01/halong.card.webp (cùng thư mục với ảnh gốc)"""
+    root, _ = os.path.splitext(name)
+    return f'{root}.{variant}.{"jpg" if fmt == "jpeg" else fmt}'
+
+
+def render_derivatives(name):
+    """Đọc ảnh gốc trong storage, trả về {tên file: nội dung} của mọi kích thước x định dạng"""
+    with default_storage.open(name) as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+
+    files = {}
+    for variant, size in VARIANTS.items():
+        image = original.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for fmt, (pil_format, options) in FORMATS.items():
+            if pil_format == 'JPEG' or image.mode not in ('RGB', 'RGBA'):
+                out = image.convert('RGB')
+            else:
+                out = image
+            buffer = BytesIO()
+            out.save(buffer, pil_format, **options)
+            files[derivative_name(name, variant, fmt)] = buffer.getvalue()
+    return files
+
+
+def delete_derivatives(name):
+    for variant in VARIANTS:
+        for fmt in FORMATS:
+            default_storage.delete(derivative_name(name, variant, fmt))
+
+
+def generate_derivatives(source, pk):
+    """
+    Tạo ảnh thu nhỏ cho 1 dòng rồi đánh dấu bằng UPDATE có điều kiện trên tên ảnh:
+    nếu trong lúc xử lý người dùng đã tải ảnh khác lên thì không đánh dấu nhầm.
+    Trả về True nếu đã tạo ảnh.
+    """
+    model, field, derived_field = SOURCES[source]
+    row = model.objects.filter(pk=pk).values(field, derived_field).first()
+    if row is None or not row[field] or row[field] == row[derived_field]:
+        return False
+    name = row[field]
+
+    for derived_name, content in render_derivatives(name).items():
+        default_storage.delete(derived_name)  # Ghi đè, FileSystemStorage không tự thay file cũ
+        default_storage.save(derived_name, ContentFile(content))
+
+    updated = model.objects.filter(pk=pk, **{field: name}).update(**{derived_field: name})
+    if updated and row[derived_field]:
+        delete_derivatives(row[derived_field])  # Ảnh thu nhỏ của ảnh cũ không còn dùng
+    if updated and model is TravelService:
+        bump_version(SERVICES)
+    return bool(updated)
+
+
+def _run(source, pk):
+    close_old_connections()
+    try:
+        generate_derivatives(source, pk)
+    except Exception:
+        logger.exception("Không tạo được ảnh thu nhỏ cho %s %s", source, pk)
+    finally:
+        connection.close()  # Mỗi thread có kết nối CSDL riêng
+
+
+def schedule_derivatives(source, instance):
+    """Gọi sau khi lưu: nếu ảnh mới chưa có ảnh thu nhỏ thì giao cho thread pool (sau khi commit)"""
+    _, field, derived_field = SOURCES[source]
+    if getattr(instance, field) and getattr(instance, field).name != getattr(instance, derived_field):
+        pk = instance.pk
+        transaction.on_commit(lambda: _executor.submit(_run, source, pk))
+
+
+def srcset(image, derived):
+    """
+    {'thumb': {'webp': url, 'jpeg': url}, 'card': {...}, 'full': {...}}
+    Ảnh thu nhỏ chưa tạo xong thì mọi kích thước đều trỏ về ảnh gốc.
+    """
+    if not image:
+        return None
+    if image.name != derived:
+        return {variant: {fmt: image.url for fmt in FORMATS} for variant in VARIANTS}
+    return {
+        variant: {fmt: default_storage.url(derivative_name(image.name, variant, fmt)) for fmt in FORMATS}
+        for variant in VARIANTS
+    }
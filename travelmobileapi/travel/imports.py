@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import SERVICES, bump_version
+from .geo import grid_cell
+from .models import Category, TravelService
+from .search import index_services
+from .serializers import ServiceImportSerializer
+
+BATCH_SIZE = 500
+
+
+class ImportAborted(Exception):
+    """File hỏng giữa chừng (sai định dạng / mã hóa): các dòng hợp lệ trước dòng `row` đã được ghi"""
+
+    def __init__(self, row, reason, result):
+        super().__init__(f"Dòng {row}: {reason}")
+        self.row, self.reason, self.result = row, reason, result
+
+
+def max_rows():
+    return getattr(settings, 'SERVICE_IMPORT_MAX_ROWS', 10000)
+
+
+def read_rows(file, name=''):
+    """
+    Đọc dần từng dòng của file tải lên, không nạp cả file vào bộ nhớ:
+    - .csv: dòng đầu là tên cột (name, price, location, start_date, category_id...)
+    - .jsonl / .ndjson: mỗi dòng 1 object JSON
+    - .json: 1 mảng object (thư viện chuẩn không đọc dần được mảng JSON, file được đọc 1 lần)
+    """
+    name = name.lower()
+    if name.endswith('.json'):
+        rows = json.load(io.TextIOWrapper(file, encoding='utf-8-sig'))
+        if not isinstance(rows, list):
+            raise ValueError("File JSON phải là một mảng các dịch vụ")
+        yield from rows
+    elif name.endswith(('.jsonl', '.ndjson')):
+        for line in io.TextIOWrapper(file, encoding='utf-8-sig'):
+            if line.strip():
+                yield json.loads(line)
+    elif name.endswith('.csv'):
+        yield from csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    else:
+        raise ValueError("Chỉ hỗ trợ file .csv, .json, .jsonl")
+
+
+def _clean(row):
+    # Ô trống trong CSV coi như không nhập (để các cột không bắt buộc nhận giá trị mặc định)
+    if not isinstance(row, dict):
+        return row
+    return {key.strip(): value for key, value in row.items() if key and value not in ('', None)}
+
+
+def fill_created_ids(services):
+    """
+    MySQL không trả id sau bulk_create: tìm lại các dòng vừa ghi theo (nhà cung cấp, tên, created_date).
+    created_date (auto_now_add, tới micro giây) được gán lên từng object lúc bulk_create nên khóa này
+    không phụ thuộc vào dòng do request khác ghi xen vào; các dòng trùng khóa gán theo thứ tự id (thứ tự INSERT).
+    """
+    pending = {}
+    for service in services:
+        pending.setdefault((service.provider_id, service.name, service.created_date), []).append(service)
+    rows = TravelService.objects.filter(
+        provider_id__in={service.provider_id for service in services},
+        created_date__in={service.created_date for service in services},
+    ).order_by('id').values_list('id', 'provider_id', 'name', 'created_date')
+    for pk, *key in rows:
+        matches = pending.get(tuple(key))
+        if matches:
+            matches.pop(0).pk = pk
+
+
+def _save_batch(services):
+    if not services:
+        return 0
+    with transaction.atomic():
+        created = TravelService.objects.bulk_create(services)
+        if created[0].pk is None:
+            fill_created_ids(created)
+        # bulk_create không gọi signal post_save: tự đánh chỉ mục tìm kiếm và làm mới cache
+        index_services(created)
+        bump_version(SERVICES)
+    return len(created)
+
+
+def import_services(rows, provider, batch_size=BATCH_SIZE):
+    """
+    Kiểm tra từng dòng bằng ServiceImportSerializer, dòng hợp lệ được ghi bằng bulk_create theo lô
+    (mỗi lô 1 transaction), dòng lỗi bị bỏ qua và trả về kèm số thứ tự dòng.
+    Trả về {'created': số dịch vụ đã tạo, 'errors': [{'row': n, 'errors': {...}}]}.
+    Không đọc tiếp được file thì ghi nốt các dòng hợp lệ đã đọc rồi ném ImportAborted kèm số dòng hỏng.
+    """
+    context = {'category_ids': set(Category.objects.filter(active=True).values_list('id', flat=True))}
+    limit = max_rows()
+    created, errors, batch = 0, [], []
+    rows, number = iter(rows), 0
+
+    while True:
+        number += 1
+        try:
+            row = next(rows)
+        except StopIteration:
+            break
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            created += _save_batch(batch)
+            raise ImportAborted(number, e, {'created': created, 'errors': errors})
+
+        if number > limit:
+            errors.append({'row': number, 'errors': {'non_field_errors': [f"Mỗi lần nhập tối đa {limit} dòng"]}})
+            break
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'errors': {'non_field_errors': ["Mỗi dòng phải là một object"]}})
+            continue
+        serializer = ServiceImportSerializer(data=_clean(row), context=context)
+        if not serializer.is_valid():
+            errors.append({'row': number, 'errors': serializer.errors})
+            continue
+
+        data = serializer.validated_data
+        # bulk_create không gọi TravelService.save(): tự tính số chỗ còn lại và ô lưới tọa độ
+        batch.append(TravelService(**data, provider=provider,
+                                   slots_available=data.get('slots_total', TravelService._meta
+                                                            .get_field('slots_total').default),
+                                   geo_cell=grid_cell(data.get('latitude'), data.get('longitude'))))
+        if len(batch) >= batch_size:
+            created += _save_batch(batch)
+            batch = []
+
+    created += _save_batch(batch)
+    return {'created': created, 'errors': errors}
@@ -0,0 +1,212 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .cache import SERVICES, bump_version
+from .models import Booking, ServiceNight, TravelService
+
+
+class SoldOut(Exception):
+    pass
+
+
+class InvalidStay(Exception):
+    """Ngày nhận/trả phòng không hợp lệ với dịch vụ bán theo đêm"""
+
+
+# Giữ/hoàn chỗ bằng MỘT câu UPDATE có điều kiện thay vì SELECT ... FOR UPDATE rồi save():
+#   UPDATE travelservice SET slots_available = slots_available - n
+#   WHERE id = ? AND slots_available >= n
+# CSDL tự kiểm tra và trừ chỗ trong cùng một lệnh nên không thể bán vượt số chỗ,
+# và khóa dòng chỉ giữ từ câu UPDATE đến lúc commit (không giữ trong lúc chạy code Python).
+
+def reserve_slots(service_id, quantity):
+    """Trừ `quantity` chỗ nếu còn đủ, trả về True/False"""
+    updated = TravelService.objects.filter(pk=service_id, slots_available__gte=quantity).update(
+        slots_available=F('slots_available') - quantity,
+    )
+    if updated:
+        bump_version(SERVICES)
+    return updated == 1
+
+
+def release_slots(service_id, quantity):
+    """Hoàn lại `quantity` chỗ của các đơn đã hủy"""
+    TravelService.objects.filter(pk=service_id).update(slots_available=F('slots_available') + quantity)
+    bump_version(SERVICES)
+
+
+# Dịch vụ bán theo đêm: mỗi đêm là 1 dòng ServiceNight, giữ chỗ cho khoảng [check_in, check_out)
+# cũng là MỘT câu UPDATE có điều kiện trên cả khoảng ngày:
+#   UPDATE servicenight SET slots_available = slots_available - n
+#   WHERE service_id = ? AND date >= ? AND date < ? AND slots_available >= n
+# Số dòng được cập nhật phải bằng số đêm, thiếu đêm nào (hết chỗ / ngoài lịch bán) thì rollback cả khoảng.
+
+MAX_STAY_NIGHTS = 30
+
+
+def night_dates(first, last):
+    return [first + timedelta(days=i) for i in range((last - first).days)]
+
+
+def sync_nights(service):
+    """
+    Đồng bộ lịch bán theo đêm với start_date / end_date / slots_total của dịch vụ:
+    - Đổi slots_total: cộng/trừ phần chênh lệch cho mọi đêm, số chỗ đã bán giữ nguyên
+    - Đêm nằm ngoài khoảng mới mà chưa bán chỗ nào bị xóa, đêm còn thiếu được tạo thêm
+    """
+    if not service.nightly or not service.end_date:
+        return
+    first, last = timezone.localdate(service.start_date), timezone.localdate(service.end_date)
+    nights = ServiceNight.objects.filter(service=service)
+    with transaction.atomic():
+        nights.exclude(slots_total=service.slots_total).update(
+            slots_available=F('slots_available') + service.slots_total - F('slots_total'),
+            slots_total=service.slots_total,
+        )
+        nights.exclude(date__gte=first, date__lt=last).filter(slots_available=F('slots_total')).delete()
+        existing = set(nights.filter(date__gte=first, date__lt=last).values_list('date', flat=True))
+        ServiceNight.objects.bulk_create([
+            ServiceNight(service=service, date=day, slots_total=service.slots_total,
+                         slots_available=service.slots_total)
+            for day in night_dates(first, last) if day not in existing
+        ], ignore_conflicts=True)
+
+
+def check_stay(check_in, check_out):
+    """Số đêm của khoảng [check_in, check_out), ném InvalidStay nếu khoảng ngày không hợp lệ"""
+    if not isinstance(check_in, date) or not isinstance(check_out, date):
+        raise InvalidStay("Cần chọn ngày nhận phòng (check_in) và trả phòng (check_out)")
+    nights = (check_out - check_in).days
+    if nights < 1:
+        raise InvalidStay("Ngày trả phòng phải sau ngày nhận phòng")
+    if nights > MAX_STAY_NIGHTS:
+        raise InvalidStay(f"Mỗi đơn đặt tối đa {MAX_STAY_NIGHTS} đêm")
+    return nights
+
+
+def reserve_nights(service_id, check_in, check_out, quantity):
+    """Trừ `quantity` chỗ ở mọi đêm trong [check_in, check_out) nếu đêm nào cũng còn đủ, trả về True/False"""
+    nights = (check_out - check_in).days
+    with transaction.atomic():
+        updated = ServiceNight.objects.filter(
+            service_id=service_id, date__gte=check_in, date__lt=check_out, slots_available__gte=quantity,
+        ).update(slots_available=F('slots_available') - quantity)
+        if updated != nights:
+            transaction.set_rollback(True)  # Hoàn lại các đêm vừa bị trừ
+            return False
+    bump_version(SERVICES)
+    return True
+
+
+def release_nights(service_id, check_in, check_out, quantity):
+    """Hoàn lại `quantity` chỗ cho mọi đêm của các đơn đã hủy cùng khoảng ngày"""
+    ServiceNight.objects.filter(service_id=service_id, date__gte=check_in, date__lt=check_out).update(
+        slots_available=F('slots_available') + quantity,
+    )
+    bump_version(SERVICES)
+
+
+def release_booking(booking):
+    """Hoàn chỗ của 1 đơn vừa hủy (theo đêm hoặc theo số chỗ của dịch vụ)"""
+    if booking.check_in:
+        release_nights(booking.service_id, booking.check_in, booking.check_out, booking.quantity)
+    else:
+        release_slots(booking.service_id, booking.quantity)
+
+
+def available_services(check_in, check_out, quantity=1):
+    """
+    Id các dịch vụ còn ít nhất `quantity` chỗ ở MỌI đêm trong [check_in, check_out), dạng subquery:
+      SELECT service_id FROM servicenight WHERE date >= ? AND date < ? AND slots_available >= ?
+      GROUP BY service_id HAVING COUNT(*) = số đêm
+    """
+    nights = (check_out - check_in).days
+    return (ServiceNight.objects
+            .filter(date__gte=check_in, date__lt=check_out, slots_available__gte=quantity)
+            .values('service').annotate(nights=Count('id')).filter(nights=nights)
+            .values('service'))
+
+
+def create_booking(user, service_id, quantity, payment_method=Booking.PaymentMethod.CASH,
+                   check_in=None, check_out=None):
+    """
+    Tạo đơn PENDING và giữ chỗ. Ném TravelService.DoesNotExist nếu dịch vụ không tồn tại,
+    SoldOut nếu không còn đủ chỗ (đơn vừa tạo bị rollback).
+    Dịch vụ bán theo đêm cần check_in / check_out (InvalidStay nếu thiếu hoặc sai),
+    giá = giá 1 đêm x số chỗ x số đêm.
+    """
+    price, nightly = TravelService.objects.values_list('price', 'nightly').get(pk=service_id)
+    if nightly:
+        nights = check_stay(check_in, check_out)
+    else:
+        nights, check_in, check_out = 1, None, None
+
+    with transaction.atomic():
+        # Ghi đơn trước, câu UPDATE giữ chỗ chạy cuối cùng để khóa dòng dịch vụ ngắn nhất
+        booking = Booking.objects.create(
+            user=user,
+            service_id=service_id,
+            quantity=quantity,
+            total_price=price * quantity * nights,  # Server tự tính, không tin tưởng client gửi lên
+            payment_method=payment_method,
+            status=Booking.Status.PENDING,
+            check_in=check_in,
+            check_out=check_out,
+        )
+        if nightly:
+            reserved = reserve_nights(service_id, check_in, check_out, quantity)
+        else:
+            reserved = reserve_slots(service_id, quantity)
+        if not reserved:
+            raise SoldOut
+    return booking
+
+
+def hold_ttl():
+    return timedelta(seconds=getattr(settings, 'BOOKING_HOLD_TTL', 15 * 60))
+
+
+def expire_pending_bookings(batch_size=1000):
+    """
+    Hủy 1 lô đơn PENDING đã quá hạn giữ chỗ và hoàn chỗ cho dịch vụ.
+    Làm theo tập hợp, không theo từng đơn:
+    - 1 câu SELECT ... FOR UPDATE lấy id (bỏ qua dòng đang bị request khác khóa nếu CSDL hỗ trợ)
+    - 1 câu UPDATE có điều kiện status = PENDING đổi trạng thái cả lô (đơn vừa được khách hủy / xác nhận
+      giữa chừng không bị đổi), đánh dấu bằng cùng 1 giá trị updated_date
+    - 1 câu GROUP BY trên các đơn thực sự bị đổi tính tổng chỗ cần hoàn,
+      rồi 1 câu UPDATE cho mỗi dịch vụ (mỗi khoảng ngày với dịch vụ bán theo đêm)
+    Trả về (số đơn đã hủy, số chỗ đã hoàn); (0, 0) khi không còn đơn quá hạn.
+    """
+    cutoff = timezone.now() - hold_ttl()
+    with transaction.atomic():
+        expired = Booking.objects.filter(status=Booking.Status.PENDING, created_date__lt=cutoff)
+        ids = list(expired.select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+                   .order_by('created_date').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return 0, 0
+
+        # Compare-and-swap trên status như BookingViewSet.cancel: CSDL không khóa được dòng (SQLite)
+        # thì đơn đã bị đổi trạng thái sau câu SELECT ở trên không bị hủy / hoàn chỗ lần nữa
+        now = timezone.now()
+        cancelled = Booking.objects.filter(id__in=ids, status=Booking.Status.PENDING) \
+            .update(status=Booking.Status.CANCELLED, updated_date=now)
+        if not cancelled:
+            return 0, 0
+
+        batch = Booking.objects.filter(id__in=ids, status=Booking.Status.CANCELLED, updated_date=now)
+        per_service = list(batch.values('service_id', 'check_in', 'check_out')
+                           .annotate(slots=Sum('quantity'))
+                           .order_by('service_id', 'check_in'))  # Khóa dòng theo thứ tự cố định, tránh deadlock
+        for row in per_service:
+            if row['check_in']:
+                release_nights(row['service_id'], row['check_in'], row['check_out'], row['slots'])
+                continue
+            TravelService.objects.filter(pk=row['service_id']).update(
+                slots_available=F('slots_available') + row['slots'],
+            )
+        bump_version(SERVICES)
+    return cancelled, sum(row['slots'] for row in per_service)
@@ -0,0 +1,64 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import SERVICES, bump_version
+from .models import Like, TravelService
+
+# Thích / bỏ thích dịch vụ, like_count trên TravelService được cộng / trừ cùng transaction.
+# Mỗi thao tác chỉ đổi trạng thái bằng UPDATE có điều kiện (active đang ngược lại) hoặc INSERT
+# dựa vào unique (user, service), nên gửi trùng / 2 request song song chỉ có 1 request được tính:
+# request còn lại cập nhật 0 dòng (hoặc INSERT bị IntegrityError) và không cộng thêm bộ đếm.
+
+
+def _count(service_id, delta):
+    TravelService.objects.filter(pk=service_id).update(like_count=F('like_count') + delta)
+    bump_version(SERVICES)
+
+
+def like_service(user, service_id):
+    """Thích dịch vụ, trả về True nếu trạng thái thay đổi (trước đó chưa thích)"""
+    with transaction.atomic():
+        changed = Like.objects.filter(user=user, service_id=service_id, active=False) \
+            .update(active=True, updated_date=timezone.now())
+        if not changed:
+            try:
+                with transaction.atomic():  # savepoint: lỗi trùng không hủy cả transaction
+                    Like.objects.create(user=user, service_id=service_id)
+                changed = 1
+            except IntegrityError:
+                pass  # Đã thích từ trước (hoặc request song song vừa ghi)
+        if changed:
+            _count(service_id, 1)
+    return bool(changed)
+
+
+def unlike_service(user, service_id):
+    """Bỏ thích, trả về True nếu trạng thái thay đổi (trước đó đang thích)"""
+    with transaction.atomic():
+        changed = Like.objects.filter(user=user, service_id=service_id, active=True) \
+            .update(active=False, updated_date=timezone.now())
+        if changed:
+            _count(service_id, -1)
+    return bool(changed)
+
+
+def service_rows(data):
+    """Các dịch vụ trong dữ liệu phản hồi: trang {'results': [...]}, danh sách, hoặc 1 dịch vụ"""
+    if isinstance(data, dict) and 'results' in data:
+        return data['results']
+    return data if isinstance(data, list) else [data]
+
+
+def liked_queryset(user, data):
+    """Id các dịch vụ trong `data` mà user đang thích: 1 câu IN cho cả trang"""
+    ids = [row['id'] for row in service_rows(data)]
+    return Like.objects.filter(user=user, active=True, service_id__in=ids).values_list('service_id', flat=True)
+
+
+def mark_liked(data, liked):
+    """Bản sao của `data` có thêm is_liked cho từng dịch vụ (không sửa dữ liệu đang cache)"""
+    rows = [{**row, 'is_liked': row['id'] in liked} for row in service_rows(data)]
+    if isinstance(data, dict) and 'results' in data:
+        return {**data, 'results': rows}
+    return rows if isinstance(data, list) else rows[0]
@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F
+
+from travel.images import SOURCES, generate_derivatives
+
+
+def pending_ids(source):
+    """Các dòng có ảnh nhưng chưa có ảnh thu nhỏ (hoặc ảnh thu nhỏ là của ảnh cũ)"""
+    model, field, derived_field = SOURCES[source]
+    return list(model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+                .exclude(**{field: F(derived_field)}).values_list('pk', flat=True))
+
+
+class Command(BaseCommand):
+    help = "Tạo ảnh thu nhỏ WebP/JPEG (thumb, card, full) cho ảnh dịch vụ và avatar đã tải lên trước đây"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--source', choices=[*SOURCES, 'all'], default='all')
+
+    def handle(self, *args, **options):
+        sources = list(SOURCES) if options['source'] == 'all' else [options['source']]
+        jobs = [(source, pk) for source in sources for pk in pending_ids(source)]
+        self.stdout.write(f"Cần xử lý {len(jobs)} ảnh với {options['workers']} luồng")
+
+        def work(job):
+            try:
+                return 'ok' if generate_derivatives(*job) else 'skipped'
+            except Exception as e:
+                self.stderr.write(f"{job[0]} {job[1]}: {e}")
+                return 'error'
+            finally:
+                connection.close()
+
+        counters = {'ok': 0, 'skipped': 0, 'error': 0}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for result in pool.map(work, jobs):
+                counters[result] += 1
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tạo {counters['ok']} ảnh, bỏ qua {counters['skipped']}, lỗi {counters['error']} "
+            f"trong {elapsed:.1f} giây"
+        ))
@@ -0,0 +1,86 @@
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+from travel.models import TravelService
+
+# Màn TourDetail: bản đồng bộ gọi 2 API (chi tiết + bình luận), bản async gọi 1 API overview
+# chạy song song 3 phần. Các API còn lại giống nhau, chỉ khác tiền tố /async/.
+SCENARIOS = {
+    'wsgi': ['/services/', '/categories/', '/services/{id}/', '/services/{id}/comments/'],
+    'asgi': ['/async/services/', '/async/categories/', '/async/services/{id}/overview/'],
+}
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Tạo tải đồng thời lên server đang chạy để so sánh bản WSGI và bản ASGI (uvicorn), ví dụ:\n"
+        "  gunicorn travelmobileapi.wsgi -w 2 --threads 4 -b :8000\n"
+        "  uvicorn travelmobileapi.asgi:application --workers 2 --port 8001\n"
+        "  python manage.py bench_asgi --wsgi http://127.0.0.1:8000 --asgi http://127.0.0.1:8001"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', help="Địa chỉ server WSGI (API đồng bộ)")
+        parser.add_argument('--asgi', help="Địa chỉ server ASGI (API /async/)")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+        parser.add_argument('--duration', type=float, default=10, help="Số giây chạy mỗi mức tải")
+        parser.add_argument('--service', type=int, help="id dịch vụ dùng cho trang chi tiết")
+
+    def handle(self, *args, **options):
+        service_id = options['service'] or TravelService.objects.filter(active=True) \
+            .values_list('id', flat=True).first()
+        self.stdout.write(f"{'Server':<6}{'Luồng':>7}{'Màn/giây':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Lỗi':>6}")
+        for name in ('wsgi', 'asgi'):
+            if not options[name]:
+                continue
+            paths = [path.format(id=service_id) for path in SCENARIOS[name]]
+            for concurrency in options['concurrency']:
+                self.run(name, options[name], paths, concurrency, options['duration'])
+
+    def run(self, name, base_url, paths, concurrency, duration):
+        url = urlsplit(base_url)
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            # Mỗi "màn hình" là 1 lượt gọi hết các API của kịch bản, dùng lại kết nối keep-alive
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    for path in paths:
+                        conn.request('GET', path)
+                        response = conn.getresponse()
+                        response.read()
+                        if response.status >= 400:
+                            raise http.client.HTTPException(response.status)
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+                    with lock:
+                        errors[0] += 1
+                    continue
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+            conn.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(
+            f"{name:<6}{concurrency:>7}{len(latencies) / duration:>10.1f}{percentile(latencies, 50):>9.1f}"
+            f"{percentile(latencies, 95):>9.1f}{percentile(latencies, 99):>9.1f}{errors[0]:>6}"
+        )
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from travel.inventory import SoldOut, create_booking
+from travel.models import Booking, Category, TravelService, User
+
+
+def book_with_row_lock(user, service_id, quantity):
+    """Cách làm cũ của BookingViewSet.create: SELECT ... FOR UPDATE rồi kiểm tra trong Python"""
+    with transaction.atomic():
+        service = TravelService.objects.select_for_update().get(pk=service_id)
+        if service.slots_available < quantity:
+            raise SoldOut
+        booking = Booking.objects.create(
+            user=user, service=service, quantity=quantity,
+            total_price=service.price * quantity, status=Booking.Status.PENDING,
+        )
+        service.slots_available -= quantity
+        service.save(update_fields=['slots_available', 'updated_date'])
+    return booking
+
+
+STRATEGIES = {
+    'lock': book_with_row_lock,
+    'atomic': create_booking,
+}
+
+
+class Command(BaseCommand):
+    help = "Đo tranh chấp khi nhiều luồng cùng đặt một tour: khóa dòng (cũ) so với UPDATE có điều kiện (mới)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--slots', type=int, default=500)
+        parser.add_argument('--attempts', type=int, default=100, help="Số lần đặt tối đa của mỗi luồng")
+        parser.add_argument('--quantity', type=int, default=1)
+        parser.add_argument('--strategy', choices=[*STRATEGIES, 'all'], default='all')
+
+    def handle(self, *args, **options):
+        strategies = list(STRATEGIES) if options['strategy'] == 'all' else [options['strategy']]
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite khóa cả file khi ghi, kết quả chỉ mang tính tham khảo - nên chạy trên MySQL"))
+
+        self.stdout.write(f"{'Cách':<8}{'Thành công':>12}{'Hết chỗ':>10}{'Lỗi':>6}{'Giây':>8}{'Đơn/giây':>10}  Bán vượt?")
+        for name in strategies:
+            self.run(name, STRATEGIES[name], options)
+
+    def run(self, name, book, options):
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        provider, _ = User.objects.get_or_create(username='bench_provider', defaults={'role': 'PROVIDER'})
+        service = TravelService.objects.create(
+            name=f'Benchmark {name}', description='', price=100000, location='Benchmark',
+            start_date=timezone.now(), slots_total=options['slots'], slots_available=options['slots'],
+            category=category, provider=provider,
+        )
+        users = [User.objects.get_or_create(username=f'bench_user_{i}')[0] for i in range(options['threads'])]
+
+        counters = {'ok': 0, 'sold_out': 0, 'error': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(users))
+
+        def worker(user):
+            barrier.wait()
+            try:
+                for _ in range(options['attempts']):
+                    try:
+                        book(user, service.id, options['quantity'])
+                        result = 'ok'
+                    except SoldOut:
+                        result = 'sold_out'
+                    except DatabaseError:
+                        result = 'error'
+                    with lock:
+                        counters[result] += 1
+                    if result == 'sold_out':
+                        break
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        service.refresh_from_db()
+        sold = Booking.objects.filter(service=service).aggregate(total=Sum('quantity'))['total'] or 0
+        oversold = sold > service.slots_total or service.slots_available != service.slots_total - sold
+        self.stdout.write(
+            f"{name:<8}{counters['ok']:>12}{counters['sold_out']:>10}{counters['error']:>6}"
+            f"{elapsed:>8.2f}{counters['ok'] / elapsed:>10.1f}  {'CÓ' if oversold else 'không'}"
+        )
+        service.delete()
@@ -0,0 +1,84 @@
+import random
+import resource
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from travel.models import Booking, ServiceNeighbor, TravelService, User
+from travel.recommendations import rebuild_recommendations, top_k
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo thời gian tính gợi ý trên dữ liệu hiện có (chạy `generate_data` trước, mặc định 1 triệu đơn): "
+        "tính toàn bộ, tính tăng dần sau khi có đơn mới, và so sánh đọc danh sách tương tự đã lưu "
+        "với truy vấn GROUP BY đơn chung trực tiếp. Dữ liệu ghi trong lúc đo được rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--new-bookings', type=int, default=1000,
+                            help="Số đơn mới ghi thêm trước lần tính tăng dần")
+        parser.add_argument('--samples', type=int, default=20, help="Số dịch vụ dùng để đo truy vấn")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        bookings = Booking.objects.count()
+        if not bookings:
+            raise CommandError("Chưa có đơn nào, chạy `python manage.py generate_data` trước")
+        self.stdout.write(f"Dữ liệu: {bookings} đơn, {TravelService.objects.count()} dịch vụ")
+
+        try:
+            with transaction.atomic():
+                self.step("Tính toàn bộ", lambda: rebuild_recommendations(full=True))
+                self.add_bookings(rng, options['new_bookings'])
+                self.step(f"Tính tăng dần (+{options['new_bookings']} đơn)", lambda: rebuild_recommendations())
+                self.compare_reads(rng, options['samples'])
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(f"Bộ nhớ tối đa của tiến trình: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    def step(self, label, func):
+        started = time.perf_counter()
+        run = func()
+        self.stdout.write(f"{label:<35}{run.services:>8} dịch vụ  {time.perf_counter() - started:8.2f}s")
+
+    def add_bookings(self, rng, count):
+        users = list(User.objects.filter(role=User.Role.CUSTOMER).values_list('id', flat=True)[:5000])
+        services = list(TravelService.objects.filter(active=True).values_list('id', flat=True))
+        Booking.objects.bulk_create([
+            Booking(user_id=rng.choice(users), service_id=rng.choice(services), quantity=1, total_price=0,
+                    status=Booking.Status.CONFIRMED)
+            for _ in range(count)
+        ], batch_size=5000)
+
+    def compare_reads(self, rng, samples):
+        services = list(TravelService.objects.order_by('-booking_count').values_list('id', flat=True)[:samples * 5])
+        sample = rng.sample(services, min(samples, len(services)))
+        k = top_k()
+
+        def co_booked(service_id):
+            # Cách không tính trước: đếm khách đặt chung trực tiếp trên bảng Booking
+            customers = Booking.objects.filter(service_id=service_id).values('user_id')
+            return list(Booking.objects.filter(user_id__in=customers).exclude(service_id=service_id)
+                        .values('service_id').annotate(n=Count('user_id', distinct=True)).order_by('-n')[:k])
+
+        def stored(service_id):
+            return list(ServiceNeighbor.objects.filter(service_id=service_id).order_by('rank')
+                        .values_list('neighbor_id', flat=True))
+
+        for label, func in [("GROUP BY đơn chung", co_booked), ("ServiceNeighbor đã tính", stored)]:
+            timings = []
+            for service_id in sample:
+                started = time.perf_counter()
+                func(service_id)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f"{label:<35}p50 {statistics.median(timings):8.2f} ms  max {max(timings):8.2f} ms")
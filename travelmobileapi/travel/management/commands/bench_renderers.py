@@ -0,0 +1,60 @@
+import gzip
+import statistics
+import time
+
+import brotli
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from travel.compression import brotli_quality
+from travel.models import RevenueRollup, TravelService
+from travel.renderers import MessagePackRenderer, ORJSONRenderer
+from travel.serializers import TravelServiceSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Đo thời gian render + kích thước phản hồi: JSONRenderer của DRF, orjson, MessagePack, "
+        "và sau khi nén gzip / brotli, trên 1 trang 20 dịch vụ và 1k dòng thống kê doanh thu "
+        "(chạy `generate_data` trước)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--rows', type=int, default=1000, help="Số dòng thống kê")
+
+    def handle(self, *args, **options):
+        rows = list(RevenueRollup.objects.order_by('provider_id', 'granularity', 'period')
+                    .values('provider_id', 'granularity', 'period', 'total_revenue', 'count')[:options['rows']])
+        if not rows:
+            raise CommandError("Chưa có dữ liệu, chạy `python manage.py generate_data` trước")
+
+        request = Request(APIRequestFactory().get('/services/'))
+        services = TravelService.objects.filter(active=True).select_related('category').order_by('id')[:20]
+        page = {
+            'count': TravelService.objects.filter(active=True).count(), 'next': None, 'previous': None,
+            'results': TravelServiceSerializer(services, many=True, context={'request': request}).data,
+        }
+
+        for label, data in [("Trang 20 dịch vụ", page), (f"{len(rows)} dòng thống kê", rows)]:
+            self.stdout.write(label)
+            for name, renderer in [("DRF JSONRenderer", JSONRenderer()), ("orjson", ORJSONRenderer()),
+                                   ("MessagePack", MessagePackRenderer())]:
+                body, render_ms = self.timed(lambda: renderer.render(data), options['repeat'])
+                self.stdout.write(f"  {name:<20}render {render_ms:8.3f} ms  {len(body):>8} byte")
+            body = ORJSONRenderer().render(data)
+            for name, compress in [("+ gzip (mức 6)", lambda: gzip.compress(body, compresslevel=6)),
+                                   (f"+ brotli (mức {brotli_quality()})",
+                                    lambda: brotli.compress(body, quality=brotli_quality()))]:
+                compressed, compress_ms = self.timed(compress, options['repeat'])
+                self.stdout.write(f"  {name:<20}nén   {compress_ms:8.3f} ms  {len(compressed):>8} byte")
+
+    def timed(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
@@ -0,0 +1,86 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from travel.models import Category, SearchToken, TravelService, User
+from travel.search import build_tokens, search_services
+
+PLACES = [
+    'Đà Nẵng', 'Hội An', 'Huế', 'Hà Nội', 'Hạ Long', 'Sa Pa', 'Đà Lạt', 'Nha Trang', 'Phú Quốc',
+    'Vũng Tàu', 'Cần Thơ', 'Quy Nhơn', 'Phan Thiết', 'Ninh Bình', 'Hà Giang', 'Côn Đảo',
+]
+KINDS = ['Tour', 'Khách sạn', 'Resort', 'Homestay', 'Vé xe', 'Du thuyền', 'Combo']
+ADJECTIVES = ['khám phá', 'nghỉ dưỡng', 'trọn gói', 'cao cấp', 'giá rẻ', 'gia đình', 'săn mây', 'biển đảo']
+QUERIES = ['da nang', 'Hội An', 'phu quoc resort', 'sa pa san may', 'du thuyen ha long', 'con dao', 'resort 4242']
+
+
+class Interrupted(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "So sánh tốc độ tìm kiếm bằng chỉ mục SearchToken với cách lọc icontains cũ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--keep', action='store_true', help="Giữ lại dữ liệu sinh ra (mặc định rollback)")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.generate(options['services'], options['batch_size'])
+                self.run(options['repeat'])
+                if not options['keep']:
+                    raise Interrupted
+        except Interrupted:
+            self.stdout.write("Đã rollback dữ liệu benchmark")
+
+    def generate(self, total, batch_size):
+        rnd = random.Random(42)
+        provider, _ = User.objects.get_or_create(username='bench_provider', defaults={'role': 'PROVIDER'})
+        category, _ = Category.objects.get_or_create(name='Benchmark')
+        # Tự cấp id để bulk_create trả về khóa chính trên mọi CSDL (MySQL không trả về id)
+        next_id = (TravelService.objects.aggregate(m=Max('id'))['m'] or 0) + 1
+        now = timezone.now()
+
+        started = time.perf_counter()
+        for offset in range(0, total, batch_size):
+            services = []
+            for i in range(offset, min(offset + batch_size, total)):
+                place = rnd.choice(PLACES)
+                services.append(TravelService(
+                    id=next_id + i,
+                    name=f"{rnd.choice(KINDS)} {place} {rnd.choice(ADJECTIVES)} #{i}",
+                    description='', price=rnd.randint(1, 100) * 100000, location=place,
+                    start_date=now, category=category, provider=provider,
+                ))
+            TravelService.objects.bulk_create(services)
+            SearchToken.objects.bulk_create([t for s in services for t in build_tokens(s)], batch_size=batch_size)
+        self.stdout.write(f"Sinh {total} dịch vụ trong {time.perf_counter() - started:.1f}s")
+
+    def measure(self, build, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(build()[:20])
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def run(self, repeat):
+        base = TravelService.objects.filter(active=True)
+        self.stdout.write(f"{'Từ khóa':<22}{'icontains (ms)':>16}{'SearchToken (ms)':>18}")
+        for text in QUERIES:
+            def icontains():
+                return base.filter(Q(name__icontains=text) | Q(location__icontains=text)).order_by('-id')
+
+            def indexed():
+                return search_services(base, text).order_by('-search_rank', '-id')
+
+            self.stdout.write(f"{text:<22}{self.measure(icontains, repeat):>16.1f}{self.measure(indexed, repeat):>18.1f}")
@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from travel.models import TravelService
+from travel.serializers import TravelServiceListSerializer, TravelServiceSerializer, load_only
+
+# Mô tả HTML cỡ thật (~5 KB) thay cho mô tả ngắn của generate_data
+DESCRIPTION = '<p>' + 'Lịch trình chi tiết, dịch vụ bao gồm và điều khoản hủy. ' * 70 + '</p>'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "So sánh kích thước JSON và thời gian nạp / serialize danh sách dịch vụ: serializer đầy đủ (trước), "
+        "bản gọn không có description (mặc định của danh sách) và ?fields=... "
+        "Mô tả được tạm đổi thành HTML ~5 KB rồi rollback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,500', help="Số dịch vụ mỗi lần, cách nhau bởi dấu phẩy")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--fields', default='id,name,price,image')
+
+    def handle(self, *args, **options):
+        if not TravelService.objects.exists():
+            raise CommandError("Chưa có dịch vụ nào, chạy `python manage.py generate_data` trước")
+        factory = APIRequestFactory()
+        variants = [
+            ("Đầy đủ + select_related", TravelServiceSerializer, {}),
+            ("Bản gọn + only()", TravelServiceListSerializer, {}),
+            (f"?fields={options['fields']}", TravelServiceSerializer, {'fields': options['fields']}),
+        ]
+        try:
+            with transaction.atomic():
+                TravelService.objects.update(description=DESCRIPTION)
+                self.stdout.write(f"Mô tả {len(DESCRIPTION.encode())} byte/dịch vụ, "
+                                  f"{TravelService.objects.count()} dịch vụ, {options['repeat']} lần/phép đo")
+                for size in [int(n) for n in options['sizes'].split(',')]:
+                    for label, serializer_class, params in variants:
+                        request = Request(factory.get('/services/', params))
+                        self.measure(f"{label} ({size} dòng)", serializer_class, request, size, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def measure(self, label, serializer_class, request, size, repeat):
+        queryset = TravelService.objects.filter(active=True).order_by('id')
+        if serializer_class is TravelServiceListSerializer or 'fields' in request.query_params:
+            queryset = load_only(queryset, serializer_class, request.query_params)
+        else:
+            queryset = queryset.select_related('category')
+
+        load_ms, serialize_ms = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            rows = list(queryset[:size])
+            loaded = time.perf_counter()
+            data = serializer_class(rows, many=True, context={'request': request}).data
+            serialize_ms.append((time.perf_counter() - loaded) * 1000)
+            load_ms.append((loaded - started) * 1000)
+        payload = JSONRenderer().render(data)
+        self.stdout.write(f"{label:<42}nạp {statistics.median(load_ms):8.2f} ms  "
+                          f"serialize {statistics.median(serialize_ms):8.2f} ms  JSON {len(payload):>9} byte")
@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+from secrets import token_urlsafe
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from oauth2_provider.models import get_access_token_model, get_application_model
+from rest_framework.request import Request
+
+from travel.authentication import CachedOAuth2Authentication
+from travel.models import User
+
+AUTHENTICATORS = {
+    'oauth2': OAuth2Authentication,
+    'cached': CachedOAuth2Authentication,
+}
+
+
+class Command(BaseCommand):
+    help = "Đo số truy vấn và thời gian xác thực Bearer token mỗi request: OAuth2Authentication so với bản có cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username='bench_token_user')
+        application, _ = get_application_model().objects.get_or_create(
+            name='Benchmark', defaults={
+                'client_type': 'public', 'authorization_grant_type': 'password', 'user': user,
+            })
+        token = get_access_token_model().objects.create(
+            user=user, application=application, token=token_urlsafe(32),
+            expires=timezone.now() + timedelta(hours=1), scope='read write',
+        )
+        factory = RequestFactory()
+        n = options['requests']
+
+        self.stdout.write(f"{'Cách':<8}{'Truy vấn/request':>18}{'µs/request':>12}")
+        try:
+            for name, authenticator_class in AUTHENTICATORS.items():
+                cache.clear()
+                authenticator = authenticator_class()
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    for _ in range(n):
+                        request = Request(factory.get('/users/current-user/',
+                                                      HTTP_AUTHORIZATION=f'Bearer {token.token}'))
+                        authenticated_user, _ = authenticator.authenticate(request)
+                        assert authenticated_user.pk == user.pk
+                    elapsed = time.perf_counter() - started
+                self.stdout.write(f"{name:<8}{len(ctx.captured_queries) / n:>18.3f}{elapsed / n * 1e6:>12.1f}")
+
+            # Thu hồi token: lần xác thực tiếp theo phải thất bại ngay, không dùng bản trong cache
+            token.revoke()
+            request = Request(factory.get('/users/current-user/', HTTP_AUTHORIZATION=f'Bearer {token.token}'))
+            revoked = CachedOAuth2Authentication().authenticate(request) is None
+            self.stdout.write(f"Sau khi thu hồi token bị từ chối: {'có' if revoked else 'KHÔNG'}")
+        finally:
+            get_access_token_model().objects.filter(pk=token.pk).delete()
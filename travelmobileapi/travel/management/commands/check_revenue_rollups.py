@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from travel.rollups import find_mismatches, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Đối chiếu bảng tổng hợp doanh thu với dữ liệu Booking gốc"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="Tính lại bảng tổng hợp nếu phát hiện sai lệch")
+
+    def handle(self, *args, **options):
+        mismatches = find_mismatches()
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Bảng tổng hợp khớp với dữ liệu gốc"))
+            return
+
+        for (provider_id, granularity, period), have, want in mismatches:
+            self.stdout.write(f"provider={provider_id} {granularity} {period}: "
+                              f"đang lưu {have[0]}/{have[1]} đơn, đúng là {want[0]}/{want[1]} đơn")
+        if options['fix']:
+            rebuild_rollups()
+            self.stdout.write(self.style.SUCCESS("Đã tính lại bảng tổng hợp"))
+        else:
+            raise CommandError(f"Phát hiện {len(mismatches)} dòng sai lệch (chạy lại với --fix để sửa)")
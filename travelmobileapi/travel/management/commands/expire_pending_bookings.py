@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel.inventory import expire_pending_bookings, hold_ttl
+
+
+class Command(BaseCommand):
+    help = "Hủy các đơn PENDING quá hạn giữ chỗ (BOOKING_HOLD_TTL) và hoàn chỗ cho dịch vụ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--every', type=int, default=0,
+                            help="Chạy lặp lại sau mỗi N giây (0 = chạy 1 lần rồi thoát, dùng với cron)")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Thời hạn giữ chỗ: {hold_ttl()}")
+        while True:
+            self.sweep(options['batch_size'])
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+    def sweep(self, batch_size):
+        total_bookings = total_slots = 0
+        started = time.perf_counter()
+        while True:
+            bookings, slots = expire_pending_bookings(batch_size=batch_size)
+            if not bookings:
+                break
+            total_bookings += bookings
+            total_slots += slots
+            self.stdout.write(f"  Lô: hủy {bookings} đơn, hoàn {slots} chỗ")
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã hủy {total_bookings} đơn quá hạn, hoàn {total_slots} chỗ "
+            f"({time.perf_counter() - started:.2f} giây)"
+        ))
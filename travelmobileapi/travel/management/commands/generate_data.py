@@ -0,0 +1,223 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from travel.aggregates import rebuild_service_aggregates
+from travel.cache import CATEGORIES, SERVICES, bump_version
+from travel.geo import grid_cell
+from travel.imports import fill_created_ids
+from travel.models import Booking, Category, Like, Rating, TravelService, User
+from travel.rollups import rebuild_rollups
+from travel.search import rebuild_index
+
+CATEGORIES_NAMES = ['Tour trong nước', 'Tour nước ngoài', 'Khách sạn', 'Homestay', 'Resort',
+                    'Vé tham quan', 'Du thuyền', 'Combo tiết kiệm']
+LOCATIONS = ['Hà Nội', 'Đà Nẵng', 'Hội An', 'Huế', 'Nha Trang', 'Đà Lạt', 'Phú Quốc', 'Hạ Long',
+             'Sa Pa', 'Cần Thơ', 'Vũng Tàu', 'Quy Nhơn', 'Ninh Bình', 'Mũi Né', 'Côn Đảo', 'Hà Giang']
+# Tọa độ gần đúng của từng địa điểm, dịch vụ được rải ngẫu nhiên quanh đó (~±15 km)
+COORDINATES = {
+    'Hà Nội': (21.028, 105.854), 'Đà Nẵng': (16.054, 108.202), 'Hội An': (15.880, 108.338),
+    'Huế': (16.463, 107.590), 'Nha Trang': (12.238, 109.197), 'Đà Lạt': (11.940, 108.458),
+    'Phú Quốc': (10.227, 103.964), 'Hạ Long': (20.951, 107.080), 'Sa Pa': (22.336, 103.844),
+    'Cần Thơ': (10.045, 105.747), 'Vũng Tàu': (10.346, 107.084), 'Quy Nhơn': (13.776, 109.224),
+    'Ninh Bình': (20.251, 105.975), 'Mũi Né': (10.933, 108.287), 'Côn Đảo': (8.683, 106.609),
+    'Hà Giang': (22.823, 104.984),
+}
+NAMES = ['Tour {loc} {days}N{nights}Đ', 'Khám phá {loc} {days} ngày', 'Khách sạn {adj} {loc}',
+         'Homestay {adj} {loc}', 'Resort {adj} {loc}', 'Vé tham quan {loc}', 'Combo {loc} {days}N{nights}Đ']
+ADJECTIVES = ['Hoàng Gia', 'Bình Minh', 'Xanh', 'Ngọc Trai', 'Sen Vàng', 'Biển Nhớ', 'Mây Trắng', 'Phố Cổ']
+COMMENTS = ['Tuyệt vời, sẽ quay lại!', 'Hướng dẫn viên nhiệt tình', 'Phòng sạch sẽ, view đẹp',
+            'Giá hợp lý', 'Đồ ăn ngon', 'Hơi đông nhưng vẫn vui', 'Không như quảng cáo', None]
+STATUSES = [Booking.Status.CONFIRMED, Booking.Status.CANCELLED]
+PAYMENTS = [choice for choice, _ in Booking.PaymentMethod.choices]
+
+
+@contextmanager
+def explicit_created_date(*models):
+    """Tạm tắt auto_now_add của created_date để ghi ngày tạo rải trong quá khứ (dữ liệu thống kê thực tế hơn)"""
+    fields = [model._meta.get_field('created_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Sinh dữ liệu giả lập quy mô lớn để đo hiệu năng (mặc định 10k dịch vụ, 1 triệu đơn, 500k đánh giá). "
+        "Cùng --seed cho ra cùng dữ liệu. Chỉ chạy trên CSDL thử nghiệm."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=50000)
+        parser.add_argument('--providers', type=int, default=500)
+        parser.add_argument('--services', type=int, default=10000)
+        parser.add_argument('--bookings', type=int, default=1000000)
+        parser.add_argument('--ratings', type=int, default=500000)
+        parser.add_argument('--likes', type=int, default=300000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='gen', help="Tiền tố username của user sinh ra")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Đã có user '{prefix}_*', dùng --prefix khác hoặc CSDL mới")
+
+        with explicit_created_date(TravelService, Booking, Rating):
+            categories = self.step("Danh mục", self.create_categories)
+            customers = self.step("Khách hàng", self.create_users, prefix, 'customer',
+                                  options['customers'], User.Role.CUSTOMER)
+            providers = self.step("Nhà cung cấp", self.create_users, prefix, 'provider',
+                                  options['providers'], User.Role.PROVIDER)
+            services = self.step("Dịch vụ", self.create_services, options['services'], categories, providers)
+
+            # Dịch vụ phổ biến được đặt / đánh giá nhiều hơn hẳn (phân bố kiểu Zipf)
+            weights = [1 / (rank + 10) ** 0.9 for rank in range(len(services))]
+            self.rng.shuffle(weights)
+            self.cum_weights = list(accumulate(weights))
+
+            self.step("Đơn đặt", self.create_bookings, options['bookings'], customers, services)
+            self.step("Đánh giá", self.create_ratings, options['ratings'], customers, services)
+            self.step("Lượt thích", self.create_likes, options['likes'], customers, services)
+
+        # Các bảng tính sẵn phải khớp dữ liệu vừa ghi bằng bulk_create (không qua signal)
+        self.step("Thống kê dịch vụ", rebuild_service_aggregates, TravelService.objects.filter(id__in=services))
+        self.step("Chỉ mục tìm kiếm", rebuild_index)
+        self.step("Tổng hợp doanh thu", rebuild_rollups)
+        bump_version(SERVICES, CATEGORIES)
+
+    def step(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        count = len(result) if isinstance(result, (list, dict)) else result
+        self.stdout.write(f"{label:<20}{'' if count is None else count:>10}  {time.perf_counter() - started:.1f}s")
+        return result
+
+    def past(self, days):
+        return self.now - timedelta(seconds=self.rng.randint(0, days * 86400))
+
+    def pick_services(self, services, k):
+        return self.rng.choices(services, cum_weights=self.cum_weights, k=k)
+
+    def bulk(self, model, objects):
+        with transaction.atomic():
+            created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return created
+
+    def create_categories(self):
+        existing = dict(Category.objects.values_list('name', 'id'))
+        missing = [Category(name=name) for name in CATEGORIES_NAMES if name not in existing]
+        Category.objects.bulk_create(missing)
+        return list(Category.objects.filter(name__in=CATEGORIES_NAMES).order_by('id').values_list('id', flat=True))
+
+    def create_users(self, prefix, kind, count, role):
+        password = make_password('123456')  # Băm 1 lần, dùng chung cho mọi user giả lập
+        ids = []
+        for start in range(0, count, self.batch_size):
+            users = [
+                User(username=f'{prefix}_{kind}{i}', password=password, role=role,
+                     is_verified=role == User.Role.PROVIDER, email=f'{prefix}_{kind}{i}@example.com')
+                for i in range(start, min(count, start + self.batch_size))
+            ]
+            self.bulk(User, users)
+            ids.extend(User.objects.filter(username__in=[u.username for u in users])
+                       .order_by('id').values_list('id', flat=True))
+        return ids
+
+    def create_services(self, count, categories, providers):
+        ids = []
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for _ in range(min(self.batch_size, count - start)):
+                days = self.rng.randint(1, 6)
+                start_date = self.now + timedelta(days=self.rng.randint(-180, 365), hours=self.rng.randint(6, 20))
+                location = self.rng.choice(LOCATIONS)
+                lat, lng = COORDINATES[location]
+                lat, lng = lat + self.rng.uniform(-0.15, 0.15), lng + self.rng.uniform(-0.15, 0.15)
+                batch.append(TravelService(
+                    name=self.rng.choice(NAMES).format(loc=self.rng.choice(LOCATIONS), days=days, nights=days - 1,
+                                                       adj=self.rng.choice(ADJECTIVES)),
+                    description='<p>Dữ liệu giả lập phục vụ đo hiệu năng</p>',
+                    price=self.rng.choice([3, 5, 8, 12, 20, 30, 50, 80, 120]) * 100000,
+                    location=location,
+                    latitude=lat, longitude=lng, geo_cell=grid_cell(lat, lng),
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=days),
+                    duration=f'{days}N{days - 1}Đ',
+                    slots_total=0, slots_available=0,
+                    category_id=self.rng.choice(categories),
+                    provider_id=self.rng.choice(providers),
+                    created_date=self.past(720),
+                ))
+            created = self.bulk(TravelService, batch)
+            if created[0].pk is None:  # MySQL không trả id sau bulk_create: tìm lại các dòng vừa ghi
+                fill_created_ids(created)
+            ids.extend(service.pk for service in created)
+        return ids
+
+    def create_bookings(self, count, customers, services):
+        prices = dict(TravelService.objects.filter(id__in=services).values_list('id', 'price'))
+        reserved = dict.fromkeys(services, 0)
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            batch = []
+            for service_id in self.pick_services(services, size):
+                quantity = self.rng.randint(1, 4)
+                status = self.rng.choices(STATUSES, weights=[3, 1])[0]
+                if status != Booking.Status.CANCELLED:
+                    reserved[service_id] += quantity
+                batch.append(Booking(
+                    user_id=self.rng.choice(customers), service_id=service_id, quantity=quantity,
+                    total_price=prices[service_id] * quantity, status=status,
+                    payment_method=self.rng.choice(PAYMENTS), created_date=self.past(720),
+                ))
+            self.bulk(Booking, batch)
+
+        # Số chỗ khớp với các đơn chưa hủy, còn dư vài chỗ để load test đặt tiếp được
+        updates = []
+        for service_id, taken in reserved.items():
+            spare = self.rng.randint(5, 60)
+            updates.append(TravelService(pk=service_id, slots_total=taken + spare, slots_available=spare))
+        with transaction.atomic():
+            TravelService.objects.bulk_update(updates, ['slots_total', 'slots_available'], batch_size=1000)
+        return count
+
+    def unique_pairs(self, count, customers, services):
+        pairs = set()
+        while len(pairs) < count:
+            for service_id in self.pick_services(services, count - len(pairs)):
+                pairs.add((self.rng.choice(customers), service_id))
+        return sorted(pairs)
+
+    def create_ratings(self, count, customers, services):
+        pairs = self.unique_pairs(min(count, len(customers) * len(services)), customers, services)
+        self.rng.shuffle(pairs)
+        for start in range(0, len(pairs), self.batch_size):
+            self.bulk(Rating, [
+                Rating(user_id=user_id, service_id=service_id,
+                       rate=self.rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 8, 12])[0],
+                       comment=self.rng.choice(COMMENTS), created_date=self.past(720))
+                for user_id, service_id in pairs[start:start + self.batch_size]
+            ])
+        return len(pairs)
+
+    def create_likes(self, count, customers, services):
+        pairs = self.unique_pairs(min(count, len(customers) * len(services)), customers, services)
+        for start in range(0, len(pairs), self.batch_size):
+            self.bulk(Like, [Like(user_id=user_id, service_id=service_id)
+                             for user_id, service_id in pairs[start:start + self.batch_size]])
+        return len(pairs)
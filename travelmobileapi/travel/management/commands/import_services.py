@@ -0,0 +1,38 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from travel.imports import BATCH_SIZE, ImportAborted, import_services, read_rows
+from travel.models import User
+
+
+class Command(BaseCommand):
+    help = "Nhập dịch vụ hàng loạt từ file .csv / .json / .jsonl cho 1 nhà cung cấp (giống API /services/import/)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--provider', required=True, help="Username của nhà cung cấp")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            provider = User.objects.get(username=options['provider'], role=User.Role.PROVIDER)
+        except User.DoesNotExist:
+            raise CommandError(f"Không có nhà cung cấp '{options['provider']}'")
+
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_services(read_rows(file, options['path']), provider, options['batch_size'])
+        except OSError as e:
+            raise CommandError(f"Không đọc được file: {e}")
+        except ImportAborted as e:
+            raise CommandError(f"Không đọc được file: {e} (đã tạo {e.result['created']} dịch vụ trước dòng này)")
+
+        for error in result['errors']:
+            self.stderr.write(f"  Dòng {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã tạo {result['created']} dịch vụ, {len(result['errors'])} dòng lỗi "
+            f"({time.perf_counter() - started:.2f} giây)"
+        ))
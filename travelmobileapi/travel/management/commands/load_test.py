@@ -0,0 +1,279 @@
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import uuid
+from datetime import timedelta
+from secrets import token_urlsafe
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_application_model
+from rest_framework.test import APIClient
+
+from travel.management.commands.generate_data import COORDINATES
+from travel.models import Booking, Category, TravelService, User
+
+# Tỉ lệ thao tác của app di động (trọng số tương đối), sửa bằng --mix browse=50,book=10,...
+DEFAULT_MIX = {
+    'browse': 40,       # Trang chủ: danh sách dịch vụ cuộn vô hạn, thỉnh thoảng sang trang 2
+    'filter': 15,       # Lọc theo danh mục / giá / tháng, tìm kiếm
+    'detail': 20,       # Trang chi tiết: dịch vụ + bình luận
+    'my_bookings': 8,   # Danh sách đơn của tôi
+    'book': 8,          # Đặt chỗ
+    'cancel': 4,        # Hủy đơn vừa đặt
+    'stats': 5,         # Nhà cung cấp xem thống kê doanh thu
+}
+SEARCH_TERMS = ['da nang', 'hue', 'tour ha', 'khach san', 'phu quoc', 'resort']
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else None
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (text or '').split(',')):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX:
+            raise CommandError(f"Thao tác không hợp lệ: {name} (chọn trong {', '.join(DEFAULT_MIX)})")
+        mix[name] = int(weight)
+    return mix
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Session:
+    """1 người dùng giả lập: gọi API qua APIClient (chạy đủ middleware, xác thực Bearer token)"""
+
+    def __init__(self, driver, rng, customer_token, provider_token):
+        self.driver = driver
+        self.rng = rng
+        self.customer = APIClient(HTTP_AUTHORIZATION=f'Bearer {customer_token}')
+        self.provider = APIClient(HTTP_AUTHORIZATION=f'Bearer {provider_token}')
+        self.my_bookings = []
+
+    def call(self, endpoint, client, method, url, data=None, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            if method == 'post':
+                response = client.post(url, data, format='json', **extra)
+            else:
+                response = client.get(url, **extra)
+            elapsed = (time.perf_counter() - started) * 1000
+        self.driver.record(endpoint, elapsed, len(ctx.captured_queries), response.status_code)
+        return response
+
+    def browse(self):
+        response = self.call('services_list', self.customer, 'get', '/services/?pagination=cursor')
+        if response.status_code == 200 and response.data.get('next') and self.rng.random() < 0.3:
+            self.call('services_next_page', self.customer, 'get', response.data['next'])
+
+    def filter_list(self):
+        choice = self.rng.random()
+        if choice < 0.35:
+            url = f'/services/?pagination=cursor&category_id={self.rng.choice(self.driver.categories)}'
+        elif choice < 0.6:
+            url = f'/services/?pagination=cursor&min_price=500000&max_price={self.rng.choice([2, 5, 10])}000000' \
+                  f'&ordering=price'
+        elif choice < 0.8:
+            url = f'/services/?pagination=cursor&month={self.rng.randint(1, 12)}'
+        elif choice < 0.9:
+            url = f'/services/?pagination=cursor&search={self.rng.choice(SEARCH_TERMS)}'
+        else:
+            # "Gần tôi": vị trí người dùng quanh 1 địa điểm du lịch
+            lat, lng = self.rng.choice(list(COORDINATES.values()))
+            url = f'/services/?pagination=cursor&lat={lat + self.rng.uniform(-0.1, 0.1):.4f}' \
+                  f'&lng={lng + self.rng.uniform(-0.1, 0.1):.4f}&radius={self.rng.choice([5, 10, 30])}'
+        self.call('services_filter', self.customer, 'get', url)
+
+    def detail(self):
+        service_id = self.rng.choice(self.driver.services)
+        self.call('service_detail', self.customer, 'get', f'/services/{service_id}/')
+        self.call('service_comments', self.customer, 'get', f'/services/{service_id}/comments/')
+
+    def my_bookings_list(self):
+        self.call('bookings_list', self.customer, 'get', '/bookings/?pagination=cursor')
+
+    def book(self):
+        response = self.call('booking_create', self.customer, 'post', '/bookings/',
+                             {'service': self.rng.choice(self.driver.services), 'quantity': 1},
+                             HTTP_IDEMPOTENCY_KEY=uuid.uuid4().hex)
+        if response.status_code == 201:
+            self.my_bookings.append(response.data['id'])
+
+    def cancel(self):
+        if not self.my_bookings:
+            return self.book()
+        booking_id = self.my_bookings.pop()
+        self.call('booking_cancel', self.customer, 'post', f'/bookings/{booking_id}/cancel/', {},
+                  HTTP_IDEMPOTENCY_KEY=uuid.uuid4().hex)
+
+    def stats(self):
+        self.call('stats_revenue', self.provider, 'get',
+                  f'/stats/revenue_by_{self.rng.choice(["month", "quarter", "year"])}/')
+
+    ACTIONS = {
+        'browse': browse, 'filter': filter_list, 'detail': detail, 'my_bookings': my_bookings_list,
+        'book': book, 'cancel': cancel, 'stats': stats,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy tải giả lập theo tỉ lệ thao tác của app (xem, lọc, chi tiết, đặt, hủy, thống kê) trên CSDL "
+        "đang cấu hình (SQLite hoặc MySQL), đo p50/p95/p99 và số truy vấn mỗi request, lưu kết quả JSON. "
+        "Nên chạy sau `generate_data`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Tổng số thao tác (mỗi luồng chia đều)")
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--users', type=int, default=200, help="Số khách hàng giả lập (mỗi người 1 token)")
+        parser.add_argument('--mix', help="Ví dụ: browse=50,book=10 (mặc định: %s)" %
+                            ','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()))
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="File JSON kết quả (mặc định bench-results/load-<CSDL>-<thời gian>.json)")
+        parser.add_argument('--compare', help="File JSON của lần chạy trước để so sánh p95")
+
+    def handle(self, *args, **options):
+        self.mix = parse_mix(options['mix'])
+        rng = random.Random(options['seed'])
+        self.services = list(TravelService.objects.filter(active=True, slots_available__gt=0)
+                             .order_by('id').values_list('id', flat=True))
+        self.categories = list(Category.objects.filter(active=True).order_by('id').values_list('id', flat=True))
+        if not self.services:
+            raise CommandError("Chưa có dữ liệu, chạy `python manage.py generate_data` trước")
+
+        customers = list(User.objects.filter(role=User.Role.CUSTOMER, is_active=True)
+                         .order_by('id').values_list('id', flat=True)[:options['users']])
+        providers = list(User.objects.filter(role=User.Role.PROVIDER, provided_services__isnull=False)
+                         .distinct().order_by('id').values_list('id', flat=True)[:options['users']]) or customers
+        tokens = self.create_tokens(customers + providers)
+
+        self.results = {}
+        self.lock = threading.Lock()
+        per_thread = options['requests'] // options['threads']
+        sessions = [
+            (random.Random(rng.random()), tokens[rng.choice(customers)], tokens[rng.choice(providers)])
+            for _ in range(options['threads'])
+        ]
+
+        def worker(thread_rng, customer_token, provider_token):
+            try:
+                session = Session(self, thread_rng, customer_token, provider_token)
+                names, weights = zip(*self.mix.items())
+                for action in thread_rng.choices(names, weights=weights, k=per_thread):
+                    # Mỗi ~20 thao tác đổi sang người dùng khác
+                    if thread_rng.random() < 0.05:
+                        session = Session(self, thread_rng, tokens[thread_rng.choice(customers)], provider_token)
+                    Session.ACTIONS[action](session)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=args) for args in sessions]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        get_access_token_model().objects.filter(token__in=tokens.values()).delete()
+
+        report = self.build_report(options, elapsed)
+        self.print_report(report)
+        self.save_report(report, options['output'])
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+    def create_tokens(self, user_ids):
+        application, _ = get_application_model().objects.get_or_create(
+            name='Load test', defaults={'client_type': 'public', 'authorization_grant_type': 'password'})
+        expires = timezone.now() + timedelta(hours=2)
+        tokens = {user_id: token_urlsafe(24) for user_id in user_ids}
+        get_access_token_model().objects.bulk_create([
+            get_access_token_model()(user_id=user_id, application=application, token=token,
+                                     expires=expires, scope='read write')
+            for user_id, token in tokens.items()
+        ])
+        return tokens
+
+    def record(self, endpoint, elapsed, queries, status_code):
+        with self.lock:
+            result = self.results.setdefault(endpoint, {'latencies': [], 'queries': [], 'status': {}})
+            result['latencies'].append(elapsed)
+            result['queries'].append(queries)
+            result['status'][status_code] = result['status'].get(status_code, 0) + 1
+
+    def build_report(self, options, elapsed):
+        endpoints = {}
+        for name, result in sorted(self.results.items()):
+            latencies, queries = result['latencies'], result['queries']
+            endpoints[name] = {
+                'count': len(latencies),
+                'errors': sum(n for code, n in result['status'].items() if code >= 500),
+                'status': {str(code): n for code, n in sorted(result['status'].items())},
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'mean_ms': round(sum(latencies) / len(latencies), 2),
+                'queries_mean': round(sum(queries) / len(queries), 2),
+                'queries_max': max(queries),
+            }
+        total = sum(e['count'] for e in endpoints.values())
+        return {
+            'started_at': timezone.now().isoformat(),
+            'commit': git_commit(),
+            'database': {
+                'vendor': connection.vendor,
+                'services': TravelService.objects.count(),
+                'bookings': Booking.objects.count(),
+            },
+            'options': {key: options[key] for key in ('requests', 'threads', 'users', 'seed')},
+            'mix': self.mix,
+            'elapsed_s': round(elapsed, 2),
+            'requests_per_s': round(total / elapsed, 1),
+            'endpoints': endpoints,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(f"{'API':<20}{'Số lần':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                          f"{'Truy vấn':>10}{'Max':>5}{'Lỗi 5xx':>9}")
+        for name, e in report['endpoints'].items():
+            self.stdout.write(f"{name:<20}{e['count']:>8}{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}"
+                              f"{e['queries_mean']:>10.2f}{e['queries_max']:>5}{e['errors']:>9}")
+        self.stdout.write(f"{report['requests_per_s']} request/giây trong {report['elapsed_s']} giây "
+                          f"({report['database']['vendor']})")
+
+    def save_report(self, report, path):
+        if not path:
+            stamp = timezone.localtime().strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(settings.BASE_DIR, 'bench-results', f"load-{connection.vendor}-{stamp}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Đã lưu kết quả vào {path}"))
+
+    def compare(self, report, path):
+        with open(path, encoding='utf-8') as f:
+            previous = json.load(f)
+        self.stdout.write(f"So với {path} (commit {previous.get('commit')}):")
+        for name, e in report['endpoints'].items():
+            before = previous['endpoints'].get(name)
+            if not before:
+                continue
+            change = (e['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            self.stdout.write(f"  {name:<20} p95 {before['p95_ms']:>8.1f} -> {e['p95_ms']:>8.1f} ms ({change:+.0f}%)"
+                              f"  truy vấn {before['queries_mean']:.2f} -> {e['queries_mean']:.2f}")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from travel.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Xóa theo lô các Idempotency-Key đã quá hạn (IDEMPOTENCY_KEY_TTL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        total = purge_expired_keys(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Đã xóa {total} key quá hạn"))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from travel.recommendations import rebuild_recommendations, top_k
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại gợi ý dịch vụ tương tự (top-K theo đơn / lượt thích chung) và điểm thịnh hành. "
+        "Mặc định chỉ tính lại dịch vụ có thay đổi từ lần chạy trước; chạy định kỳ bằng cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Tính lại toàn bộ dịch vụ")
+        parser.add_argument('--top-k', type=int, default=top_k())
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        run = rebuild_recommendations(full=options['full'], k=options['top_k'], log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Tính toàn bộ' if run.full else 'Tính tăng dần'}: {run.services} dịch vụ "
+            f"({time.perf_counter() - started:.1f} giây)"
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from travel.models import RevenueRollup
+from travel.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Tính lại toàn bộ bảng tổng hợp doanh thu (RevenueRollup) từ các đơn CONFIRMED"
+
+    def handle(self, *args, **options):
+        rebuild_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Đã ghi {RevenueRollup.objects.count()} dòng tổng hợp"))
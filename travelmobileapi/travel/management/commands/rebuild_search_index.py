@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from travel.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Xây dựng lại chỉ mục tìm kiếm (SearchToken) cho toàn bộ dịch vụ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Đã ghi {total} từ khóa vào chỉ mục"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from travel.aggregates import rebuild_service_aggregates
+from travel.models import TravelService
+
+
+class Command(BaseCommand):
+    help = "Tính lại avg_rating, rating_sum/count, booking_count và like_count của dịch vụ từ dữ liệu gốc"
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help="Chỉ tính lại các dịch vụ có id này")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = TravelService.objects.all()
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+
+        total = rebuild_service_aggregates(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Đã cập nhật thống kê cho {total} dịch vụ"))
@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Đo theo từng request: số câu SQL + tổng thời gian SQL, thời gian serializer, tổng thời gian xử lý.
+# Request / câu SQL chậm được ghi log kèm tên view và được gộp thành histogram theo route
+# (xem API /metrics/ dành cho admin). Header Server-Timing chỉ gửi về khi METRICS_SERVER_TIMING = True
+# (mặc định theo DEBUG) để client không xem được thời gian SQL trên production.
+# Serializer chỉ được đo khi view lấy qua SerializerTimingMixin / timed(), không sửa lớp của DRF.
+# METRICS_ENABLED = False (mặc định theo DEBUG): middleware tự gỡ khỏi chuỗi middleware
+# (MiddlewareNotUsed), không gắn hook vào CSDL nên không tốn thêm gì.
+
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+_current = ContextVar('travel_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('request', 'queries', 'db_ms', 'serializer_ms', 'lock')
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        # Các phần chạy song song trong view async (travel/async_views.py) cùng cộng vào 1 request
+        self.lock = threading.Lock()
+
+    @property
+    def view_name(self):
+        # URL không khớp route nào gộp chung 1 nhóm, tránh mỗi đường dẫn lạ tạo 1 histogram
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else '<unmatched>'
+
+
+class RouteStats:
+    """Histogram thời gian xử lý của 1 route, số lượng theo các mốc BUCKETS_MS (mốc cuối là +Inf)"""
+    __slots__ = ('count', 'total_ms', 'max_ms', 'queries', 'db_ms', 'serializer_ms', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = self.max_ms = self.db_ms = self.serializer_ms = 0.0
+        self.queries = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, total_ms, metrics):
+        self.count += 1
+        self.total_ms += total_ms
+        self.max_ms = max(self.max_ms, total_ms)
+        self.queries += metrics.queries
+        self.db_ms += metrics.db_ms
+        self.serializer_ms += metrics.serializer_ms
+        self.buckets[bisect_left(BUCKETS_MS, total_ms)] += 1
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 2),
+            'max_ms': round(self.max_ms, 2),
+            'queries_mean': round(self.queries / self.count, 2),
+            'db_mean_ms': round(self.db_ms / self.count, 2),
+            'serializer_mean_ms': round(self.serializer_ms / self.count, 2),
+            'histogram': {f'le_{bound}': n for bound, n in zip([*BUCKETS_MS, 'inf'], self.buckets)},
+        }
+
+
+# Số liệu gộp trong bộ nhớ của từng tiến trình (giống cache LocMem)
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+def record(route, total_ms, metrics):
+    with _routes_lock:
+        stats = _routes.get(route)
+        if stats is None:
+            stats = _routes[route] = RouteStats()
+        stats.add(total_ms, metrics)
+
+
+def snapshot():
+    with _routes_lock:
+        return {route: stats.as_dict() for route, stats in sorted(_routes.items())}
+
+
+def reset():
+    with _routes_lock:
+        _routes.clear()
+
+
+def slow_query_ms():
+    return getattr(settings, 'METRICS_SLOW_QUERY_MS', 100)
+
+
+def slow_request_ms():
+    return getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500)
+
+
+def sql_timer(execute, sql, params, many, context):
+    """execute_wrapper gắn vào mọi kết nối CSDL, chỉ đo khi đang trong 1 request có đo"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = (time.perf_counter() - started) * 1000
+        with metrics.lock:
+            metrics.queries += 1
+            metrics.db_ms += elapsed
+        if elapsed >= slow_query_ms():
+            logger.warning("Câu SQL chậm %.1f ms [%s] %s: %s", elapsed, metrics.view_name,
+                           metrics.request.path, sql[:1000])
+
+
+def install_sql_timer(connection, **kwargs):
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+# Lớp con có đo thời gian của từng lớp serializer, tạo 1 lần cho mỗi lớp
+_timed_classes = {}
+
+
+def _timed_class(cls):
+    timed_class = _timed_classes.get(cls)
+    if timed_class is None:
+        def data(self):
+            metrics = _current.get()
+            if metrics is None:
+                return cls.data.fget(self)
+            started = time.perf_counter()
+            try:
+                return cls.data.fget(self)
+            finally:
+                with metrics.lock:
+                    metrics.serializer_ms += (time.perf_counter() - started) * 1000
+
+        timed_class = _timed_classes[cls] = type(cls.__name__, (cls,), {
+            'data': property(data), '_timed': True, '__module__': cls.__module__,
+        })
+    return timed_class
+
+
+def timed(serializer):
+    """
+    Đo thời gian serializer.data của riêng serializer này (chỉ khi request đang được đo).
+    Nested serializer chạy qua to_representation nên không bị tính 2 lần.
+    """
+    if _current.get() is not None and not getattr(serializer, '_timed', False):
+        serializer.__class__ = _timed_class(type(serializer))
+    return serializer
+
+
+class SerializerTimingMixin:
+    """Mixin cho ViewSet: serializer lấy qua get_serializer() được đo thời gian"""
+
+    def get_serializer(self, *args, **kwargs):
+        return timed(super().get_serializer(*args, **kwargs))
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(install_sql_timer, dispatch_uid='travel.metrics.install_sql_timer')
+        for connection in connections.all(initialized_only=True):
+            install_sql_timer(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics(request)
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def finish(self, request, response, metrics, started):
+        # Phản hồi dạng stream (NDJSON) còn chạy truy vấn sau thời điểm này, chỉ tính phần đã chạy
+        total_ms = (time.perf_counter() - started) * 1000
+        if getattr(settings, 'METRICS_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_ms:.1f};desc="{metrics.queries} queries", '
+                f'serializer;dur={metrics.serializer_ms:.1f}, total;dur={total_ms:.1f}'
+            )
+        route = f'{request.method} {metrics.view_name}'
+        record(route, total_ms, metrics)
+        if total_ms >= slow_request_ms():
+            logger.warning("Request chậm %.1f ms [%s] %s: %d câu SQL (%.1f ms), serializer %.1f ms",
+                           total_ms, route, request.get_full_path(), metrics.queries, metrics.db_ms,
+                           metrics.serializer_ms)
+        return response
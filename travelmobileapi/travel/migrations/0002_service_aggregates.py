@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:54
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_aggregates(apps, schema_editor):
+    TravelService = apps.get_model('travel', 'TravelService')
+    Rating = apps.get_model('travel', 'Rating')
+    Booking = apps.get_model('travel', 'Booking')
+
+    ratings = {
+        r['service']: r for r in Rating.objects.filter(active=True).values('service')
+        .annotate(total=Sum('rate'), count=Count('id'))
+    }
+    bookings = dict(
+        Booking.objects.filter(status='CONFIRMED').values('service')
+        .annotate(count=Count('id')).values_list('service', 'count')
+    )
+    for service in TravelService.objects.all():
+        rating = ratings.get(service.id, {'total': 0, 'count': 0})
+        service.rating_sum = rating['total']
+        service.rating_count = rating['count']
+        service.avg_rating = rating['total'] / rating['count'] if rating['count'] else 0
+        service.booking_count = bookings.get(service.id, 0)
+        service.save(update_fields=['rating_sum', 'rating_count', 'avg_rating', 'booking_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelservice',
+            name='avg_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='travelservice',
+            name='booking_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='travelservice',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='travelservice',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
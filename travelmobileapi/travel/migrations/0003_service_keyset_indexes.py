@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0002_service_aggregates'),
+    ]
+
+    # Index của các cột sắp xếp / phân trang con trỏ (không đặt `active` đầu index, xem TravelService.Meta)
+    operations = [
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['price', 'id'], name='service_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['created_date', 'id'], name='service_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['avg_rating', 'id'], name='service_avg_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['booking_count', 'id'], name='service_booking_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['category', 'price', 'id'], name='service_cate_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['category', 'created_date', 'id'], name='service_cate_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['category', 'avg_rating', 'id'], name='service_cate_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['category', 'booking_count', 'id'], name='service_cate_booking_idx'),
+        ),
+    ]
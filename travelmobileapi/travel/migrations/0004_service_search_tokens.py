@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:56
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Chép từ travel/search.py tại thời điểm tạo migration (migration không import code của app);
+# đổi cách tách từ về sau thì chạy `python manage.py rebuild_search_index`
+FIELD_WEIGHTS = {'name': 2, 'location': 1}
+MAX_TOKEN_LENGTH = 64
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFD', (text or '').lower().replace('đ', 'd'))
+    text = ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+    return [t[:MAX_TOKEN_LENGTH] for t in TOKEN_RE.findall(text)]
+
+
+def index_existing_services(apps, schema_editor):
+    TravelService = apps.get_model('travel', 'TravelService')
+    SearchToken = apps.get_model('travel', 'SearchToken')
+    tokens = []
+    for service in TravelService.objects.all():
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(service, field)):
+                weights[token] = weights.get(token, 0) + weight
+        tokens.extend(SearchToken(token=t, service_id=service.pk, weight=w) for t, w in weights.items())
+    SearchToken.objects.bulk_create(tokens, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0003_service_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.SmallIntegerField(default=1)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='travel.travelservice')),
+            ],
+            options={
+                'unique_together': {('token', 'service')},
+            },
+        ),
+        migrations.RunPython(index_existing_services, migrations.RunPython.noop),
+    ]
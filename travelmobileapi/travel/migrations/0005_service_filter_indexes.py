@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0004_service_search_tokens'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['start_date'], name='service_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['category', 'start_date'], name='service_cate_start_idx'),
+        ),
+    ]
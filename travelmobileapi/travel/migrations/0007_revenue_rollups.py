@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:11
+
+from datetime import date
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def periods(created_date):
+    # Chép từ travel.rollups.periods tại thời điểm tạo migration (migration không import code của app)
+    day = timezone.localtime(created_date).date()
+    return {
+        'MONTH': date(day.year, day.month, 1),
+        'QUARTER': date(day.year, (day.month - 1) // 3 * 3 + 1, 1),
+        'YEAR': date(day.year, 1, 1),
+    }
+
+
+def backfill_rollups(apps, schema_editor):
+    Booking = apps.get_model('travel', 'Booking')
+    RevenueRollup = apps.get_model('travel', 'RevenueRollup')
+    totals = {}
+    for booking in Booking.objects.filter(status='CONFIRMED').select_related('service'):
+        for granularity, period in periods(booking.created_date).items():
+            key = (booking.service.provider_id, granularity, period)
+            revenue, count = totals.get(key, (0, 0))
+            totals[key] = (revenue + booking.total_price, count + 1)
+    RevenueRollup.objects.bulk_create([
+        RevenueRollup(provider_id=provider_id, granularity=granularity, period=period,
+                      total_revenue=revenue, count=count)
+        for (provider_id, granularity, period), (revenue, count) in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0006_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('MONTH', 'Tháng'), ('QUARTER', 'Quý'), ('YEAR', 'Năm')], max_length=10)),
+                ('period', models.DateField()),
+                ('total_revenue', models.DecimalField(decimal_places=0, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'period'], name='rollup_granularity_period_idx')],
+                'unique_together': {('provider', 'granularity', 'period')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
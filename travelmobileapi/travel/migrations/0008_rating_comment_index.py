@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0007_revenue_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['service', 'active', 'created_date', 'id'], name='rating_service_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0008_rating_comment_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'created_date', 'id'], name='booking_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['service', 'created_date', 'id'], name='booking_service_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['provider', 'created_date', 'id'], name='service_provider_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0009_provider_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelservice',
+            name='image_derived',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='avatar_derived',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0010_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'created_date'], name='booking_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0011_booking_hold_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelservice',
+            name='geo_cell',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='travelservice',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='travelservice',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['geo_cell'], name='service_geo_cell_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0012_service_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='check_in',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='check_out',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='travelservice',
+            name='nightly',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ServiceNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slots_total', models.IntegerField()),
+                ('slots_available', models.IntegerField()),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='travel.travelservice')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'slots_available', 'service'], name='night_date_slots_idx')],
+                'unique_together': {('service', 'date')},
+            },
+        ),
+    ]
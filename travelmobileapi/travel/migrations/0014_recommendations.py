@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0013_service_nights'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_date', models.DateTimeField()),
+                ('finished_date', models.DateTimeField(null=True)),
+                ('full', models.BooleanField(default=False)),
+                ('services', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ServiceNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.SmallIntegerField()),
+                ('score', models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='travelservice',
+            name='popularity',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_date', 'service'], name='booking_updated_service_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['updated_date', 'service'], name='like_updated_service_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['popularity', 'id'], name='service_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelservice',
+            index=models.Index(fields=['category', 'popularity', 'id'], name='service_cate_popularity_idx'),
+        ),
+        migrations.AddField(
+            model_name='serviceneighbor',
+            name='neighbor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='travel.travelservice'),
+        ),
+        migrations.AddField(
+            model_name='serviceneighbor',
+            name='service',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='travel.travelservice'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='serviceneighbor',
+            unique_together={('service', 'rank')},
+        ),
+    ]
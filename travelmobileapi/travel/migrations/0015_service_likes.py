@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:08
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_like_count(apps, schema_editor):
+    TravelService = apps.get_model('travel', 'TravelService')
+    Like = apps.get_model('travel', 'Like')
+
+    counts = Like.objects.filter(active=True).values('service').annotate(count=Count('id'))
+    for service_id, count in counts.values_list('service', 'count'):
+        TravelService.objects.filter(pk=service_id).update(like_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0014_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='travelservice',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['user', 'active', 'updated_date'], name='like_user_updated_idx'),
+        ),
+        migrations.RunPython(backfill_like_count, migrations.RunPython.noop),
+    ]
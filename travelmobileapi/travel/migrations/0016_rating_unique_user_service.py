@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:38
+
+from django.db import migrations
+from django.db.models import Count, Max, Sum
+
+
+def remove_duplicate_ratings(apps, schema_editor):
+    # Giữ đánh giá mới nhất (id lớn nhất) của mỗi (user, service), tính lại điểm của các dịch vụ bị ảnh hưởng
+    Rating = apps.get_model('travel', 'Rating')
+    TravelService = apps.get_model('travel', 'TravelService')
+
+    duplicates = Rating.objects.values('user', 'service').annotate(count=Count('id'), keep=Max('id')) \
+        .filter(count__gt=1)
+    services = set()
+    for row in duplicates:
+        Rating.objects.filter(user=row['user'], service=row['service']).exclude(id=row['keep']).delete()
+        services.add(row['service'])
+
+    for service_id in services:
+        totals = Rating.objects.filter(service=service_id, active=True).aggregate(total=Sum('rate'), count=Count('id'))
+        total, count = totals['total'] or 0, totals['count']
+        TravelService.objects.filter(pk=service_id).update(
+            rating_sum=total, rating_count=count, avg_rating=total / count if count else 0,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0015_service_likes'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='rating',
+            unique_together={('user', 'service')},
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def count_confirmed_bookings(apps, schema_editor):
+    # booking_count trước đây tính cả đơn PENDING, nay chỉ tính đơn CONFIRMED
+    TravelService = apps.get_model('travel', 'TravelService')
+    Booking = apps.get_model('travel', 'Booking')
+
+    TravelService.objects.update(booking_count=0)
+    counts = Booking.objects.filter(status='CONFIRMED').values('service').annotate(count=Count('id'))
+    for service_id, count in counts.values_list('service', 'count'):
+        TravelService.objects.filter(pk=service_id).update(booking_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('travel', '0016_rating_unique_user_service'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_confirmed_bookings, migrations.RunPython.noop),
+    ]
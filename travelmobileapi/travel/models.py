@@ -1,8 +1,11 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from ckeditor.fields import RichTextField
 from cloudinary.models import CloudinaryField
 
+from .geo import grid_cell
+
 
 class User(AbstractUser):
 
@@ -13,6 +16,8 @@ class User(AbstractUser):
 
     # avatar = CloudinaryField('avatar', null=True)
     avatar = models.ImageField(upload_to='avatars/%Y/%m', null=True)
+    # Tên file avatar đã có ảnh thu nhỏ (xem travel/images.py), khác avatar.name -> chưa tạo xong
+    avatar_derived = models.CharField(max_length=100, blank=True, default='', editable=False)
     role = models.CharField(max_length=20, choices=Role.choices, default=Role.CUSTOMER)
     is_verified = models.BooleanField(default=False)
 
@@ -43,6 +48,10 @@ class TravelService(BaseModel):
     description = RichTextField()
     price = models.DecimalField(max_digits=12, decimal_places=0)
     location = models.CharField(max_length=255)
+    # Tọa độ cho tìm kiếm "gần tôi"; geo_cell là ô lưới chứa tọa độ, tự tính khi lưu (xem travel/geo.py)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geo_cell = models.BigIntegerField(null=True, blank=True, editable=False)
 
     # Sửa: Thêm end_date để hỗ trợ Khách sạn (Check-in/Check-out)
     start_date = models.DateTimeField()  # Tour: Ngày đi | Hotel: Check-in
@@ -51,12 +60,58 @@ class TravelService(BaseModel):
     duration = models.CharField(max_length=50, null=True, blank=True)  # Ví dụ: "3N2Đ"
     slots_total = models.IntegerField(default=10)
     slots_available = models.IntegerField(default=10)
+    # Bán theo đêm (khách sạn, homestay): mỗi đêm trong [start_date, end_date) có slots_total chỗ riêng,
+    # lưu ở ServiceNight; slots_available của dịch vụ khi đó không dùng để giữ chỗ (xem travel/inventory.py)
+    nightly = models.BooleanField(default=False)
 
     image = models.ImageField(upload_to='services/%Y/%m', null=True)  # Hoặc CloudinaryField
+    image_derived = models.CharField(max_length=100, blank=True, default='', editable=False)  # Như User.avatar_derived
 
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='services')
     provider = models.ForeignKey(User, on_delete=models.CASCADE, related_name='provided_services')
 
+    # Thống kê lưu sẵn (denormalized), cập nhật trong travel/aggregates.py và travel/inventory.py
+    # Chạy lệnh `python manage.py rebuild_service_stats` để tính lại từ đầu
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    avg_rating = models.FloatField(default=0)
+    booking_count = models.IntegerField(default=0)  # Số đơn đã xác nhận (CONFIRMED)
+    like_count = models.IntegerField(default=0)  # Số lượt thích đang bật, cập nhật trong travel/likes.py
+    # Điểm thịnh hành: lượt đặt / thích gần đây có giảm dần theo thời gian, tính offline (travel/recommendations.py)
+    popularity = models.FloatField(default=0)
+
+    class Meta:
+        # Index ghép khớp với phân trang keyset: ([category,] cột sắp xếp, id)
+        # và các bộ lọc khoảng giá / ngày khởi hành.
+        # Không đặt `active` đầu index: SQLite dịch filter(active=True) thành `WHERE active`
+        # nên không seek được theo cột này, và active gần như luôn = True (độ chọn lọc thấp).
+        indexes = [
+            models.Index(fields=['price', 'id'], name='service_price_idx'),
+            models.Index(fields=['created_date', 'id'], name='service_created_idx'),
+            models.Index(fields=['avg_rating', 'id'], name='service_avg_rating_idx'),
+            models.Index(fields=['booking_count', 'id'], name='service_booking_count_idx'),
+            models.Index(fields=['start_date'], name='service_start_date_idx'),
+            models.Index(fields=['category', 'price', 'id'], name='service_cate_price_idx'),
+            models.Index(fields=['category', 'created_date', 'id'], name='service_cate_created_idx'),
+            models.Index(fields=['category', 'avg_rating', 'id'], name='service_cate_rating_idx'),
+            models.Index(fields=['category', 'booking_count', 'id'], name='service_cate_booking_idx'),
+            models.Index(fields=['category', 'start_date'], name='service_cate_start_idx'),
+            # Danh sách "dịch vụ của tôi" của nhà cung cấp: WHERE provider = ? ORDER BY created_date, id
+            models.Index(fields=['provider', 'created_date', 'id'], name='service_provider_created_idx'),
+            # Lọc thô theo ô lưới khi tìm dịch vụ gần 1 điểm: WHERE geo_cell BETWEEN ? AND ? OR ...
+            models.Index(fields=['geo_cell'], name='service_geo_cell_idx'),
+            # Danh sách thịnh hành (toàn bộ / theo danh mục): ORDER BY popularity DESC, id DESC
+            models.Index(fields=['popularity', 'id'], name='service_popularity_idx'),
+            models.Index(fields=['category', 'popularity', 'id'], name='service_cate_popularity_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geo_cell'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -82,6 +137,21 @@ class Booking(BaseModel):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     payment_method = models.CharField(max_length=20, choices=PaymentMethod.choices, default=PaymentMethod.CASH)
 
+    # Chỉ có với dịch vụ bán theo đêm: giữ `quantity` chỗ cho mỗi đêm trong [check_in, check_out)
+    check_in = models.DateField(null=True, blank=True)
+    check_out = models.DateField(null=True, blank=True)
+
+    class Meta:
+        # Phân trang con trỏ danh sách đơn (mới nhất trước) của khách hàng / của từng dịch vụ
+        indexes = [
+            models.Index(fields=['user', 'created_date', 'id'], name='booking_user_created_idx'),
+            models.Index(fields=['service', 'created_date', 'id'], name='booking_service_created_idx'),
+            # Tìm đơn PENDING quá hạn giữ chỗ (xem travel/inventory.py: expire_pending_bookings)
+            models.Index(fields=['status', 'created_date'], name='booking_status_created_idx'),
+            # Dịch vụ có đơn mới / đổi trạng thái từ lần tính gợi ý trước (xem travel/recommendations.py)
+            models.Index(fields=['updated_date', 'service'], name='booking_updated_service_idx'),
+        ]
+
     def __str__(self):
         return f"Booking {self.id} - {self.user.username}"
 
@@ -94,13 +164,110 @@ class Rating(BaseModel):
     created_date = models.DateTimeField(auto_now_add=True)
     active = models.BooleanField(default=True)
 
+    class Meta:
+        # Mỗi user 1 đánh giá / dịch vụ (đánh giá lại = sửa điểm), 2 request đầu tiên song song không tạo 2 dòng
+        unique_together = ('user', 'service')
+        # Phục vụ phân trang bình luận: WHERE service = ? AND active ORDER BY created_date DESC, id DESC
+        indexes = [
+            models.Index(fields=['service', 'active', 'created_date', 'id'], name='rating_service_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.rate} sao"
 
 
 class Like(BaseModel):
+    # Bỏ thích = active=False (giữ dòng), thích lại bật active; xem travel/likes.py
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     service = models.ForeignKey(TravelService, on_delete=models.CASCADE)
 
     class Meta:
-        unique_together = ('user', 'service')
\ No newline at end of file
+        unique_together = ('user', 'service')
+        indexes = [
+            models.Index(fields=['updated_date', 'service'], name='like_updated_service_idx'),
+            # Danh sách "đã thích" của 1 user, mới thích gần nhất trước
+            models.Index(fields=['user', 'active', 'updated_date'], name='like_user_updated_idx'),
+        ]
+
+
+class ServiceNeighbor(models.Model):
+    # Top-K dịch vụ tương tự (cùng được đặt / thích bởi một nhóm khách), tính offline bằng
+    # `python manage.py rebuild_recommendations`, xem travel/recommendations.py
+    service = models.ForeignKey(TravelService, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(TravelService, on_delete=models.CASCADE, related_name='+')
+    rank = models.SmallIntegerField()  # 0 = giống nhất
+    score = models.FloatField()  # Độ tương đồng cosine
+
+    class Meta:
+        unique_together = ('service', 'rank')
+
+
+class RecommendationRun(models.Model):
+    # Mỗi lần tính lại gợi ý; lần sau chỉ tính lại các dịch vụ có đơn / lượt thích thay đổi từ started_date
+    started_date = models.DateTimeField()
+    finished_date = models.DateTimeField(null=True)
+    full = models.BooleanField(default=False)
+    services = models.IntegerField(default=0)  # Số dịch vụ đã tính lại danh sách tương tự
+
+class ServiceNight(models.Model):
+    # Số chỗ từng đêm của dịch vụ bán theo đêm (TravelService.nightly), tạo/cập nhật khi lưu dịch vụ
+    # và bị trừ/hoàn bằng UPDATE có điều kiện trên cả khoảng ngày của đơn, xem travel/inventory.py
+    service = models.ForeignKey(TravelService, on_delete=models.CASCADE, related_name='nights')
+    date = models.DateField()
+    slots_total = models.IntegerField()
+    slots_available = models.IntegerField()
+
+    class Meta:
+        unique_together = ('service', 'date')
+        indexes = [
+            # Tìm dịch vụ còn chỗ mọi đêm trong khoảng: WHERE date >= ? AND date < ? AND slots_available >= ?
+            # GROUP BY service -> đọc hết từ index, không cần đọc bảng
+            models.Index(fields=['date', 'slots_available', 'service'], name='night_date_slots_idx'),
+        ]
+
+
+class SearchToken(models.Model):
+    # Chỉ mục đảo (inverted index) cho tìm kiếm dịch vụ: mỗi từ đã bỏ dấu -> dịch vụ chứa từ đó
+    # Được đồng bộ qua signal trong travel/signals.py, xem travel/search.py
+    token = models.CharField(max_length=64)
+    service = models.ForeignKey(TravelService, on_delete=models.CASCADE, related_name='search_tokens')
+    weight = models.SmallIntegerField(default=1)  # Từ trong tên nặng hơn từ trong địa điểm
+
+    class Meta:
+        unique_together = ('token', 'service')
+
+
+class IdempotencyKey(models.Model):
+    # Lưu phản hồi đầu tiên của request POST có header Idempotency-Key để trả lại khi app gửi lại
+    # (mạng chập chờn), xem travel/idempotency.py. Dọn key cũ bằng `manage.py purge_idempotency_keys`
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    fingerprint = models.CharField(max_length=40)  # sha1(method + path + body)
+    status_code = models.SmallIntegerField(null=True)  # null = request đầu tiên đang xử lý
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_date = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+
+class RevenueRollup(models.Model):
+    # Bảng tổng hợp doanh thu theo nhà cung cấp + kỳ (tháng/quý/năm) của đơn CONFIRMED,
+    # được cộng/trừ khi đơn vào/ra trạng thái CONFIRMED (xem travel/rollups.py)
+
+    class Granularity(models.TextChoices):
+        MONTH = 'MONTH', 'Tháng'
+        QUARTER = 'QUARTER', 'Quý'
+        YEAR = 'YEAR', 'Năm'
+
+    provider = models.ForeignKey(User, on_delete=models.CASCADE, related_name='revenue_rollups')
+    granularity = models.CharField(max_length=10, choices=Granularity.choices)
+    period = models.DateField()  # Ngày đầu kỳ
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=0, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('provider', 'granularity', 'period')
+        indexes = [
+            models.Index(fields=['granularity', 'period'], name='rollup_granularity_period_idx'),
+        ]
@@ -1,4 +1,139 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
 
 class ItemPaginator(pagination.PageNumberPagination):
-    page_size = 20
\ No newline at end of file
+    page_size = 20
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Phân trang kiểu con trỏ (keyset) cho cuộn vô hạn:
+    - Sắp xếp theo 1 cột trong `ordering_fields` + `id` làm khóa phụ để thứ tự luôn ổn định
+    - Trang sau lọc bằng điều kiện (cột, id) > (giá trị, id) của dòng cuối -> dùng được index, không OFFSET
+    - Không chạy COUNT(*), chỉ trả về link `next`
+    """
+    page_size = 20
+    cursor_query_param = 'cursor'
+    ordering_param = 'ordering'
+    ordering_fields = []
+    default_ordering = '-id'
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_param, '').split(',')[0].strip()
+        if ordering.lstrip('-') in self.ordering_fields:
+            return ordering
+        return self.default_ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            return value, int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound("Con trỏ phân trang không hợp lệ")
+
+    def encode_cursor(self, value, pk):
+        raw = json.dumps([value, pk], default=str).encode()
+        return urlsafe_b64encode(raw).decode('ascii')
+
+    def get_page_queryset(self, queryset, request):
+        """Sắp xếp + lọc theo con trỏ, trả về queryset của trang (chưa chạy truy vấn)"""
+        self.request = request
+        ordering = self.get_ordering(request)
+        self.field = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+
+        if self.field == 'id':
+            queryset = queryset.order_by(ordering)
+        else:
+            queryset = queryset.order_by(ordering, '-id' if descending else 'id')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, pk = cursor
+            op = 'lt' if descending else 'gt'
+            if self.field == 'id':
+                queryset = queryset.filter(**{f'id__{op}': pk})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk})
+                )
+
+        # Lấy dư 1 dòng để biết còn trang sau hay không
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Bản async cho các view ASGI (travel/async_views.py)
+        return self.set_page([row async for row in self.get_page_queryset(queryset, request)])
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = self.encode_cursor(getattr(last, self.field), last.pk)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ServiceCursorPagination(KeysetPagination):
+    ordering_fields = ['price', 'created_date', 'avg_rating', 'booking_count']
+    default_ordering = '-created_date'
+
+    def get_page_queryset(self, queryset, request):
+        # Khi đang tìm kiếm mà không chọn cách sắp xếp -> giữ thứ tự theo độ liên quan,
+        # tìm quanh 1 điểm (?lat=&lng=) -> gần nhất trước, và cho phép ?ordering=distance
+        annotations = queryset.query.annotations
+        self.default_ordering = type(self).default_ordering
+        self.ordering_fields = type(self).ordering_fields
+        if 'search_rank' in annotations:
+            self.default_ordering = '-search_rank'
+        elif 'distance' in annotations:
+            self.default_ordering = 'distance'
+        if 'distance' in annotations:
+            self.ordering_fields = [*self.ordering_fields, 'distance']
+        return super().get_page_queryset(queryset, request)
+
+
+class CommentCursorPagination(KeysetPagination):
+    # Bình luận luôn xếp mới nhất trước
+    page_size = 20
+    default_ordering = '-created_date'
+
+
+class LikeCursorPagination(KeysetPagination):
+    # Dịch vụ đã thích: mới thích (hoặc thích lại) gần nhất trước, dùng index (user, active, updated_date)
+    default_ordering = '-updated_date'
+
+
+class BookingCursorPagination(KeysetPagination):
+    # Đơn mới nhất trước, dùng index ([user | service], created_date, id)
+    default_ordering = '-created_date'
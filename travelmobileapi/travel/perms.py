@@ -16,3 +16,10 @@ class IsOwner(permissions.IsAuthenticated):
     def has_object_permission(self, request, view, obj):
         return super().has_permission(request, view) and request.user == obj.user
 
+
+class IsAdmin(permissions.BasePermission):
+    """
+    Chỉ Quản trị viên (role ADMIN, superuser luôn là ADMIN)
+    """
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.role == 'ADMIN'
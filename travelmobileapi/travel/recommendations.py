@@ -0,0 +1,183 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from .cache import SERVICES, bump_version
+from .models import Booking, Like, RecommendationRun, ServiceNeighbor, TravelService
+
+# Gợi ý "dịch vụ tương tự" và "thịnh hành", tính offline bằng `python manage.py rebuild_recommendations`:
+# - Ma trận thưa A (khách x dịch vụ): 1 nếu khách có đơn chưa hủy, + LIKE_WEIGHT nếu đã thích
+# - Độ tương đồng cosine giữa 2 dịch vụ = (A^T A)_ij / (|A_i| |A_j|), tính theo từng lô dòng
+#   (lô dịch vụ x mọi dịch vụ) nên bộ nhớ không tăng theo bình phương số dịch vụ
+# - Mỗi dịch vụ lưu top-K hàng xóm vào ServiceNeighbor, API chỉ đọc bảng này
+# - Chạy tăng dần: chỉ tính lại dịch vụ có đơn / lượt thích thay đổi từ lần chạy trước;
+#   danh sách của các dịch vụ khác có thể lệch dần nên thỉnh thoảng chạy --full (ví dụ hằng tuần)
+
+BOOKING_WEIGHT = 1.0
+LIKE_WEIGHT = 0.5
+CHUNK_SIZE = 1000
+POPULAR_DAYS = 30
+POPULAR_HALF_LIFE_DAYS = 7
+
+PAIR = np.dtype([('user', np.int64), ('service', np.int64)])
+
+
+def top_k():
+    return getattr(settings, 'RECOMMENDATION_TOP_K', 20)
+
+
+def _pairs(queryset):
+    return np.fromiter(queryset.values_list('user_id', 'service_id').iterator(chunk_size=10000), dtype=PAIR)
+
+
+def interaction_matrix(services):
+    """Ma trận thưa CSR khách x dịch vụ, cột theo thứ tự mảng `services` (id tăng dần)"""
+    sources = [
+        (_pairs(Booking.objects.exclude(status=Booking.Status.CANCELLED)), BOOKING_WEIGHT),
+        (_pairs(Like.objects.filter(active=True)), LIKE_WEIGHT),
+    ]
+    users = np.unique(np.concatenate([pairs['user'] for pairs, _ in sources]))
+
+    matrix = sparse.csr_matrix((len(users), len(services)))
+    for pairs, weight in sources:
+        # Bỏ dịch vụ đã ẩn, đổi id khách / dịch vụ sang chỉ số dòng / cột
+        columns = np.searchsorted(services, pairs['service'])
+        known = columns < len(services)
+        known[known] = services[columns[known]] == pairs['service'][known]
+        part = sparse.csr_matrix((np.ones(known.sum()), (np.searchsorted(users, pairs['user'][known]),
+                                                          columns[known])),
+                                 shape=matrix.shape)
+        part.sum_duplicates()
+        part.data[:] = weight  # Đặt nhiều lần cùng 1 dịch vụ chỉ tính 1 lần
+        matrix = matrix + part
+    return matrix
+
+
+def neighbors_for(matrix, rows, k):
+    """
+    Top-k hàng xóm của các dịch vụ ở chỉ số `rows`: trả về list (chỉ số dòng, chỉ số hàng xóm, điểm).
+    Nhân ma trận thưa cho cả lô, chỉ vòng lặp Python ở bước chọn top-k của từng dòng.
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    by_service = matrix.T.tocsr()
+
+    results = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        scores = sparse.diags(inverse[chunk]) @ (by_service[chunk] @ matrix) @ sparse.diags(inverse)
+        scores = scores.tocsr()
+        for i, row in enumerate(chunk):
+            begin, end = scores.indptr[i], scores.indptr[i + 1]
+            columns, values = scores.indices[begin:end], scores.data[begin:end]
+            keep = (columns != row) & (values > 0)
+            columns, values = columns[keep], values[keep]
+            if len(values) > k:
+                best = np.argpartition(-values, k)[:k]
+                columns, values = columns[best], values[best]
+            order = np.lexsort((columns, -values))
+            results.append((row, columns[order], values[order]))
+    return results
+
+
+def touched_services(since):
+    """Id dịch vụ có đơn / lượt thích được tạo hoặc đổi trạng thái từ `since`"""
+    booked = Booking.objects.filter(updated_date__gte=since).values_list('service_id', flat=True).distinct()
+    liked = Like.objects.filter(updated_date__gte=since).values_list('service_id', flat=True).distinct()
+    return set(booked) | set(liked)
+
+
+def save_neighbors(services, results):
+    """Thay danh sách tương tự của các dịch vụ trong `results`, mỗi lô 1 transaction"""
+    for start in range(0, len(results), CHUNK_SIZE):
+        chunk = results[start:start + CHUNK_SIZE]
+        with transaction.atomic():
+            ServiceNeighbor.objects.filter(service_id__in=[int(services[row]) for row, _, _ in chunk]).delete()
+            ServiceNeighbor.objects.bulk_create([
+                ServiceNeighbor(service_id=int(services[row]), neighbor_id=int(services[column]),
+                                rank=rank, score=float(score))
+                for row, columns, scores in chunk
+                for rank, (column, score) in enumerate(zip(columns, scores))
+            ], batch_size=5000)
+
+
+def rebuild_popularity(now=None):
+    """
+    Điểm thịnh hành = tổng lượt đặt (chưa hủy) + LIKE_WEIGHT x lượt thích trong POPULAR_DAYS ngày gần đây,
+    mỗi lượt giảm một nửa sau POPULAR_HALF_LIFE_DAYS ngày. Luôn tính lại toàn bộ (chỉ đọc dữ liệu gần đây),
+    chỉ ghi các dịch vụ có điểm thay đổi. Trả về số dịch vụ được cập nhật.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(days=POPULAR_DAYS)
+    sources = [
+        (Booking.objects.filter(created_date__gte=since).exclude(status=Booking.Status.CANCELLED), BOOKING_WEIGHT),
+        (Like.objects.filter(created_date__gte=since, active=True), LIKE_WEIGHT),
+    ]
+    scores = {}
+    for queryset, weight in sources:
+        rows = np.fromiter(
+            ((service_id, (now - created).total_seconds())
+             for service_id, created in queryset.values_list('service_id', 'created_date').iterator(chunk_size=10000)),
+            dtype=[('service', np.int64), ('age', np.float64)],
+        )
+        if not len(rows):
+            continue
+        ids, index = np.unique(rows['service'], return_inverse=True)
+        decayed = weight * np.exp2(-rows['age'] / (POPULAR_HALF_LIFE_DAYS * 86400))
+        for service_id, score in zip(ids.tolist(), np.bincount(index, weights=decayed).tolist()):
+            scores[service_id] = scores.get(service_id, 0) + score
+
+    current = dict(TravelService.objects.filter(popularity__gt=0).values_list('id', 'popularity'))
+    changed = [
+        TravelService(pk=service_id, popularity=round(scores.get(service_id, 0.0), 4))
+        for service_id in current.keys() | scores.keys()
+        if abs(current.get(service_id, 0.0) - round(scores.get(service_id, 0.0), 4)) > 1e-4
+    ]
+    with transaction.atomic():
+        TravelService.objects.bulk_update(changed, ['popularity'], batch_size=1000)
+    return len(changed)
+
+
+def rebuild_recommendations(full=False, k=None, log=None):
+    """
+    Tính lại gợi ý. full=False: chỉ các dịch vụ có thay đổi từ lần chạy trước (lần đầu luôn tính toàn bộ).
+    Trả về RecommendationRun của lần chạy này.
+    """
+    log = log or (lambda message: None)
+    k = k or top_k()
+    previous = RecommendationRun.objects.filter(finished_date__isnull=False).order_by('-started_date').first()
+    full = full or previous is None
+    run = RecommendationRun.objects.create(started_date=timezone.now(), full=full)
+
+    started = time.perf_counter()
+    services = np.array(sorted(TravelService.objects.filter(active=True).values_list('id', flat=True)),
+                        dtype=np.int64)
+    if full:
+        rows = np.arange(len(services))
+    else:
+        touched = np.array(sorted(touched_services(previous.started_date)), dtype=np.int64)
+        rows = np.flatnonzero(np.isin(services, touched))
+    log(f"Dịch vụ cần tính lại: {len(rows)}/{len(services)}")
+
+    if len(rows):
+        matrix = interaction_matrix(services)
+        log(f"Ma trận {matrix.shape[0]} khách x {matrix.shape[1]} dịch vụ, {matrix.nnz} ô khác 0 "
+            f"({time.perf_counter() - started:.1f}s)")
+        results = neighbors_for(matrix, rows, k)
+        log(f"Tính top-{k} tương tự ({time.perf_counter() - started:.1f}s)")
+        save_neighbors(services, results)
+        log(f"Ghi ServiceNeighbor ({time.perf_counter() - started:.1f}s)")
+
+    popular = rebuild_popularity()
+    log(f"Cập nhật điểm thịnh hành {popular} dịch vụ ({time.perf_counter() - started:.1f}s)")
+
+    run.services = len(rows)
+    run.finished_date = timezone.now()
+    run.save(update_fields=['services', 'finished_date'])
+    bump_version(SERVICES)
+    return run
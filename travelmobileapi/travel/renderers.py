@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Renderer nhanh thay cho JSONRenderer mặc định của DRF (xem REST_FRAMEWORK trong settings.py):
+# - JSON bằng orjson (viết bằng Rust), cùng định dạng với JSONRenderer: ngày giờ, UUID... vẫn qua
+#   JSONEncoder của DRF nên chuỗi trả về không đổi
+# - MessagePack khi client gửi Accept: application/msgpack (hoặc ?format=msgpack), nhỏ hơn JSON
+#   và giải mã nhanh hơn trên app
+# Decimal (price, total_price, tổng doanh thu) -> float như JSONRenderer (5500000 -> 5500000.0),
+# app đang đọc đúng định dạng này nên không đổi sang số nguyên
+
+_drf_default = JSONEncoder().default
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return _drf_default(obj)
+
+
+def dumps(data, sort_keys=False):
+    """Chuỗi JSON (bytes) cùng định dạng với JSONRenderer của DRF"""
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(data, default=_default, option=option)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # ?indent / Accept: application/json; indent=4 (xem trên trình duyệt): để DRF tự format
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True, datetime=False)
@@ -0,0 +1,125 @@
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
+from django.utils import timezone
+
+from .aggregates import apply_booking
+from .models import Booking, RevenueRollup, TravelService
+
+Granularity = RevenueRollup.Granularity
+
+TRUNCATES = {
+    Granularity.MONTH: TruncMonth,
+    Granularity.QUARTER: TruncQuarter,
+    Granularity.YEAR: TruncYear,
+}
+
+
+def periods(created_date):
+    """Ngày đầu tháng / quý / năm chứa thời điểm tạo đơn (theo TIME_ZONE, giống TruncMonth...)"""
+    day = timezone.localtime(created_date).date()
+    return {
+        Granularity.MONTH: date(day.year, day.month, 1),
+        Granularity.QUARTER: date(day.year, (day.month - 1) // 3 * 3 + 1, 1),
+        Granularity.YEAR: date(day.year, 1, 1),
+    }
+
+
+def _add(provider_id, granularity, period, revenue, count, create=True):
+    rows = RevenueRollup.objects.filter(provider_id=provider_id, granularity=granularity, period=period)
+    if rows.update(total_revenue=F('total_revenue') + revenue, count=F('count') + count) or not create:
+        return
+    try:
+        with transaction.atomic():
+            RevenueRollup.objects.create(provider_id=provider_id, granularity=granularity, period=period,
+                                         total_revenue=revenue, count=count)
+    except IntegrityError:
+        # Request khác vừa tạo dòng này -> cộng dồn vào dòng đó
+        rows.update(total_revenue=F('total_revenue') + revenue, count=F('count') + count)
+
+
+def _contribute(booking, sign, create=True):
+    """
+    Cộng (sign=1) / trừ (sign=-1) doanh thu + 1 đơn của `booking` vào các kỳ chứa ngày tạo đơn,
+    và vào số đơn đã xác nhận (booking_count) của dịch vụ
+    """
+    provider_id = TravelService.objects.filter(pk=booking.service_id) \
+        .values_list('provider_id', flat=True).first()
+    if provider_id is None:
+        return
+    apply_booking(booking.service_id, sign)
+    for granularity, period in periods(booking.created_date).items():
+        _add(provider_id, granularity, period, sign * booking.total_price, sign, create=create)
+
+
+def record_transition(booking, old_status, new_status, create=True):
+    """
+    Cập nhật bảng tổng hợp khi đơn vào (+) hoặc rời (-) trạng thái CONFIRMED.
+    create=False: chỉ trừ vào dòng đang có (dùng khi xóa dây chuyền, dòng tổng hợp có thể đã bị xóa trước)
+    """
+    confirmed = Booking.Status.CONFIRMED
+    if (old_status == confirmed) == (new_status == confirmed):
+        return
+    _contribute(booking, 1 if new_status == confirmed else -1, create=create)
+
+
+def record_change(old, new, create=True):
+    """
+    Đơn được sửa qua save() / bị xóa (vd trang Admin): `old`, `new` là đơn trước / sau khi sửa
+    (None: chưa có / đã xóa). Trừ phần của bản cũ nếu đang CONFIRMED rồi cộng phần của bản mới,
+    nên đổi trạng thái, sửa total_price hay đổi dịch vụ của đơn CONFIRMED đều khớp dữ liệu gốc.
+    """
+    def contribution(booking):
+        if booking is None or booking.status != Booking.Status.CONFIRMED:
+            return None
+        return booking.service_id, booking.total_price
+
+    if contribution(old) == contribution(new):
+        return
+    if contribution(old) is not None:
+        _contribute(old, -1, create=create)
+    if contribution(new) is not None:
+        _contribute(new, 1, create=create)
+
+
+def expected_rollups():
+    """Tính lại tổng hợp trực tiếp từ bảng Booking: {(provider_id, granularity, period): (doanh thu, số đơn)}"""
+    result = {}
+    confirmed = Booking.objects.filter(status=Booking.Status.CONFIRMED)
+    for granularity, trunc in TRUNCATES.items():
+        rows = confirmed.annotate(period=trunc('created_date')).values('service__provider', 'period') \
+            .annotate(total_revenue=Sum('total_price'), count=Count('id'))
+        for row in rows:
+            period = row['period']
+            if hasattr(period, 'date'):
+                period = timezone.localtime(period).date()
+            result[(row['service__provider'], granularity, period)] = (row['total_revenue'], row['count'])
+    return result
+
+
+def rebuild_rollups():
+    with transaction.atomic():
+        RevenueRollup.objects.all().delete()
+        RevenueRollup.objects.bulk_create([
+            RevenueRollup(provider_id=provider_id, granularity=granularity, period=period,
+                          total_revenue=revenue, count=count)
+            for (provider_id, granularity, period), (revenue, count) in expected_rollups().items()
+        ], batch_size=1000)
+
+
+def find_mismatches():
+    """So sánh bảng tổng hợp với dữ liệu gốc, trả về danh sách (khóa, giá trị đang lưu, giá trị đúng)"""
+    expected = expected_rollups()
+    stored = {
+        (r.provider_id, r.granularity, r.period): (r.total_revenue, r.count)
+        for r in RevenueRollup.objects.all()
+    }
+    mismatches = []
+    for key in expected.keys() | stored.keys():
+        have = stored.get(key, (0, 0))
+        want = expected.get(key, (0, 0))
+        if have != want:
+            mismatches.append((key, have, want))
+    return sorted(mismatches, key=str)
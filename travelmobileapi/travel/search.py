@@ -0,0 +1,101 @@
+import re
+import unicodedata
+
+from django.db.models import OuterRef, Q, Subquery, Sum
+from rest_framework import filters
+
+from .models import SearchToken, TravelService
+
+# Trọng số của từ theo trường: khớp tên dịch vụ được ưu tiên hơn khớp địa điểm
+FIELD_WEIGHTS = {'name': 2, 'location': 1}
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TOKENS = 8
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold(text):
+    """Bỏ dấu tiếng Việt và chuyển về chữ thường: "Đà Nẵng" -> "da nang" """
+    text = (text or '').lower().replace('đ', 'd')
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(c for c in text if unicodedata.category(c) != 'Mn')
+
+
+def tokenize(text):
+    return [t[:MAX_TOKEN_LENGTH] for t in _TOKEN_RE.findall(fold(text))]
+
+
+def build_tokens(service):
+    """Trả về danh sách SearchToken (chưa lưu) cho một dịch vụ"""
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(service, field)):
+            weights[token] = weights.get(token, 0) + weight
+    return [SearchToken(token=token, service_id=service.pk, weight=weight) for token, weight in weights.items()]
+
+
+def index_services(services, batch_size=2000):
+    """Đánh chỉ mục lại cho danh sách dịch vụ (xóa từ cũ, ghi từ mới theo lô)"""
+    services = list(services)
+    SearchToken.objects.filter(service__in=[s.pk for s in services]).delete()
+    tokens = [token for service in services for token in build_tokens(service)]
+    SearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+    return len(tokens)
+
+
+def rebuild_index(batch_size=2000):
+    SearchToken.objects.all().delete()
+    total = 0
+    batch = []
+    for service in TravelService.objects.only('id', 'name', 'location').iterator(chunk_size=batch_size):
+        batch.extend(build_tokens(service))
+        if len(batch) >= batch_size:
+            SearchToken.objects.bulk_create(batch, batch_size=batch_size)
+            total += len(batch)
+            batch = []
+    SearchToken.objects.bulk_create(batch, batch_size=batch_size)
+    return total + len(batch)
+
+
+def search_services(queryset, text):
+    """
+    Lọc queryset dịch vụ theo từ khóa, gắn thêm cột `search_rank` (độ liên quan).
+    - Mọi từ trong câu tìm kiếm đều phải khớp (AND)
+    - Từ cuối cùng được khớp theo tiền tố để hỗ trợ gõ tới đâu tìm tới đó
+    - Điều kiện `token = ...` / khoảng tiền tố dùng được index (token, service)
+    """
+    tokens = list(dict.fromkeys(tokenize(text)))[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return queryset
+
+    # Khớp tiền tố bằng khoảng [prefix, prefix kế tiếp) thay cho LIKE 'prefix%',
+    # vì LIKE không phân biệt hoa thường của SQLite không dùng được index
+    prefix = tokens[-1]
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    conditions = [Q(token=t) for t in tokens[:-1]]
+    conditions.append(Q(token__gte=prefix, token__lt=upper))
+
+    # Mỗi từ là một điều kiện IN trên index (token, service): dịch vụ phải khớp đủ mọi từ
+    matched = Q()
+    for condition in conditions:
+        queryset = queryset.filter(id__in=SearchToken.objects.filter(condition).values('service'))
+        matched |= condition
+
+    # Độ liên quan = tổng trọng số các từ đã khớp (tên x2, địa điểm x1)
+    rank = (SearchToken.objects.filter(matched, service=OuterRef('pk'))
+            .values('service').annotate(rank=Sum('weight')).values('rank'))
+    return queryset.annotate(search_rank=Subquery(rank))
+
+
+class ServiceSearchFilter(filters.BaseFilterBackend):
+    """Tìm kiếm dịch vụ theo tên/địa điểm qua ?search=, kết quả xếp theo độ liên quan"""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        if not text.strip():
+            return queryset
+        queryset = search_services(queryset, text)
+        if 'search_rank' in queryset.query.annotations:
+            queryset = queryset.order_by('-search_rank', '-id')
+        return queryset
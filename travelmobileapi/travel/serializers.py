@@ -1,5 +1,8 @@
+from django.core.exceptions import FieldDoesNotExist
 from rest_framework import serializers
 from .models import Category, TravelService, User, Booking, Rating
+from .images import srcset
+from .inventory import hold_ttl
 
 from .models import Like
 
@@ -19,6 +22,12 @@ class UserSerializer(serializers.ModelSerializer):
         user.save()
         return user
 
+    def to_representation(self, instance):
+        # Ảnh thu nhỏ theo kích thước: {'thumb': {'webp': url, 'jpeg': url}, 'card': ..., 'full': ...}
+        rep = super().to_representation(instance)
+        rep['avatar_srcset'] = srcset(instance.avatar, instance.avatar_derived)
+        return rep
+
     # def to_representation(self, instance):
     #     # Hàm này giúp hiển thị full link ảnh nếu cần
     #     rep = super().to_representation(instance)
@@ -32,19 +41,110 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name']
 
 
-class TravelServiceSerializer(serializers.ModelSerializer):
+COORDINATE_KWARGS = {
+    'latitude': {'min_value': -90, 'max_value': 90},
+    'longitude': {'min_value': -180, 'max_value': 180},
+}
+
+
+def _names(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Chọn field trả về qua query param của request GET: ?fields=id,name,price hoặc ?omit=description.
+    Field không có trong serializer -> lỗi 400. Dùng kèm load_only() để chỉ SELECT các cột cần thiết.
+    - extra_fields: field thêm trong to_representation (không khai báo), vẫn chọn / bỏ được
+    - load_columns: cột model cần nạp cho field có tên khác cột (mặc định cùng tên nếu là cột của model)
+    - always_load: cột luôn nạp (khóa phân trang / sắp xếp, tránh truy vấn bổ sung cho từng dòng)
+    """
+    extra_fields = []
+    load_columns = {}
+    always_load = ['id']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        self.selected = self.selected_fields(request.query_params)
+        if self.selected is not None:
+            for name in list(self.fields):
+                if name not in self.selected:
+                    self.fields.pop(name)
+
+    @classmethod
+    def readable_fields(cls):
+        if '_readable' not in cls.__dict__:
+            cls._readable = {name for name, field in cls().fields.items() if not field.write_only}
+            cls._readable |= set(cls.extra_fields)
+        return cls._readable
+
+    @classmethod
+    def selected_fields(cls, params):
+        """Tập field được chọn, None nếu không gửi ?fields= / ?omit= (trả về mọi field)"""
+        fields, omit = _names(params.get('fields')), _names(params.get('omit'))
+        if not fields and not omit:
+            return None
+        unknown = (fields | omit) - cls.readable_fields()
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Field không hợp lệ: {', '.join(sorted(unknown))}"})
+        return (fields or cls.readable_fields()) - omit
+
+    def include(self, name):
+        return getattr(self, 'selected', None) is None or name in self.selected
+
+    @classmethod
+    def columns(cls, selected):
+        model = cls.Meta.model
+        columns = set(cls.always_load)
+        for name in cls.readable_fields() if selected is None else selected:
+            if name in cls.load_columns:
+                columns.update(cls.load_columns[name])
+                continue
+            try:
+                columns.add(model._meta.get_field(name).name)
+            except FieldDoesNotExist:
+                pass  # Field tính toán / annotate (distance, search_rank...)
+        return columns
+
+
+def load_only(queryset, serializer_class, params):
+    """SELECT đúng các cột serializer cần theo ?fields= / ?omit= (không nạp description khi không dùng)"""
+    columns = serializer_class.columns(serializer_class.selected_fields(params))
+    queryset = queryset.select_related(None).only(*columns)
+    if 'category' in columns:
+        queryset = queryset.select_related('category')
+    return queryset
+
+
+class TravelServiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     category_id = serializers.IntegerField(write_only=True)
     category = CategorySerializer(read_only=True)
 
     # Field tính toán (read_only)
     avg_rating = serializers.FloatField(read_only=True)  # Điểm trung bình
     booking_count = serializers.IntegerField(read_only=True)  # Số lượt đặt
+    like_count = serializers.IntegerField(read_only=True)  # Số lượt thích
+    distance = serializers.FloatField(read_only=True)  # Khoảng cách (km), chỉ có khi lọc ?lat=&lng=
+
+    # is_liked: thêm theo user đang đăng nhập sau khi lấy dữ liệu từ cache chung (xem travel/likes.py)
+    extra_fields = ['image_srcset', 'is_liked']
+    # category_id chỉ cần cột khóa ngoại, danh mục lồng nhau (category) mới cần JOIN
+    load_columns = {'image': ['image', 'image_derived'], 'image_srcset': ['image', 'image_derived'],
+                    'category_id': ['category_id']}
+    # Cột sắp xếp / con trỏ phân trang của danh sách dịch vụ
+    always_load = ['id', 'price', 'created_date', 'avg_rating', 'booking_count']
 
     def to_representation(self, instance):
         # Hàm này giúp hiển thị full link ảnh nếu cần
         rep = super().to_representation(instance)
-        if instance.image:
+        if 'image' in rep and instance.image:
             rep['image'] = instance.image.url
+        # App dùng thumb cho danh sách, card cho trang chủ, full cho trang chi tiết
+        if self.include('image_srcset'):
+            rep['image_srcset'] = srcset(instance.image, instance.image_derived)
         return rep
 
     class Meta:
@@ -53,22 +153,88 @@ class TravelServiceSerializer(serializers.ModelSerializer):
                   'start_date', 'end_date', 'duration',  # Nhớ thêm end_date
                   'slots_total', 'slots_available', 'image',
                   'category', 'category_id', 'provider', 'active',
-                  'avg_rating', 'booking_count']  # Thêm vào fields
+                  'avg_rating', 'booking_count', 'like_count',  # Thêm vào fields
+                  'latitude', 'longitude', 'distance', 'nightly']
+        extra_kwargs = COORDINATE_KWARGS
+
+
+class TravelServiceListSerializer(TravelServiceSerializer):
+    """
+    Bản gọn cho danh sách (thẻ dịch vụ trên app): không có description (HTML dài) và danh mục lồng nhau,
+    view nạp bằng load_only() nên cột description cũng không được SELECT.
+    Gửi ?fields=... để lấy field của bản đầy đủ (TravelServiceSerializer).
+    """
+    category_id = serializers.IntegerField(read_only=True)
+
+    class Meta(TravelServiceSerializer.Meta):
+        fields = ['id', 'name', 'price', 'location', 'start_date', 'end_date', 'image', 'slots_available',
+                  'category_id', 'avg_rating', 'booking_count', 'like_count', 'distance', 'nightly']
+        read_only_fields = fields
+
+
+class ServiceImportSerializer(serializers.ModelSerializer):
+    # Kiểm tra 1 dòng của file nhập dịch vụ hàng loạt (CSV / JSON), xem travel/imports.py
+    # context['category_ids']: id các danh mục đang hoạt động, nạp 1 lần cho cả file
+    category_id = serializers.IntegerField()
+    description = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_category_id(self, value):
+        if value not in self.context['category_ids']:
+            raise serializers.ValidationError("Danh mục không tồn tại")
+        return value
+
+    def validate(self, attrs):
+        if attrs.get('end_date') and attrs['end_date'] < attrs['start_date']:
+            raise serializers.ValidationError({'end_date': "Ngày kết thúc phải sau ngày bắt đầu"})
+        if attrs.get('slots_total', 0) < 0:
+            raise serializers.ValidationError({'slots_total': "Số chỗ không được âm"})
+        return attrs
+
+    class Meta:
+        model = TravelService
+        fields = ['name', 'description', 'price', 'location', 'start_date', 'end_date', 'duration',
+                  'slots_total', 'category_id', 'latitude', 'longitude']
+        extra_kwargs = COORDINATE_KWARGS
+
+
+class BookingServiceSerializer(serializers.ModelSerializer):
+    # Bản rút gọn của dịch vụ nhúng trong đơn hàng (không có description, thống kê...)
+    category = CategorySerializer(read_only=True)
+
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        if instance.image:
+            rep['image'] = instance.image.url
+        rep['image_srcset'] = srcset(instance.image, instance.image_derived)
+        return rep
+
+    class Meta:
+        model = TravelService
+        fields = ['id', 'name', 'price', 'location', 'start_date', 'end_date', 'duration', 'image', 'category']
 
 
 class BookingSerializer(serializers.ModelSerializer):
-    # Cho phép hiển thị thông tin Service chi tiết khi xem đơn hàng
-    service_detail = TravelServiceSerializer(source='service', read_only=True)
+    # Cho phép hiển thị thông tin Service khi xem đơn hàng
+    # Queryset cần select_related('service__category') để không phát sinh truy vấn theo từng đơn
+    service_detail = BookingServiceSerializer(source='service', read_only=True)
+    # Hạn thanh toán của đơn PENDING, quá hạn đơn tự hủy và hoàn chỗ (xem travel/inventory.py)
+    hold_expires_at = serializers.SerializerMethodField()
+
+    def get_hold_expires_at(self, obj):
+        if obj.status != Booking.Status.PENDING:
+            return None
+        return serializers.DateTimeField().to_representation(obj.created_date + hold_ttl())
 
     class Meta:
         model = Booking
         fields = ['id', 'user', 'service', 'service_detail', 'quantity', 'total_price',
-                  'status', 'payment_method', 'created_date']
-        read_only_fields = ['user', 'total_price', 'created_date'] # Không cho user sửa mấy cái này
+                  'status', 'payment_method', 'created_date', 'hold_expires_at', 'check_in', 'check_out']
+        # Không cho user sửa mấy cái này (đổi ngày phải hủy rồi đặt lại để giữ/hoàn chỗ từng đêm)
+        read_only_fields = ['user', 'total_price', 'created_date', 'check_in', 'check_out']
 
 
 class RatingSerializer(serializers.ModelSerializer):
-    user = UserSerializer(read_only=True)  # Để hiện Avatar, Tên người comment
+    user = UserSerializer(read_only=True)  # Để hiện Avatar, Tên người comment (cần select_related('user'))
 
     class Meta:
         model = Rating
@@ -0,0 +1,106 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from oauth2_provider.models import get_access_token_model
+
+from .authentication import forget_tokens
+
+from .cache import CATEGORIES, SERVICES, bump_version
+from .images import schedule_derivatives
+from .inventory import sync_nights
+from .models import Booking, Category, Rating, TravelService, User
+from .rollups import record_change
+from .search import index_services
+
+UNKNOWN = object()
+
+
+@receiver(post_save, sender=TravelService)
+def reindex_service(sender, instance, created, update_fields=None, **kwargs):
+    # Bỏ qua các lần save chỉ cập nhật số chỗ / thống kê (không đổi tên, địa điểm)
+    if update_fields is not None and not {'name', 'location'} & set(update_fields):
+        return
+    index_services([instance])
+
+
+# Dịch vụ bán theo đêm: tạo / cập nhật số chỗ từng đêm theo khoảng ngày và tổng số chỗ
+@receiver(post_save, sender=TravelService)
+def update_service_nights(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'nightly', 'start_date', 'end_date', 'slots_total'} & set(update_fields):
+        return
+    sync_nights(instance)
+
+
+# Ảnh dịch vụ / avatar mới tải lên -> tạo ảnh thu nhỏ WebP/JPEG ở thread pool (xem travel/images.py)
+@receiver(post_save, sender=TravelService)
+def resize_service_image(sender, instance, **kwargs):
+    schedule_derivatives('service', instance)
+
+
+@receiver(post_save, sender=User)
+def resize_avatar(sender, instance, **kwargs):
+    schedule_derivatives('avatar', instance)
+
+
+# Token bị thu hồi (revoke / đăng xuất / refresh xoay vòng đều xóa dòng AccessToken) hoặc thay đổi
+# -> xóa khỏi cache xác thực ngay (xem travel/authentication.py)
+@receiver(post_save, sender=get_access_token_model())
+@receiver(post_delete, sender=get_access_token_model())
+def forget_cached_token(sender, instance, **kwargs):
+    forget_tokens([instance.token_checksum])
+
+
+@receiver(post_save, sender=User)
+def forget_cached_user_tokens(sender, instance, created, **kwargs):
+    # User trong cache xác thực phải khớp DB (vai trò, is_active...) nên đổi user là xóa cache token
+    if not created:
+        forget_tokens(get_access_token_model().objects.filter(user=instance)
+                      .values_list('token_checksum', flat=True))
+
+
+@receiver(post_save, sender=TravelService)
+@receiver(post_delete, sender=TravelService)
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+def invalidate_services_cache(sender, **kwargs):
+    bump_version(SERVICES)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories_cache(sender, **kwargs):
+    # Dịch vụ có nhúng thông tin danh mục nên cũng phải làm mới
+    bump_version(CATEGORIES, SERVICES)
+
+
+# Theo dõi trạng thái, giá, dịch vụ của đơn để cập nhật bảng tổng hợp doanh thu khi đơn vào/ra CONFIRMED
+# hoặc đơn CONFIRMED bị sửa giá / dịch vụ (lưu qua save(), ví dụ trang Admin).
+# Các chỗ đổi trạng thái bằng .update() tự gọi record_transition.
+ROLLUP_FIELDS = ('status', 'total_price', 'service_id')
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_state(sender, instance, **kwargs):
+    # Dùng __dict__ để không phát sinh truy vấn khi trường bị defer
+    instance._original_state = {name: instance.__dict__.get(name, UNKNOWN) for name in ROLLUP_FIELDS}
+
+
+def original_booking(instance):
+    """Bản sao của đơn với giá trị lúc nạp từ DB; trường bị defer (chưa nạp thì chưa sửa) lấy giá trị hiện tại"""
+    values = {name: getattr(instance, name) if value is UNKNOWN else value
+              for name, value in instance._original_state.items()}
+    return Booking(pk=instance.pk, created_date=instance.created_date, **values)
+
+
+@receiver(post_save, sender=Booking)
+def update_revenue_rollups(sender, instance, created, **kwargs):
+    if created:
+        record_change(None, instance)
+    elif instance._original_state['status'] is not UNKNOWN:
+        record_change(original_booking(instance), instance)
+    remember_booking_state(sender, instance)
+
+
+@receiver(post_delete, sender=Booking)
+def remove_from_revenue_rollups(sender, instance, **kwargs):
+    if instance._original_state['status'] is not UNKNOWN:
+        record_change(original_booking(instance), None, create=False)
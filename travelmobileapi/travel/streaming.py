@@ -0,0 +1,83 @@
+import csv
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+STREAM_PARAM = 'stream'
+NDJSON = 'ndjson'
+CHUNK_SIZE = 500
+
+
+def wants_ndjson(request):
+    return request.query_params.get(STREAM_PARAM) == NDJSON
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Duyệt queryset theo từng lô `chunk_size` dòng bằng keyset trên id (id giảm dần):
+    mỗi lô là 1 câu SELECT ... WHERE id < ? LIMIT n, không OFFSET.
+    Khác với queryset.iterator(), cách này không phụ thuộc server-side cursor
+    (PyMySQL mặc định tải hết kết quả vào bộ nhớ) nên bộ nhớ không tăng theo số dòng.
+    """
+    queryset = queryset.order_by('-id')
+    last_id = None
+    while True:
+        chunk = queryset if last_id is None else queryset.filter(id__lt=last_id)
+        rows = list(chunk[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1].pk
+
+
+async def _async_chunks(chunks):
+    # Mỗi lô (truy vấn ORM + serialize) chạy ở thread đồng bộ, event loop chỉ gửi dữ liệu đi
+    chunks = iter(chunks)
+    while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+        yield chunk
+
+
+def _response(chunks, request, content_type):
+    """
+    StreamingHttpResponse gửi dần từng lô. Chạy dưới ASGI (uvicorn) thì phải là async iterator:
+    Django gặp iterator đồng bộ sẽ đọc hết vào bộ nhớ rồi mới gửi (kèm cảnh báo).
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['X-Accel-Buffering'] = 'no'  # Nginx không gom cả phản hồi rồi mới gửi
+    return response
+
+
+def stream_ndjson(queryset, serializer_class, context=None, chunk_size=CHUNK_SIZE):
+    """Trả về từng dòng JSON (NDJSON), serialize và gửi lần lượt từng lô"""
+    def lines():
+        for rows in iter_chunks(queryset, chunk_size):
+            data = serializer_class(rows, many=True, context=context).data
+            yield b''.join(dumps(item) + b'\n' for item in data)
+
+    return _response(lines(), (context or {}).get('request'), 'application/x-ndjson; charset=utf-8')
+
+
+class _Echo:
+    # csv.writer ghi vào "file" này chỉ để lấy lại chuỗi của từng dòng
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset, header, row, filename, request=None, chunk_size=CHUNK_SIZE):
+    """Trả về file CSV tải dần theo từng lô, row(obj) -> list giá trị của 1 dòng"""
+    def lines():
+        writer = csv.writer(_Echo())
+        # BOM để Excel đọc đúng tiếng Việt (UTF-8)
+        yield '\ufeff' + writer.writerow(header)
+        for rows in iter_chunks(queryset, chunk_size):
+            yield ''.join(writer.writerow(row(obj)) for obj in rows)
+
+    response = _response(lines(), request, 'text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
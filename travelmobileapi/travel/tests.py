@@ -1,3 +1,979 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import warnings
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+import brotli
+import msgpack
+from PIL import Image
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import get_access_token_model, get_application_model
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import metrics, streaming
+from .aggregates import rating_histogram
+from .images import FORMATS, VARIANTS, derivative_name, generate_derivatives
+from .imports import fill_created_ids
+from .inventory import expire_pending_bookings, hold_ttl
+from .models import Booking, Category, Rating, RevenueRollup, ServiceNight, TravelService, User
+from .recommendations import rebuild_recommendations
+from .renderers import MessagePackRenderer, ORJSONRenderer
+from .rollups import find_mismatches
+
+
+def full_scans(sql):
+    """
+    Chạy EXPLAIN cho câu SQL, trả về danh sách bảng bị quét toàn bộ (không dùng index).
+    - SQLite: dòng `SCAN <bảng>` không kèm `USING INDEX`
+    - MySQL: cột `type` = ALL
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            details = [row[-1] for row in cursor.fetchall()]
+            return [m.group(1) for m in map(re.compile(r'^SCAN (\w+)$').match, details) if m]
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql)
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [row['table'] for row in rows if row['type'] == 'ALL']
+    raise NotImplementedError(f"Chưa hỗ trợ EXPLAIN cho {connection.vendor}")
+
+
+# Dữ liệu mẫu dùng chung cho các test bên dưới (TestCase / TransactionTestCase đều gọi được)
+def make_provider(username='provider'):
+    return User.objects.create_user(username, password='123456', role='PROVIDER', is_verified=True)
+
+
+def make_customers(count, prefix='customer'):
+    return [User.objects.create_user(f'{prefix}{i}', password='123456') for i in range(count)]
+
+
+def make_service(provider, category, **fields):
+    """TravelService với các trường bắt buộc điền sẵn, fields ghi đè giá trị mặc định"""
+    defaults = {'name': 'Tour Huế', 'description': '', 'price': 100000, 'location': 'Huế',
+                'start_date': timezone.now()}
+    return TravelService.objects.create(**{**defaults, **fields}, category=category, provider=provider)
+
+
+class CatalogueQueryPlanTests(TestCase):
+    """Các truy vấn danh sách dịch vụ có bộ lọc phải dùng index, không quét toàn bảng"""
+
+    URLS = [
+        '/services/?category_id={cate}',
+        '/services/?min_price=1000000&max_price=3000000',
+        '/services/?category_id={cate}&max_price=3000000',
+        '/services/?month=6',
+        '/services/?month=6&year=2030&category_id={cate}',
+        '/services/?start_from=2030-01-01&start_to=2030-01-31',
+        '/services/?pagination=cursor',
+        '/services/?pagination=cursor&ordering=price',
+        '/services/?pagination=cursor&ordering=-avg_rating&category_id={cate}',
+        '/services/?pagination=cursor&ordering=-booking_count',
+        '/services/?pagination=cursor&ordering=created_date&category_id={cate}',
+        '/services/?search=da nang',
+        '/services/?lat=16.05&lng=108.2&radius=30',
+        '/services/?lat=16.05&lng=108.2&radius=30&max_price=3000000&month=6',
+        '/services/?pagination=cursor&lat=16.05&lng=108.2&radius=100&ordering=distance',
+        '/services/?check_in=2030-01-01&check_out=2030-01-04&quantity=2',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        provider = make_provider()
+        cls.categories = [Category.objects.create(name=name) for name in ['Tour', 'Khách sạn', 'Vé']]
+        now = timezone.now()
+        for i in range(60):
+            make_service(provider, cls.categories[i % 3], name=f'Tour Đà Nẵng {i}', price=500000 * (i % 10 + 1),
+                         location='Đà Nẵng', start_date=now + timedelta(days=7 * i))
+
+    def setUp(self):
+        cache.clear()  # Phản hồi GET được cache, cần xóa để mỗi test đều chạy truy vấn thật
+
+    def assert_no_full_scan(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        for query in ctx.captured_queries:
+            if 'travel_travelservice' in query['sql'] and query['sql'].startswith('SELECT'):
+                self.assertEqual(full_scans(query['sql']), [], f"{url}\n{query['sql']}")
+
+    def test_filters_use_indexes(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assert_no_full_scan(url.format(cate=self.categories[0].id))
+
+    def test_next_cursor_page_uses_indexes(self):
+        response = APIClient().get('/services/?pagination=cursor&ordering=price')
+        self.assert_no_full_scan(response.data['next'])
+
+    def test_nearby_filter_orders_by_distance(self):
+        # Sơn Trà (~8 km), Hội An (~25 km), Huế (~80 km) tính từ trung tâm Đà Nẵng
+        services = TravelService.objects.order_by('id')[:3]
+        for service, (lat, lng) in zip(services, [(15.880, 108.338), (16.463, 107.590), (16.100, 108.250)]):
+            service.latitude, service.longitude = lat, lng
+            service.save(update_fields=['latitude', 'longitude'])
+
+        response = APIClient().get('/services/?lat=16.054&lng=108.202&radius=30')
+        self.assertEqual([s['id'] for s in response.data['results']], [services[2].id, services[0].id])
+        self.assertLess(response.data['results'][0]['distance'], 10)
+
+        response = APIClient().get('/services/?pagination=cursor&lat=16.054&lng=108.202&radius=100'
+                                   '&ordering=-distance')
+        self.assertEqual([s['id'] for s in response.data['results']],
+                         [services[1].id, services[0].id, services[2].id])
+        self.assertEqual(APIClient().get('/services/?lat=16.054').status_code, 400)
+        self.assertEqual(APIClient().get('/services/?ordering=distance').status_code, 200)
+
+    def test_facets_come_from_one_grouped_query(self):
+        cate = self.categories[0].id
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().get(f'/services/facets/?category_id={cate}&price_buckets=1000000,3000000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(response.data['categories'], [{'id': cate, 'name': 'Tour', 'count': 20}])
+        # Cứ 10 dịch vụ của danh mục: 2 dịch vụ <= 1tr, 4 dịch vụ trong (1tr, 3tr], 4 dịch vụ > 3tr
+        self.assertEqual([p['count'] for p in response.data['prices']], [4, 8, 8])
+        self.assertEqual(response.data['prices'][1], {'min_price': 1000001, 'max_price': 3000000, 'count': 8})
+        self.assertEqual(sum(m['count'] for m in response.data['months']), 20)
+
+        # Lần sau lấy từ cache (cùng phiên bản dữ liệu với danh sách dịch vụ)
+        with CaptureQueriesContext(connection) as ctx:
+            APIClient().get(f'/services/facets/?category_id={cate}&price_buckets=1000000,3000000')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_list_does_not_load_description(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().get('/services/?pagination=cursor')
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertTrue(all('description' not in q['sql'] for q in ctx.captured_queries))
+
+        response = APIClient().get('/services/?fields=id,name,category')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'category'})
+        self.assertEqual(response.data['results'][0]['category']['name'], 'Tour')
+        response = APIClient().get(f'/services/{response.data["results"][0]["id"]}/?omit=description,image_srcset')
+        self.assertNotIn('description', response.data)
+        self.assertIn('category', response.data)
+        self.assertEqual(APIClient().get('/services/?fields=id,password').status_code, 400)
+
+    def test_month_filter_is_a_date_range(self):
+        response = APIClient().get('/services/?month=13')
+        self.assertEqual(response.status_code, 400)
+
+        with CaptureQueriesContext(connection) as ctx:
+            APIClient().get('/services/?month=6')
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('extract', sql.lower())
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Mỗi API danh sách phải chạy một số truy vấn cố định, không tăng theo số dòng (không N+1).
+    Dữ liệu mẫu có nhiều dòng hơn ngân sách nên chỉ cần một truy vấn/dòng là test sẽ fail.
+    """
+    ROWS = 25
+
+    # (url, ngân sách truy vấn) theo vai trò; force_authenticate nên không tính truy vấn xác thực
+    # Danh sách dịch vụ có thêm 1 câu IN lấy is_liked cho cả trang
+    BUDGETS = {
+        'ADMIN': [
+            ('/services/', 3), ('/services/?pagination=cursor', 2), ('/categories/', 2),
+            ('/bookings/', 2), ('/services/{service}/comments/', 3),
+            ('/stats/revenue_by_month/', 1), ('/stats/revenue_by_year/', 1),
+        ],
+        'PROVIDER': [
+            ('/services/', 3), ('/services/my-services/', 1), ('/bookings/', 2),
+            ('/services/{service}/comments/', 3), ('/stats/revenue_by_quarter/', 1),
+        ],
+        'CUSTOMER': [
+            ('/services/', 3), ('/services/?search=tour', 3), ('/categories/', 2),
+            ('/bookings/', 2), ('/services/{service}/comments/', 3),
+        ],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            'ADMIN': User.objects.create_superuser('admin', password='123456'),
+            'PROVIDER': make_provider(),
+            'CUSTOMER': User.objects.create_user('customer', password='123456'),
+        }
+        customers = make_customers(cls.ROWS)
+        categories = [Category.objects.create(name=f'Danh mục {i}') for i in range(cls.ROWS)]
+        services = [make_service(cls.users['PROVIDER'], categories[i], name=f'Tour {i}') for i in range(cls.ROWS)]
+        cls.service = services[0]
+        for i, customer in enumerate(customers):
+            Rating.objects.create(user=customer, service=cls.service, rate=5, comment='Tốt')
+            for user in (customer, cls.users['CUSTOMER']):
+                Booking.objects.create(user=user, service=services[i], quantity=1, total_price=100000,
+                                       status=Booking.Status.CONFIRMED)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_endpoints_stay_within_budget(self):
+        for role, endpoints in self.BUDGETS.items():
+            client = APIClient()
+            client.force_authenticate(self.users[role])
+            for url, budget in endpoints:
+                url = url.format(service=self.service.id)
+                with self.subTest(role=role, url=url):
+                    with CaptureQueriesContext(connection) as ctx:
+                        response = client.get(url)
+                    self.assertEqual(response.status_code, 200, response.content)
+                    data = response.data
+                    self.assertGreater(len(data['results'] if isinstance(data, dict) else data), 0)
+                    self.assertLessEqual(
+                        len(ctx.captured_queries), budget,
+                        '\n'.join(q['sql'] for q in ctx.captured_queries),
+                    )
+
+    def test_ndjson_stream_reads_in_chunks(self):
+        client = APIClient()
+        client.force_authenticate(self.users['PROVIDER'])
+        for url, rows in [('/services/my-services/?stream=ndjson', self.ROWS), ('/bookings/?stream=ndjson', 2 * self.ROWS)]:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as ctx:
+                    response = client.get(url)
+                    self.assertIsInstance(response, StreamingHttpResponse)
+                    lines = b''.join(response.streaming_content).decode().splitlines()
+                self.assertEqual(len(lines), rows)
+                # Mỗi lô đúng 1 truy vấn (không N+1), số lô = ceil(số dòng / CHUNK_SIZE)
+                self.assertLessEqual(len(ctx.captured_queries), rows // streaming.CHUNK_SIZE + 1)
+
+    async def test_streams_are_async_under_asgi(self):
+        # AsyncClient chạy qua ASGIHandler như uvicorn: phải nhận async iterator để gửi dần từng lô
+        provider = self.users['PROVIDER']
+        application = await get_application_model().objects.acreate(
+            name='App', client_type='public', authorization_grant_type='password', user=provider)
+        await get_access_token_model().objects.acreate(
+            user=provider, application=application, token='provider-token',
+            expires=timezone.now() + timedelta(hours=1), scope='read write')
+        client = AsyncClient()
+
+        for url, lines in [('/bookings/?stream=ndjson', 2 * self.ROWS), ('/bookings/export/', 2 * self.ROWS + 1)]:
+            with self.subTest(url=url), warnings.catch_warnings():
+                warnings.simplefilter('error')  # Django cảnh báo khi phải đọc hết iterator đồng bộ
+                response = await client.get(url, headers={'Authorization': 'Bearer provider-token'})
+                self.assertTrue(response.is_async)
+                chunks = [chunk async for chunk in response.streaming_content]
+            self.assertGreater(len(chunks), 0)
+            self.assertEqual(len(b''.join(chunks).splitlines()), lines)
+
+    def test_csv_export_streams_filtered_bookings(self):
+        client = APIClient()
+        client.force_authenticate(self.users['PROVIDER'])
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/bookings/export/?status=confirmed&date_from=2000-01-01')
+            self.assertIsInstance(response, StreamingHttpResponse)
+            lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lines), 2 * self.ROWS + 1)  # + dòng tiêu đề
+        self.assertLessEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(client.get('/bookings/export/?status=PAID').status_code, 400)
+
+    def test_bulk_import_reports_row_errors(self):
+        client = APIClient()
+        client.force_authenticate(self.users['PROVIDER'])
+        category = self.service.category_id
+        rows = [
+            {'name': 'Tour nhập 1', 'price': 100000, 'location': 'Huế', 'start_date': '2030-01-01T08:00:00',
+             'category_id': category, 'slots_total': 5},
+            {'name': 'Tour nhập 2', 'price': 'abc', 'location': 'Huế', 'start_date': '2030-01-01T08:00:00',
+             'category_id': category},
+            {'name': 'Tour nhập 3', 'price': 100000, 'location': 'Huế', 'start_date': '2030-01-01T08:00:00',
+             'category_id': 0},
+        ]
+        response = client.post('/services/import/', rows, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([e['row'] for e in response.data['errors']], [2, 3])
+        service = TravelService.objects.get(name='Tour nhập 1')
+        self.assertEqual((service.provider, service.slots_available), (self.users['PROVIDER'], 5))
+
+        # File CSV hỏng ở dòng 3: 2 dòng đầu vẫn được ghi, phản hồi chỉ ra dòng hỏng
+        lines = ['name,price,location,start_date,category_id'] + [
+            f'{name},100000,Huế,2030-01-01T08:00:00,{category}' for name in ['Tour CSV 1', 'Tour CSV 2']
+        ] + ['"' + 'x' * 200000 + '",1,Huế,2030-01-01T08:00:00,1']
+        upload = SimpleUploadedFile('services.csv', '\n'.join(lines).encode())
+        response = client.post('/services/import/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((response.data['created'], response.data['row']), (2, 3))
+        self.assertEqual(TravelService.objects.filter(name__startswith='Tour CSV').count(), 2)
+
+    def test_created_ids_are_found_without_returning_ids(self):
+        # Giả lập MySQL (bulk_create không trả id) khi nhà cung cấp khác ghi xen vào cùng lúc
+        provider, category = self.users['PROVIDER'], self.service.category
+        services = TravelService.objects.bulk_create([
+            TravelService(name=name, description='', price=100000, location='Huế', start_date=timezone.now(),
+                          category=category, provider=provider)
+            for name in ['Tour A', 'Tour A', 'Tour B']
+        ])
+        make_service(make_provider('provider2'), category, name='Tour A', price=1)
+        ids = [service.pk for service in services]
+        for service in services:
+            service.pk = None
+        fill_created_ids(services)
+        self.assertEqual([service.pk for service in services], ids)
+
+class KeysetPaginationTests(TestCase):
+    """Duyệt hết các trang cursor khi nhiều dòng trùng giá trị cột sắp xếp: không trùng, không sót (id là khóa phụ)"""
+
+    def setUp(self):
+        cache.clear()
+        provider, category = make_provider(), Category.objects.create(name='Tour')
+        for i in range(45):
+            make_service(provider, category, name=f'Tour {i}', price=100000 * (i % 2 + 1))
+        # Chỉ 3 giá trị created_date khác nhau cho 45 dòng, xen kẽ theo id
+        moments = [timezone.now() - timedelta(days=day) for day in range(3)]
+        for i, service in enumerate(TravelService.objects.order_by('id')):
+            TravelService.objects.filter(pk=service.pk).update(created_date=moments[i % 3])
+
+    def walk(self, ordering):
+        ids, url = [], f'/services/?pagination=cursor&ordering={ordering}'
+        while url:
+            response = APIClient().get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(s['id'] for s in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walk_covers_every_row_once(self):
+        for ordering in ['-created_date', 'created_date', 'price', '-price']:
+            with self.subTest(ordering=ordering):
+                expected = list(TravelService.objects.order_by(ordering, '-id' if ordering[0] == '-' else 'id')
+                                .values_list('id', flat=True))
+                self.assertEqual(self.walk(ordering), expected)
+
+
+class SearchTests(TestCase):
+    """Tìm kiếm ?search= không phân biệt dấu / hoa thường, từ cuối khớp tiền tố, xếp theo độ liên quan"""
+
+    def setUp(self):
+        cache.clear()
+        provider, category = make_provider(), Category.objects.create(name='Tour')
+        self.services = {
+            name: make_service(provider, category, name=name, location=location)
+            for name, location in [
+                ('Tour Đà Nẵng 3 ngày', 'Đà Nẵng'),  # Khớp cả tên và địa điểm
+                ('Khách sạn Biển Xanh', 'Đà Nẵng'),  # Chỉ khớp địa điểm
+                ('Tour Đà Lạt', 'Lâm Đồng'),
+                ('Tour Nam Định', 'Nam Định'),
+            ]
+        }
+
+    def search(self, text):
+        response = APIClient().get('/services/', {'search': text})
+        return [s['name'] for s in response.data['results']]
+
+    def test_folds_diacritics_matches_prefix_and_ranks(self):
+        da_nang = ['Tour Đà Nẵng 3 ngày', 'Khách sạn Biển Xanh']
+        for text in ['da nang', 'ĐÀ NẴ', 'Đà Nẵng', 'dA   NaNg']:
+            with self.subTest(text=text):
+                self.assertEqual(self.search(text), da_nang)
+        self.assertEqual(self.search('da l'), ['Tour Đà Lạt'])
+        self.assertEqual(self.search('nam d'), ['Tour Nam Định'])
+        self.assertEqual(self.search('da nangg'), [])
+        self.assertEqual(len(self.search('')), 4)
+
+
+class BookingInventoryTests(TestCase):
+    """Giữ / hoàn chỗ bằng UPDATE có điều kiện: không bán vượt số chỗ, đơn hụt chỗ không còn dòng nào"""
+
+    def setUp(self):
+        cache.clear()
+        self.service = make_service(make_provider(), Category.objects.create(name='Tour'), name='Tour Bà Nà',
+                                    location='Đà Nẵng', slots_total=3, slots_available=3)
+        self.customers = make_customers(2)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def book(self, user, quantity=1, **headers):
+        return self.client_for(user).post('/bookings/', {'service': self.service.id, 'quantity': quantity},
+                                          **headers)
+
+    def test_sold_out_booking_is_rolled_back(self):
+        self.assertEqual(self.book(self.customers[0], quantity=2).status_code, 201)
+
+        # Đặt lần lượt khi chỉ còn 1 chỗ: khách sau nhận 400, đơn vừa ghi của khách đó bị rollback
+        # (tranh chấp thật giữa nhiều luồng: xem ConcurrentBookingTests)
+        first, second = self.book(self.customers[0]), self.book(self.customers[1])
+        self.assertEqual((first.status_code, second.status_code), (201, 400))
+        self.assertFalse(Booking.objects.filter(user=self.customers[1]).exists())
+        self.assertEqual(Booking.objects.count(), 2)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.slots_available, 0)
+
+    def test_idempotency_key_replays_stored_response(self):
+        customer = self.customers[0]
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'dat-tour-1'}
+        first = self.book(customer, **headers)
+        replayed = self.book(customer, **headers)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((replayed.status_code, replayed.data), (201, first.data))
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.count(), 1)
+        # Cùng key, khác nội dung -> 422, không tạo đơn
+        self.assertEqual(self.book(customer, quantity=2, **headers).status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+        # Hủy 2 lần (cùng key hoặc khác key) chỉ hoàn chỗ 1 lần
+        client = self.client_for(customer)
+        url = f'/bookings/{first.data["id"]}/cancel/'
+        self.assertEqual(client.post(url, HTTP_IDEMPOTENCY_KEY='huy-1').status_code, 200)
+        self.assertEqual(client.post(url, HTTP_IDEMPOTENCY_KEY='huy-1')['Idempotent-Replayed'], 'true')
+        self.assertEqual(client.post(url).status_code, 400)
+        self.service.refresh_from_db()
+        self.assertEqual((self.service.slots_available, self.service.booking_count), (3, 0))
+
+    def test_expired_holds_are_released(self):
+        expired, fresh = (self.book(customer).data['id'] for customer in self.customers)
+        Booking.objects.filter(pk=expired).update(created_date=timezone.now() - hold_ttl() - timedelta(minutes=1))
+
+        self.assertEqual(expire_pending_bookings(), (1, 1))
+        self.assertEqual(expire_pending_bookings(), (0, 0))
+        self.assertEqual(Booking.objects.get(pk=expired).status, Booking.Status.CANCELLED)
+        self.assertEqual(Booking.objects.get(pk=fresh).status, Booking.Status.PENDING)
+        self.service.refresh_from_db()
+        self.assertEqual((self.service.slots_available, self.service.booking_count), (2, 0))
+
+    def test_expiry_skips_bookings_cancelled_meanwhile(self):
+        client = self.client_for(self.customers[0])
+        ids = [self.book(self.customers[0]).data['id'] for _ in range(2)]
+        Booking.objects.update(created_date=timezone.now() - hold_ttl() - timedelta(minutes=1))
+
+        def cancel_first(execute, sql, params, many, context):
+            # Khách hủy đơn đầu tiên ngay sau câu SELECT của lượt quét, trước câu UPDATE hủy cả lô
+            if re.match(r'UPDATE\W+travel_booking\W', sql) and not hasattr(cancel_first, 'done'):
+                cancel_first.done = True
+                self.assertEqual(client.post(f'/bookings/{ids[0]}/cancel/').status_code, 200)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(cancel_first):
+            self.assertEqual(expire_pending_bookings(), (1, 1))
+        self.service.refresh_from_db()
+        self.assertEqual((self.service.slots_available, self.service.booking_count), (3, 0))
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Nhiều luồng cùng đặt chỗ cuối cùng (giống lệnh bench_booking): chỉ 1 đơn thành công, không bán vượt.
+    TransactionTestCase: mỗi luồng dùng kết nối CSDL riêng nên dữ liệu mẫu phải được commit.
+    SQLite khóa cả file khi ghi nên các giao dịch luôn chạy tuần tự, tranh chấp thật chỉ có khi chạy trên MySQL.
+    """
+    THREADS = 6
+
+    def setUp(self):
+        cache.clear()
+        self.service = make_service(make_provider(), Category.objects.create(name='Tour'), name='Tour Bà Nà',
+                                    location='Đà Nẵng', slots_total=1, slots_available=1)
+        self.customers = make_customers(self.THREADS)
+
+    def test_last_slot_goes_to_one_booking(self):
+        barrier = threading.Barrier(self.THREADS)
+        codes = []
+
+        def worker(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                for _ in range(50):
+                    response = client.post('/bookings/', {'service': self.service.id})
+                    # SQLite khóa cả file khi ghi (lỗi "database is locked" -> 500): thử lại như app
+                    if response.status_code != 500:
+                        codes.append(response.status_code)
+                        return
+                    time.sleep(0.01)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in self.customers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(codes), [201] + [400] * (self.THREADS - 1))
+        self.assertEqual(Booking.objects.count(), 1)  # Đơn của các khách hụt chỗ đã bị rollback
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.slots_available, 0)
+
+
+class ServiceStatsTests(TestCase):
+    """Đánh giá và cột thống kê lưu sẵn trên dịch vụ (rating_sum, rating_count, booking_count)"""
+
+    def setUp(self):
+        cache.clear()
+        self.service = make_service(make_provider(), Category.objects.create(name='Tour'), name='Tour Hạ Long',
+                                    location='Quảng Ninh')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('customer', password='123456'))
+
+    def rate(self, rate, client=None):
+        return (client or self.client).post(f'/services/{self.service.id}/rate/', {'rate': rate, 'comment': 'Tốt'})
+
+    def test_customers_rate_from_one_to_five(self):
+        self.assertEqual(self.rate(4).status_code, 200)
+        for rate in [0, 6, -1, 'abc', '']:
+            with self.subTest(rate=rate):
+                self.assertEqual(self.rate(rate).status_code, 400)
+        self.assertEqual(self.rate(5, client=APIClient()).status_code, 401)
+        self.assertEqual(list(Rating.objects.values_list('rate', flat=True)), [4])
+
+    def test_concurrent_first_ratings_count_once(self):
+        def rate_meanwhile(execute, sql, params, many, context):
+            # Request khác của cùng user ghi đánh giá đầu tiên ngay sau khi request này thấy chưa có đánh giá
+            result = execute(sql, params, many, context)
+            if re.search(r'FROM\W+travel_rating\W', sql) and not hasattr(rate_meanwhile, 'done'):
+                rate_meanwhile.done = True
+                self.assertEqual(self.rate(2).status_code, 200)
+            return result
+
+        with connection.execute_wrapper(rate_meanwhile):
+            self.assertEqual(self.rate(5).status_code, 200)
+        self.assertEqual(list(Rating.objects.values_list('rate', flat=True)), [5])
+        self.assertEqual(self.stats()[:3], (5, 1, 5.0))
+
+    def stats(self):
+        return TravelService.objects.values_list('rating_sum', 'rating_count', 'avg_rating', 'booking_count') \
+            .get(pk=self.service.pk)
+
+    def test_counters_match_rebuild(self):
+        self.rate(4)
+        self.rate(2)  # Sửa điểm: chỉ cộng phần chênh lệch
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('customer2', password='123456'))
+        self.rate(5, client=other)
+        bookings = [self.client.post('/bookings/', {'service': self.service.id}).data['id'] for _ in range(4)]
+        self.assertEqual(self.stats()[3], 0)  # Đơn PENDING đang giữ chỗ chưa được tính
+        for booking in Booking.objects.filter(pk__in=bookings[1:]):
+            booking.status = Booking.Status.CONFIRMED
+            booking.save()
+        self.client.post(f'/bookings/{bookings[0]}/cancel/')  # Hủy đơn PENDING: không đổi
+        self.client.post(f'/bookings/{bookings[1]}/cancel/')  # Hủy đơn CONFIRMED: trừ 1
+        self.assertEqual(self.stats(), (7, 2, 3.5, 2))
+
+        TravelService.objects.filter(pk=self.service.pk).update(rating_sum=0, rating_count=0, avg_rating=0,
+                                                                booking_count=0)
+        call_command('rebuild_service_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), (7, 2, 3.5, 2))
+
+        # Đánh giá bị ẩn không tính, khớp biểu đồ số sao
+        Rating.objects.filter(rate=5).update(active=False)
+        call_command('rebuild_service_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), (2, 1, 2.0, 2))
+        self.assertEqual(rating_histogram(self.service.id), {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+class NightlyInventoryTests(TestCase):
+    """Khách sạn bán theo đêm: giữ/hoàn chỗ trên cả khoảng ngày, tìm phòng trống theo khoảng ngày"""
+
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user('customer', password='123456')
+        start = timezone.make_aware(timezone.datetime(2030, 1, 1, 14))
+        self.hotel = make_service(
+            make_provider(), Category.objects.create(name='Khách sạn'), name='Khách sạn Sen Vàng', price=500000,
+            nightly=True, start_date=start, end_date=start + timedelta(days=5), slots_total=2,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def book(self, check_in, check_out, quantity=1):
+        return self.client.post('/bookings/', {'service': self.hotel.id, 'quantity': quantity,
+                                               'check_in': check_in, 'check_out': check_out})
+
+    def nights(self):
+        return list(ServiceNight.objects.filter(service=self.hotel).order_by('date')
+                    .values_list('slots_available', flat=True))
+
+    def search(self, check_in, check_out, quantity=1):
+        response = APIClient().get(f'/services/?check_in={check_in}&check_out={check_out}&quantity={quantity}')
+        return [s['id'] for s in response.data['results']]
+
+    def test_reserve_and_release_across_range(self):
+        self.assertEqual(self.nights(), [2, 2, 2, 2, 2])
+        response = self.book('2030-01-02', '2030-01-04', quantity=2)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['total_price'], '2000000')  # 2 phòng x 2 đêm
+        self.assertEqual(self.nights(), [2, 0, 0, 2, 2])
+
+        # Đêm 03/01 đã hết -> không đêm nào bị trừ
+        self.assertEqual(self.book('2030-01-03', '2030-01-05').status_code, 400)
+        self.assertEqual(self.book('2030-01-05', '2030-01-07').status_code, 400)  # Ngoài lịch bán
+        self.assertEqual(self.book('2030-01-04', '').status_code, 400)
+        self.assertEqual(self.nights(), [2, 0, 0, 2, 2])
+
+        self.assertEqual(self.search('2030-01-03', '2030-01-05'), [])
+        self.assertEqual(self.search('2030-01-04', '2030-01-06', quantity=2), [self.hotel.id])
+
+        self.assertEqual(self.client.post(f'/bookings/{response.data["id"]}/cancel/').status_code, 200)
+        self.assertEqual(self.nights(), [2, 2, 2, 2, 2])
+        self.assertEqual(self.search('2030-01-01', '2030-01-06', quantity=2), [self.hotel.id])
+
+    def test_nights_follow_service_changes(self):
+        self.book('2030-01-01', '2030-01-02')
+        self.hotel.slots_total = 5
+        self.hotel.end_date = self.hotel.start_date + timedelta(days=3)
+        self.hotel.save()
+        self.assertEqual(self.nights(), [4, 5, 5])
+
+
+class ImageDerivativeTests(TestCase):
+    """Ảnh tải lên được tạo bản thu nhỏ WebP / JPEG, API trả srcset trỏ tới các bản đó"""
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.media_root = media.name
+        self.provider = make_provider()
+        self.client = APIClient()
+        self.client.force_authenticate(self.provider)
+        self.category = Category.objects.create(name='Tour')
+
+    def upload(self):
+        buffer = BytesIO()
+        Image.new('RGB', (1600, 800), (30, 120, 200)).save(buffer, 'PNG')
+        image = SimpleUploadedFile('halong.png', buffer.getvalue(), content_type='image/png')
+        return self.client.post('/services/', {
+            'name': 'Tour Hạ Long', 'description': 'Du thuyền 2 ngày', 'price': 100000, 'location': 'Quảng Ninh',
+            'start_date': '2030-01-01T08:00:00Z', 'category_id': self.category.id, 'provider': self.provider.id,
+            'active': True, 'image': image,  # multipart: thiếu checkbox `active` thì DRF hiểu là False
+        }, format='multipart')
+
+    def test_upload_generates_derivatives_and_srcset(self):
+        # Không chạy callback on_commit: thread của pool không thấy dữ liệu chưa commit của TestCase
+        with self.captureOnCommitCallbacks():
+            response = self.upload()
+        self.assertEqual(response.status_code, 201, response.content)
+        service = TravelService.objects.get(pk=response.data['id'])
+
+        # Chưa tạo xong: mọi kích thước trỏ về ảnh gốc
+        srcset = APIClient().get(f'/services/{service.id}/').data['image_srcset']
+        self.assertEqual({srcset['card']['webp'], srcset['thumb']['jpeg']}, {service.image.url})
+
+        with self.captureOnCommitCallbacks(execute=True):  # Làm mới cache dịch vụ sau khi commit
+            self.assertTrue(generate_derivatives('service', service.id))
+        root, _ = os.path.splitext(service.image.name)
+        for variant, size in VARIANTS.items():
+            for fmt in FORMATS:
+                name = derivative_name(service.image.name, variant, fmt)
+                with Image.open(os.path.join(self.media_root, name)) as image:
+                    self.assertEqual(image.size, (size, size // 2))
+
+        srcset = APIClient().get(f'/services/{service.id}/').data['image_srcset']
+        self.assertTrue(srcset['card']['webp'].endswith(f'{root}.card.webp'))
+        self.assertTrue(srcset['thumb']['jpeg'].endswith(f'{root}.thumb.jpg'))
+        self.assertFalse(generate_derivatives('service', service.id))  # Đã có bản thu nhỏ, không tạo lại
+
+
+class RecommendationTests(TestCase):
+    """Gợi ý tính offline từ đơn / lượt thích chung, lần chạy sau chỉ tính lại dịch vụ có thay đổi"""
+
+    def setUp(self):
+        cache.clear()
+        provider, category = make_provider(), Category.objects.create(name='Tour')
+        self.a, self.b, self.c, self.d = [make_service(provider, category, name=f'Tour {name}') for name in 'ABCD']
+        self.customers = make_customers(3)
+        for customer, services in zip(self.customers, [(self.a, self.b), (self.a, self.b), (self.a, self.c)]):
+            for service in services:
+                self.book(customer, service)
+
+    def book(self, customer, service):
+        Booking.objects.create(user=customer, service=service, quantity=1, total_price=100000,
+                               status=Booking.Status.CONFIRMED)
+
+    def similar(self, service):
+        return [s['id'] for s in APIClient().get(f'/services/{service.id}/similar/').data]
+
+    def test_similar_and_popular(self):
+        # Chưa tính gợi ý: dịch vụ cùng danh mục
+        self.assertEqual(len(self.similar(self.d)), 3)
+        run = rebuild_recommendations()
+        self.assertTrue(run.full)
+        cache.clear()
+        self.assertEqual(self.similar(self.a), [self.b.id, self.c.id])
+        self.assertEqual(self.similar(self.c), [self.a.id])
+
+        popular = [s['id'] for s in APIClient().get('/services/popular/?limit=2').data]
+        self.assertEqual(popular, [self.a.id, self.b.id])
+
+        # Chỉ dịch vụ có đơn mới được tính lại
+        self.book(self.customers[2], self.d)
+        run = rebuild_recommendations()
+        self.assertEqual((run.full, run.services), (False, 1))
+        cache.clear()
+        self.assertEqual(self.similar(self.d), [self.c.id, self.a.id])  # C chỉ có 1 khách, trùng hoàn toàn với D
+
+
+class TokenCacheTests(TestCase):
+    """Xác thực Bearer token được cache, nhưng token bị thu hồi phải bị từ chối ngay"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('customer', password='123456')
+        application = get_application_model().objects.create(
+            name='App', client_type='public', authorization_grant_type='password', user=self.user)
+        self.token = get_access_token_model().objects.create(
+            user=self.user, application=application, token='token-123',
+            expires=timezone.now() + timedelta(hours=1), scope='read write')
+        self.client = APIClient(HTTP_AUTHORIZATION='Bearer token-123')
+
+    def test_cached_token_skips_token_query(self):
+        self.assertEqual(self.client.get('/users/current-user/').status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/users/current-user/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_logout_revokes_cached_token(self):
+        self.assertEqual(self.client.get('/users/current-user/').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/users/logout/').status_code, 204)
+        self.assertEqual(self.client.get('/users/current-user/').status_code, 401)
+
+    def test_user_change_refreshes_cached_user(self):
+        self.client.get('/users/current-user/')
+        User.objects.filter(pk=self.user.pk).update(first_name='Cũ')  # update() không qua signal
+        self.user.first_name = 'Mới'
+        self.user.save()
+        self.assertEqual(self.client.get('/users/current-user/').data['first_name'], 'Mới')
+
+
+class AsyncReadPathTests(TransactionTestCase):
+    """
+    API /async/ (ASGI) phải trả đúng dữ liệu như API đồng bộ.
+    TransactionTestCase: phần chạy song song dùng kết nối CSDL riêng nên dữ liệu mẫu phải được commit.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.service = make_service(make_provider(), Category.objects.create(name='Tour'))
+        for i, customer in enumerate(make_customers(3)):
+            Rating.objects.create(user=customer, service=self.service, rate=i + 3, comment='Tốt')
+
+    def test_same_response_as_sync_views(self):
+        for url in ['/categories/', '/services/', '/services/?pagination=cursor&ordering=price',
+                    '/services/?search=hue', '/services/{id}/', '/services/{id}/comments/', '/services/?month=13']:
+            url = url.format(id=self.service.id)
+            with self.subTest(url=url):
+                expected = self.client.get(url)
+                response = self.client.get('/async' + url)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+
+    def test_overview_combines_detail_comments_and_histogram(self):
+        data = self.client.get(f'/async/services/{self.service.id}/overview/').json()
+        self.assertEqual(data['service']['id'], self.service.id)
+        self.assertEqual(len(data['comments']['results']), 3)
+        self.assertEqual(data['histogram'], {'1': 0, '2': 0, '3': 1, '4': 1, '5': 1})
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_SERVER_TIMING=True)
+class MetricsTests(TestCase):
+    """Middleware đo hiệu năng: header Server-Timing và API /metrics/ chỉ dành cho admin"""
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.admin = User.objects.create_superuser('admin', password='123456')
+        self.customer = User.objects.create_user('customer', password='123456')
+
+    def test_server_timing_counts_queries(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/bookings/')
+        timing = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing['db'])
+        self.assertIn('serializer', timing)
+        self.assertIn('total', timing)
+
+    def test_serializer_timing_is_per_view(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        Category.objects.bulk_create(Category(name=f'Loại {i}') for i in range(50))
+        client.get('/categories/')
+        self.assertGreater(metrics.snapshot()['GET category-list']['serializer_mean_ms'], 0)
+
+    @override_settings(METRICS_SERVER_TIMING=False)
+    def test_server_timing_hidden_from_clients(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        self.assertNotIn('Server-Timing', client.get('/bookings/'))
+        self.assertEqual(metrics.snapshot()['GET booking-list']['count'], 1)
+
+    def test_routes_endpoint_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        client.get('/categories/')
+        self.assertEqual(client.get('/metrics/').status_code, 403)
+
+        client.force_authenticate(self.admin)
+        routes = client.get('/metrics/').data['routes']
+        self.assertEqual(routes['GET category-list']['count'], 1)
+        self.assertEqual(sum(routes['GET category-list']['histogram'].values()), 1)
+
+
+class ResponseFormatTests(TestCase):
+    """Renderer orjson / MessagePack và nén brotli / gzip theo header của client"""
+
+    def setUp(self):
+        cache.clear()
+        provider, category = make_provider(), Category.objects.create(name='Tour')
+        for i in range(30):
+            make_service(provider, category, name=f'Tour Huế {i}', price=1234567)
+
+    def test_decimal_and_dates_keep_drf_format(self):
+        data = {'total': Decimal('123456789012'), 'rate': Decimal('4.5'), 'period': date(2030, 1, 1),
+                'at': datetime(2030, 1, 1, 8, 30, 0, 123456, tzinfo=dt_timezone.utc)}
+        # So sánh chuỗi byte: json.loads coi 123456789012 và 123456789012.0 là bằng nhau
+        self.assertEqual(ORJSONRenderer().render(data),
+                         b'{"total":123456789012.0,"rate":4.5,"period":"2030-01-01",'
+                         b'"at":"2030-01-01T08:30:00.123456Z"}')
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIsInstance(msgpack.unpackb(MessagePackRenderer().render(data))['total'], float)
+
+    def test_msgpack_and_compression_are_negotiated(self):
+        response = self.client.get('/services/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['count'], 30)
+
+        response = self.client.get('/services/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(brotli.decompress(response.content))['count'], 30)
+        self.assertEqual(self.client.get('/services/', HTTP_ACCEPT_ENCODING='gzip;q=1, br;q=0')['Content-Encoding'],
+                         'gzip')
+        # q không đọc được coi như q=1, không gây lỗi 500
+        self.assertEqual(self.client.get('/services/', HTTP_ACCEPT_ENCODING='br;q=abc')['Content-Encoding'], 'br')
+        self.assertEqual(self.client.get('/services/', HTTP_ACCEPT_ENCODING='br; q=0.0, gzip;q=')['Content-Encoding'],
+                         'gzip')
+        # ETag yếu của phản hồi nén vẫn khớp If-None-Match
+        again = self.client.get('/services/', HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        # Phản hồi nhỏ không nén
+        self.assertFalse(self.client.get('/categories/', HTTP_ACCEPT_ENCODING='br').has_header('Content-Encoding'))
+
+
+class LikeTests(TestCase):
+    """Thích / bỏ thích idempotent, like_count cộng dồn, is_liked tra 1 lần cho cả trang"""
+
+    def setUp(self):
+        cache.clear()
+        provider, category = make_provider(), Category.objects.create(name='Tour')
+        self.services = [make_service(provider, category, name=f'Tour Huế {i}') for i in range(25)]
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('customer', password='123456'))
+
+    def test_like_and_unlike_are_idempotent(self):
+        service = self.services[0]
+        for _ in range(2):
+            self.assertEqual(self.client.post(f'/services/{service.id}/like/').data,
+                             {'liked': True, 'like_count': 1})
+        for _ in range(2):
+            self.assertEqual(self.client.delete(f'/services/{service.id}/like/').data,
+                             {'liked': False, 'like_count': 0})
+        self.assertEqual(self.client.post(f'/services/{service.id}/like/').data['like_count'], 1)
+        self.assertEqual(APIClient().post(f'/services/{service.id}/like/').status_code, 401)
+
+    def test_is_liked_is_one_query_per_page(self):
+        for service in self.services[:3]:
+            self.client.post(f'/services/{service.id}/like/')
+        APIClient().get('/services/')  # Đưa trang vào cache chung
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/services/')
+        self.assertEqual(len([q for q in ctx.captured_queries if 'travel_like' in q['sql']]), 1)
+        liked = {s['id'] for s in response.data['results'] if s['is_liked']}
+        self.assertEqual(liked, {s.id for s in self.services[:3]})
+        # Khách chưa đăng nhập cùng trang cache, không ai được thích
+        self.assertFalse(any(s['is_liked'] for s in APIClient().get('/services/').data['results']))
+
+    def test_liked_list_pages_by_cursor(self):
+        for service in self.services:
+            self.client.post(f'/services/{service.id}/like/')
+        self.client.delete(f'/services/{self.services[0].id}/like/')
+
+        response = self.client.get('/services/liked/')
+        self.assertEqual([s['id'] for s in response.data['results']], [s.id for s in self.services[:0:-1][:20]])
+        self.assertTrue(all(s['is_liked'] for s in response.data['results']))
+        response = self.client.get(response.data['next'])
+        self.assertEqual([s['id'] for s in response.data['results']], [s.id for s in self.services[4:0:-1]])
+        self.assertIsNone(response.data['next'])
+
+
+class RevenueRollupTests(TestCase):
+    """Bảng tổng hợp doanh thu luôn khớp dữ liệu gốc sau mỗi thao tác trên đơn"""
+
+    def setUp(self):
+        provider, category = make_provider(), Category.objects.create(name='Tour')
+        self.customer = User.objects.create_user('customer', password='123456')
+        self.services = [make_service(provider, category, name=f'Tour Huế {i}', price=300) for i in range(2)]
+        self.booking = Booking.objects.create(user=self.customer, service=self.services[0], quantity=1,
+                                              total_price=300, status=Booking.Status.PENDING)
+
+    def revenue(self):
+        return list(RevenueRollup.objects.filter(granularity=RevenueRollup.Granularity.MONTH)
+                    .values_list('total_revenue', 'count'))
+
+    def test_confirm_and_cancel(self):
+        self.booking.status = Booking.Status.CONFIRMED
+        self.booking.save()
+        self.assertEqual(find_mismatches(), [])
+        self.assertEqual(self.revenue(), [(300, 1)])
+
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        self.assertEqual(client.post(f'/bookings/{self.booking.id}/cancel/').status_code, 200)
+        self.assertEqual(find_mismatches(), [])
+        self.assertEqual(self.revenue(), [(0, 0)])
+
+    def test_price_edit_and_delete(self):
+        self.booking.status = Booking.Status.CONFIRMED
+        self.booking.save()
+        self.booking.total_price = 500
+        self.booking.save()
+        self.assertEqual(find_mismatches(), [])
+        self.assertEqual(self.revenue(), [(500, 1)])
+
+        # Nạp lại từ DB (như trang Admin) rồi đổi dịch vụ + giá cùng lúc
+        booking = Booking.objects.get(pk=self.booking.pk)
+        booking.service, booking.total_price = self.services[1], 700
+        booking.save()
+        self.assertEqual(find_mismatches(), [])
+
+        Booking.objects.get(pk=self.booking.pk).delete()
+        self.assertEqual(find_mismatches(), [])
+        self.assertEqual(self.revenue(), [(0, 0)])
+
+    def test_stats_keep_response_format(self):
+        self.booking.status = Booking.Status.CONFIRMED
+        self.booking.save()
+        client = APIClient()
+        client.force_authenticate(self.services[0].provider)
+        month_start = timezone.localtime(self.booking.created_date).replace(day=1, hour=0, minute=0, second=0,
+                                                                            microsecond=0)
+        response = client.get('/stats/revenue_by_month/')
+        self.assertEqual(json.loads(response.content), [
+            {'month': month_start.isoformat().replace('+00:00', 'Z'), 'total_revenue': 300, 'count': 1},
+        ])
+        self.assertEqual(set(client.get('/stats/revenue_by_year/').data[0]), {'period', 'total_revenue', 'count'})
@@ -11,6 +11,7 @@ router.register('services', views.TravelServiceViewSet, basename='travelservice'
 router.register('users', views.UserViewSet, basename='user')
 router.register('bookings', views.BookingViewSet, basename='booking')
 router.register('stats', views.StatsViewSet, basename='stats')
+router.register('metrics', views.MetricsViewSet, basename='metrics')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,21 +1,40 @@
-from rest_framework import viewsets, permissions, status, generics, filters
+from datetime import date, datetime, time
+
+from rest_framework import viewsets, permissions, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.parsers import MultiPartParser, FormParser
-from django.db import transaction
-from django.db.models import Sum, Count, F,Avg, Q
-from django.db.models.functions import TruncMonth
-
-from .models import Category, TravelService, User, Booking, Rating, Like
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.db.models import Sum
+from oauth2_provider.models import get_access_token_model
+
+from .models import (
+    Category, TravelService, User, Booking, Rating, Like, RevenueRollup, ServiceNight, ServiceNeighbor
+)
 from .serializers import (
-    CategorySerializer, TravelServiceSerializer,
+    CategorySerializer, TravelServiceSerializer, TravelServiceListSerializer, load_only,
     UserSerializer, BookingSerializer, RatingSerializer
 )
-from .perms import IsProvider, IsOwner
-
-from django.db.models.functions import TruncMonth, TruncYear, TruncQuarter  # <--- Import thêm
-
+from .perms import IsAdmin, IsProvider, IsOwner
+from .paginators import (
+    ServiceCursorPagination, CommentCursorPagination, BookingCursorPagination, LikeCursorPagination
+)
+from .search import ServiceSearchFilter
+from .filters import filter_bookings, filter_services, parse_stay
+from .geo import DistanceOrderingFilter
+from .facets import price_bounds, service_facets
+from .cache import VersionedCacheMixin, CATEGORIES, SERVICES
+from .aggregates import apply_rating, rating_histogram
+from .inventory import create_booking, release_booking, InvalidStay, SoldOut
+from .idempotency import idempotent
+from .rollups import record_transition
+from .streaming import stream_csv, stream_ndjson, wants_ndjson
+from .imports import ImportAborted, import_services, read_rows
+from .likes import like_service, unlike_service, liked_queryset, mark_liked
+from . import metrics
 
 
 # 1. Phân trang
@@ -23,103 +42,167 @@ class StandardPagination(PageNumberPagination):
     page_size = 20
 
 
+# Số dịch vụ gợi ý mỗi danh sách (tương tự / thịnh hành)
+RECOMMENDATION_TOP_K = getattr(settings, 'RECOMMENDATION_TOP_K', 20)
+
+
 # 2. User ViewSet
-class UserViewSet(viewsets.ViewSet, generics.CreateAPIView):
+class UserViewSet(metrics.SerializerTimingMixin, viewsets.ViewSet, generics.CreateAPIView):
     queryset = User.objects.filter(is_active=True)
     serializer_class = UserSerializer
     parser_classes = [MultiPartParser, FormParser ]
 
     def get_permissions(self):
-        if self.action == 'current_user':
+        if self.action in ['current_user', 'logout']:
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    # Đăng xuất: thu hồi token đang dùng (kèm refresh token) để token bị xóa khỏi cache xác thực ngay
+    @action(methods=['post'], detail=False, url_path='logout', permission_classes=[permissions.IsAuthenticated])
+    def logout(self, request):
+        token = request.auth
+        if isinstance(token, get_access_token_model()):
+            refresh_token = getattr(token, 'refresh_token', None)
+            (refresh_token or token).revoke()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(methods=['get', 'patch'], detail=False, url_path='current-user',
             permission_classes=[permissions.IsAuthenticated])
     def current_user(self, request):
         user = request.user
 
         if request.method == 'GET':
-            return Response(self.serializer_class(user).data)
+            return Response(metrics.timed(self.serializer_class(user)).data)
 
         if request.method == 'PATCH':
             # Cập nhật thông tin user hiện tại
             serializer = self.serializer_class(user, data=request.data, partial=True)
             if serializer.is_valid():
                 serializer.save()
-                return Response(serializer.data)
+                return Response(metrics.timed(serializer).data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 # 3. Category ViewSet
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(metrics.SerializerTimingMixin, VersionedCacheMixin, viewsets.ModelViewSet):
+    # GET được cache theo phiên bản dữ liệu, hỗ trợ ETag / 304 (xem travel/cache.py)
+    cache_namespaces = [CATEGORIES]
     queryset = Category.objects.filter(active=True)
     serializer_class = CategorySerializer
     permission_classes = [permissions.AllowAny]
 
 # === 4. NÂNG CẤP VIEWSET DỊCH VỤ (Search, Filter, Sort, Rating) ===
-class TravelServiceViewSet(viewsets.ModelViewSet):
+class TravelServiceViewSet(metrics.SerializerTimingMixin, VersionedCacheMixin, viewsets.ModelViewSet):
+    cache_namespaces = [SERVICES]
     queryset = TravelService.objects.filter(active=True)
     serializer_class = TravelServiceSerializer
     pagination_class = StandardPagination
     permission_classes = [permissions.AllowAny]
 
-    # Cho phép tìm kiếm cơ bản
+    # Tìm kiếm theo tên, địa điểm (không phân biệt dấu) qua ?search=, xem travel/search.py
     search_fields = ['name', 'location']
 
     # Cho phép sắp xếp theo giá, ngày tạo
-    ordering_fields = ['price', 'created_date', 'avg_rating', 'booking_count']
+    # avg_rating/booking_count là cột lưu sẵn có index, không cần GROUP BY
+    # distance: khoảng cách (km) khi tìm quanh 1 điểm ?lat=&lng=&radius= (xem travel/geo.py)
+    filter_backends = [ServiceSearchFilter, DistanceOrderingFilter]
+    ordering_fields = ['price', 'created_date', 'avg_rating', 'booking_count', 'distance']
+
+    @property
+    def paginator(self):
+        # Cuộn vô hạn trên app: gửi ?pagination=cursor (trang đầu) hoặc ?cursor=... (trang sau)
+        # để dùng phân trang keyset, không OFFSET và không COUNT(*)
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if 'cursor' in params or params.get('pagination') == 'cursor':
+                self._paginator = ServiceCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', 'comments']:
+        if self.action in ['list', 'retrieve', 'get_comments', 'availability', 'facets', 'similar', 'popular']:
             return [permissions.AllowAny()]
+        if self.action in ['rate', 'like', 'liked']:
+            return [permissions.IsAuthenticated()]
         return [IsProvider()]  # Chỉ nhà cung cấp mới được thêm/sửa/xóa
 
+    def get_serializer_class(self):
+        # Danh sách dùng bản gọn (không có description), ?fields=... chọn field từ bản đầy đủ
+        if self.action in ['list', 'similar', 'popular', 'liked'] and 'fields' not in self.request.query_params:
+            return TravelServiceListSerializer
+        return super().get_serializer_class()
+
+    def wants_is_liked(self, request):
+        selected = self.get_serializer_class().selected_fields(request.query_params)
+        return selected is None or {'id', 'is_liked'} <= selected
+
+    def personalize(self, request, data):
+        # is_liked của user đang đăng nhập: 1 câu IN cho cả trang, phần còn lại lấy từ cache chung
+        if self.action not in ['list', 'retrieve', 'similar', 'popular'] or not self.wants_is_liked(request):
+            return data, None
+        liked = set(liked_queryset(request.user, data)) if request.user.is_authenticated else set()
+        return mark_liked(data, liked), sorted(liked)
+
     def perform_create(self, serializer):
         # Khi tạo Tour, tự động gán provider là người đang login
         serializer.save(provider=self.request.user)
 
     def get_queryset(self):
-        queryset = self.queryset
-
-        # 1. ANNOTATE: Tính điểm đánh giá (avg_rating) và độ phổ biến (booking_count)
-        # Để Frontend có thể sort theo "Đánh giá cao nhất" hoặc "Phổ biến nhất"
-        queryset = queryset.annotate(
-            avg_rating=Avg('ratings__rate'),
-            booking_count=Count('booking')
-        )
-
-        # 2. FILTER NÂNG CAO (Manual Filter)
-        # Lọc theo danh mục (Tour/Hotel/Ve)
-        cate_id = self.request.query_params.get('category_id')
-        if cate_id:
-            queryset = queryset.filter(category_id=cate_id)
-
-        # Lọc theo địa điểm (gần đúng)
-        location = self.request.query_params.get('location')
-        if location:
-            queryset = queryset.filter(location__icontains=location)
-
-        # Lọc theo khoảng giá (Min - Max) -> Yêu cầu bắt buộc
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-
-        # Lọc theo ngày khởi hành (Tháng cụ thể)
-        month = self.request.query_params.get('month')  # Format: 1, 2, 12
-        if month:
-            queryset = queryset.filter(start_date__month=month)
-
+        # 1. avg_rating và booking_count đã lưu sẵn trên bảng TravelService
+        # (xem travel/aggregates.py), Frontend sort trực tiếp theo 2 cột này
+        # select_related: danh mục được nhúng trong mỗi dịch vụ, tránh N+1 truy vấn
+        queryset = self.queryset.select_related('category')
+
+        # 2. FILTER NÂNG CAO: danh mục, địa điểm, khoảng giá, tháng/khoảng ngày khởi hành
+        # Các điều kiện được viết dạng khoảng giá trị để dùng index (xem travel/filters.py)
+        queryset = filter_services(queryset, self.request.query_params)
+
+        # 3. Danh sách chỉ SELECT các cột serializer cần (không kéo cột description vài KB mỗi dòng)
+        if self.action in ['list', 'my_services']:
+            queryset = load_only(queryset, self.get_serializer_class(), self.request.query_params)
         return queryset
 
     # API để Nhà cung cấp xem danh sách dịch vụ của chính mình
+    # Nhà cung cấp lớn có hàng nghìn dịch vụ: trả về theo trang con trỏ (?cursor=, ?ordering=),
+    # hoặc ?stream=ndjson để tải toàn bộ theo từng lô mà bộ nhớ server không tăng theo số dòng
     @action(methods=['get'], detail=False, url_path='my-services', permission_classes=[IsProvider])
     def my_services(self, request):
         services = self.get_queryset().filter(provider=request.user)
-        return Response(TravelServiceSerializer(services, many=True, context={'request': request}).data)
+        context = self.get_serializer_context()
+        if wants_ndjson(request):
+            return stream_ndjson(services, self.get_serializer_class(), context)
+
+        paginator = ServiceCursorPagination()
+        page = paginator.paginate_queryset(services, request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    # Nhập dịch vụ hàng loạt: multipart field `file` (.csv / .json / .jsonl) hoặc body JSON là 1 mảng.
+    # Dòng hợp lệ được ghi theo lô, dòng lỗi trả về kèm số thứ tự dòng để sửa và nhập lại
+    @action(methods=['post'], detail=False, url_path='import', permission_classes=[IsProvider],
+            parser_classes=[MultiPartParser, FormParser, JSONParser])
+    def import_services(self, request):
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                rows = read_rows(upload.file, upload.name)
+            elif isinstance(request.data, list):
+                rows = request.data
+            else:
+                return Response({"error": "Thiếu file nhập (field 'file')"}, status=status.HTTP_400_BAD_REQUEST)
+            result = import_services(rows, provider=request.user)
+        except ImportAborted as e:
+            # File sai định dạng / sai mã hóa: các dòng trước dòng hỏng vẫn được ghi (`created`)
+            return Response({"error": f"Không đọc được file: {e}", "row": e.row, **e.result},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if result['created']:
+            code = status.HTTP_201_CREATED
+        elif result['errors']:
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_200_OK
+        return Response(result, status=code)
 
     # API Rating: Người dùng đánh giá dịch vụ
     @action(methods=['post'], detail=True, permission_classes=[permissions.IsAuthenticated])
@@ -131,178 +214,319 @@ class TravelServiceViewSet(viewsets.ModelViewSet):
 
         if not rate:
             return Response({"error": "Vui lòng nhập số sao"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rate = int(rate)
+        except (TypeError, ValueError):
+            rate = 0
+        if not 1 <= rate <= 5:
+            return Response({"error": "Số sao phải từ 1 đến 5"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Khóa đánh giá cũ (nếu có) để lấy điểm cũ, cập nhật thống kê đúng phần chênh lệch
+            rating = Rating.objects.select_for_update().filter(user=user, service=service).first()
+            if rating is None:
+                try:
+                    with transaction.atomic():  # savepoint: lỗi trùng không hủy cả transaction
+                        Rating.objects.create(user=user, service=service, rate=rate, comment=comment)
+                    apply_rating(service.id, rate)
+                    return Response({"message": "Đánh giá thành công"}, status=status.HTTP_200_OK)
+                except IntegrityError:
+                    # Request song song vừa tạo đánh giá đầu tiên (unique user, service) -> sửa điểm như bình thường
+                    rating = Rating.objects.select_for_update().get(user=user, service=service)
+
+            old_rate = rating.rate
+            rating.rate, rating.comment = rate, comment
+            rating.save(update_fields=['rate', 'comment', 'updated_date'])
+            if rating.active:  # Đánh giá đã bị ẩn không được tính vào thống kê (xem travel/aggregates.py)
+                apply_rating(service.id, rate, old_rate)
 
-        # Tạo hoặc cập nhật đánh giá
-        rating, created = Rating.objects.update_or_create(
-            user=user,
-            service=service,
-            defaults={'rate': rate, 'comment': comment}
-        )
         return Response({"message": "Đánh giá thành công"}, status=status.HTTP_200_OK)
 
+    # Thích (POST) / bỏ thích (DELETE): gửi lại nhiều lần hay 2 request song song vẫn chỉ tính 1 lượt
+    @action(methods=['post', 'delete'], detail=True)
+    def like(self, request, pk=None):
+        service = generics.get_object_or_404(self.queryset.only('id'), pk=pk)
+        liked = request.method == 'POST'
+        if liked:
+            like_service(request.user, service.id)
+        else:
+            unlike_service(request.user, service.id)
+        service.refresh_from_db(fields=['like_count'])
+        return Response({'liked': liked, 'like_count': service.like_count})
+
+    # Dịch vụ đã thích của user đang đăng nhập, phân trang con trỏ (?cursor=), mới thích gần nhất trước
+    @action(methods=['get'], detail=False)
+    def liked(self, request):
+        likes = Like.objects.filter(user=request.user, active=True, service__active=True) \
+            .only('id', 'updated_date', 'service_id')
+        paginator = LikeCursorPagination()
+        page = paginator.paginate_queryset(likes, request, view=self)
+        services = load_only(self.queryset, self.get_serializer_class(), request.query_params) \
+            .in_bulk([like.service_id for like in page])
+        data = self.get_serializer([services[like.service_id] for like in page if like.service_id in services],
+                                   many=True).data
+        if self.wants_is_liked(request):
+            data = mark_liked(data, services.keys())
+        return paginator.get_paginated_response(data)
+
+    # Đếm số dịch vụ theo danh mục / khoảng giá / tháng khởi hành cho bộ lọc trên app,
+    # nhận cùng bộ lọc với danh sách (?category_id=, ?min_price=, ?month=, ?search=...).
+    # Cache chung phiên bản dữ liệu với danh sách dịch vụ (xem travel/facets.py)
+    @action(methods=['get'], detail=False)
+    def facets(self, request):
+        bounds = price_bounds(request.query_params)
+        return self.cached_response(
+            request, lambda: Response(service_facets(self.filter_queryset(self.get_queryset()), bounds))
+        )
+
+    # Gợi ý tính sẵn bởi `manage.py rebuild_recommendations` (xem travel/recommendations.py), API chỉ đọc
+    # Dịch vụ tương tự: top-K theo khách đặt / thích chung; dịch vụ chưa có dữ liệu -> thịnh hành cùng danh mục
+    @action(methods=['get'], detail=True)
+    def similar(self, request, pk=None):
+        def render():
+            service = generics.get_object_or_404(self.queryset.only('id', 'category_id'), pk=pk)
+            services = load_only(self.queryset, self.get_serializer_class(), request.query_params)
+            ids = list(ServiceNeighbor.objects.filter(service=service).order_by('rank')
+                       .values_list('neighbor_id', flat=True))
+            found = services.in_bulk(ids)  # Dịch vụ đã ẩn không có trong found
+            neighbors = [found[i] for i in ids if i in found]
+            if not neighbors:
+                neighbors = list(services.filter(category_id=service.category_id).exclude(pk=service.pk)
+                                 .order_by('-popularity', '-id')[:RECOMMENDATION_TOP_K])
+            return Response(self.get_serializer(neighbors, many=True).data)
+        return self.cached_response(request, render)
+
+    # Thịnh hành: đơn / lượt thích gần đây (giảm dần theo thời gian), nhận các bộ lọc của danh sách
+    # (?category_id=, ?month=...) và ?limit= (tối đa 50)
+    @action(methods=['get'], detail=False)
+    def popular(self, request):
+        def render():
+            services = load_only(filter_services(self.queryset, request.query_params), self.get_serializer_class(),
+                                 request.query_params).order_by('-popularity', '-id')
+            try:
+                limit = min(max(int(request.query_params.get('limit', RECOMMENDATION_TOP_K)), 1), 50)
+            except ValueError:
+                limit = RECOMMENDATION_TOP_K
+            return Response(self.get_serializer(services[:limit], many=True).data)
+        return self.cached_response(request, render)
+
+    # Số chỗ còn lại từng đêm của dịch vụ bán theo đêm (?check_in=&check_out=, mặc định cả lịch bán)
+    # `available`: số chỗ tối đa đặt được cho cả khoảng = số chỗ của đêm ít chỗ nhất
+    @action(methods=['get'], detail=True)
+    def availability(self, request, pk=None):
+        # Không qua get_object(): check_in/check_out ở đây không phải bộ lọc danh sách
+        service = generics.get_object_or_404(self.queryset, pk=pk)
+        check_in, check_out = parse_stay(request.query_params)
+        nights = ServiceNight.objects.filter(service=service).order_by('date')
+        if check_in:
+            nights = nights.filter(date__gte=check_in, date__lt=check_out)
+        nights = list(nights.values('date', 'slots_available'))
+        complete = check_in is None or len(nights) == (check_out - check_in).days
+        return Response({
+            'nightly': service.nightly,
+            'available': max(min((n['slots_available'] for n in nights), default=0), 0) if complete else 0,
+            'nights': nights,
+        })
+
     @action(methods=['get'], detail=True, url_path='comments')
     def get_comments(self, request, pk=None):
         service = self.get_object()
-        # Lấy tất cả rating của service này
-        ratings = service.ratings.filter(active=True).order_by('-created_date')
+        # Phân trang con trỏ theo (created_date, id) trên index (service, active, created_date)
+        ratings = service.ratings.filter(active=True).select_related('user')
 
-        # Bạn cần tạo thêm RatingSerializer trong serializers.py
-        # để trả về thông tin người comment (avatar, tên)
-        return Response(RatingSerializer(ratings, many=True).data)
+        paginator = CommentCursorPagination()
+        page = paginator.paginate_queryset(ratings, request, view=self)
+        response = paginator.get_paginated_response(metrics.timed(RatingSerializer(page, many=True)).data)
+
+        # Trang đầu kèm thống kê số lượt theo từng mức sao để màn TourDetail chỉ cần 1 request
+        if paginator.cursor_query_param not in request.query_params:
+            response.data['histogram'] = rating_histogram(service.id)
+        return response
 
 # === 5. BOOKING VIEWSET (Giữ nguyên logic transaction tốt của bạn) ===
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(metrics.SerializerTimingMixin, viewsets.ModelViewSet):
     # ... (Giữ nguyên code cũ của bạn vì đã xử lý transaction rất tốt) ...
     # Chỉ bổ sung: Khi GET danh sách, Admin thấy hết, Provider thấy của mình, User thấy của mình
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
+    @property
+    def paginator(self):
+        # Nhà cung cấp (đơn của mọi dịch vụ) luôn dùng phân trang con trỏ, không OFFSET / COUNT(*);
+        # vai trò khác dùng khi gửi ?pagination=cursor hoặc ?cursor=...
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if getattr(self.request.user, 'role', None) == 'PROVIDER' or 'cursor' in params or params.get('pagination') == 'cursor':
+                self._paginator = BookingCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        # ?stream=ndjson: tải toàn bộ đơn theo từng lô (xuất dữ liệu, đồng bộ offline)
+        if wants_ndjson(request):
+            return stream_ndjson(self.get_queryset(), self.get_serializer_class(), self.get_serializer_context())
+        return super().list(request, *args, **kwargs)
+
+    def scoped(self, bookings):
         user = self.request.user
         if user.role == 'ADMIN':
-            return Booking.objects.all().order_by('-created_date')
+            return bookings
         elif user.role == 'PROVIDER':
-            return Booking.objects.filter(service__provider=user).order_by('-created_date')
+            return bookings.filter(service__provider=user)
         else:
-            return Booking.objects.filter(user=user).order_by('-created_date')
+            return bookings.filter(user=user)
+
+    def get_queryset(self):
+        # Nạp sẵn dịch vụ + danh mục nhúng trong BookingSerializer (1 JOIN thay vì 2 truy vấn/đơn)
+        return self.scoped(Booking.objects.select_related('service__category').order_by('-created_date'))
 
+    # Xuất đơn ra CSV (?date_from=, ?date_to=, ?status=CONFIRMED,CANCELLED), ghi dần theo từng lô
+    # nên xuất hàng trăm nghìn đơn không làm tăng bộ nhớ server. Chỉ nạp các cột cần xuất.
+    @action(methods=['get'], detail=False)
+    def export(self, request):
+        bookings = filter_bookings(self.scoped(Booking.objects.all()), request.query_params) \
+            .select_related('service', 'user') \
+            .only('id', 'created_date', 'status', 'payment_method', 'quantity', 'total_price',
+                  'service__id', 'service__name', 'user__id', 'user__username')
+        header = ['id', 'created_date', 'status', 'payment_method', 'quantity', 'total_price',
+                  'service_id', 'service_name', 'username']
+        return stream_csv(bookings, header, lambda b: [
+            b.id, timezone.localtime(b.created_date).isoformat(), b.status, b.payment_method, b.quantity,
+            b.total_price, b.service_id, b.service.name, b.user.username,
+        ], filename=f'bookings-{timezone.localdate():%Y%m%d}.csv', request=request)
+
+    # App gửi kèm header Idempotency-Key: request gửi lại do mạng lỗi không giữ chỗ 2 lần
+    @idempotent
     def create(self, request, *args, **kwargs):
         # Lấy thông tin từ request
         user = request.user
         data = request.data
 
         try:
-            # Dùng transaction.atomic để đảm bảo an toàn dữ liệu
-            with transaction.atomic():
-                # 1. Kiểm tra xem Tour có tồn tại và còn chỗ không
-                service_id = data.get('service')
-                quantity = int(data.get('quantity', 1))
-                payment_method = data.get('payment_method', 'CASH')
-
-                service = TravelService.objects.select_for_update().get(pk=service_id)
-
-                if service.slots_available < quantity:
-                    return Response(
-                        {"error": "Xin lỗi, tour này không còn đủ chỗ trống!"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                # 2. Tính tổng tiền (Server tự tính, không tin tưởng client gửi lên)
-                total_price = service.price * quantity
-
-                # 3. Tạo Booking
-                booking = Booking.objects.create(
-                    user=user,
-                    service=service,
-                    quantity=quantity,
-                    total_price=total_price,
-                    payment_method=payment_method,
-                    status='PENDING'  # Mặc định là chờ xử lý
-                )
-
-                # 4. Trừ số chỗ trống của Tour
-                service.slots_available -= quantity
-                service.save()
-
-                return Response(BookingSerializer(booking).data, status=status.HTTP_201_CREATED)
-
-        except TravelService.DoesNotExist:
+            quantity = int(data.get('quantity', 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity < 1:
+            return Response({"error": "Số lượng không hợp lệ"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Dịch vụ bán theo đêm (khách sạn): ngày nhận / trả phòng dạng YYYY-MM-DD
+        try:
+            check_in, check_out = (date.fromisoformat(data[name]) if data.get(name) else None
+                                   for name in ('check_in', 'check_out'))
+        except (TypeError, ValueError):
+            return Response({"error": "Ngày nhận/trả phòng phải có dạng YYYY-MM-DD"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Giữ chỗ bằng 1 câu UPDATE có điều kiện, không khóa dòng dịch vụ (xem travel/inventory.py)
+            booking = create_booking(
+                user=user,
+                service_id=data.get('service'),
+                quantity=quantity,
+                payment_method=data.get('payment_method', 'CASH'),
+                check_in=check_in,
+                check_out=check_out,
+            )
+            return Response(metrics.timed(BookingSerializer(booking)).data, status=status.HTTP_201_CREATED)
+
+        except InvalidStay as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except SoldOut:
+            return Response(
+                {"error": "Xin lỗi, tour này không còn đủ chỗ trống!"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        except (TravelService.DoesNotExist, ValueError):
             return Response({"error": "Tour không tồn tại"}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
     @action(methods=['post'], detail=True)
+    @idempotent
     def cancel(self, request, pk=None):
         booking = self.get_object()
-        if booking.status == 'CANCELLED':
-            return Response({"error": "Đơn đã hủy rồi"}, status=400)
 
         # Logic nghiệp vụ
         with transaction.atomic():
-            booking.status = 'CANCELLED'
-            booking.save()
-
-            # QUAN TRỌNG: Cộng lại chỗ trống cho dịch vụ
-            service = booking.service
-            service.slots_available = F('slots_available') + booking.quantity
-            service.save()
-            service.refresh_from_db()  # Reload để lấy số liệu mới nhất
+            # Chuyển trạng thái bằng UPDATE có điều kiện (compare-and-swap trên status):
+            # 2 request hủy đồng thời thì chỉ 1 request đổi được trạng thái và hoàn chỗ
+            while True:
+                old_status = booking.status
+                if old_status == Booking.Status.CANCELLED:
+                    return Response({"error": "Đơn đã hủy rồi"}, status=400)
+                cancelled = Booking.objects.filter(pk=booking.pk, status=old_status) \
+                    .update(status=Booking.Status.CANCELLED, updated_date=timezone.now())
+                if cancelled:
+                    break
+                booking.refresh_from_db(fields=['status'])
+
+            # QUAN TRỌNG: Cộng lại chỗ trống cho dịch vụ (hoặc cho từng đêm của đơn đặt phòng)
+            release_booking(booking)
+            # Đơn đã xác nhận bị hủy -> trừ khỏi bảng tổng hợp doanh thu
+            record_transition(booking, old_status, Booking.Status.CANCELLED)
 
         return Response({"message": "Hủy thành công, đã hoàn slot"}, status=200)
 
-# === 6. NÂNG CẤP STATS VIEWSET (Thống kê Tháng, Quý, Năm) ===
+# === 6. STATS VIEWSET (Thống kê doanh thu Tháng, Quý, Năm - Dành cho Admin & Provider) ===
+# Đọc từ bảng tổng hợp RevenueRollup (cập nhật khi đơn vào/ra CONFIRMED, xem travel/rollups.py)
+# thay vì GROUP BY toàn bộ bảng Booking mỗi lần mở dashboard
 class StatsViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
-    def _get_base_queryset(self, request):
-        """Hàm phụ trợ để lấy queryset booking theo quyền"""
+    def _revenue(self, request, granularity, key='period'):
         user = request.user
-        bookings = Booking.objects.filter(status='CONFIRMED')  # Chỉ tính đơn đã chốt
+        rollups = RevenueRollup.objects.filter(granularity=granularity, count__gt=0)
         if user.role == 'PROVIDER':
-            bookings = bookings.filter(service__provider=user)
+            rollups = rollups.filter(provider=user)
         elif user.role != 'ADMIN':
-            return None
-        return bookings
+            return Response({"error": "Không có quyền truy cập"}, status=status.HTTP_403_FORBIDDEN)
+
+        # Admin xem tổng của mọi nhà cung cấp theo từng kỳ
+        data = rollups.values('period') \
+            .annotate(total_revenue=Sum('total_revenue'), count=Sum('count')) \
+            .order_by('period')
+        # Giữ định dạng cũ (TruncMonth... trên created_date): kỳ là thời điểm 00:00 ngày đầu kỳ theo TIME_ZONE
+        return Response([
+            {key: timezone.make_aware(datetime.combine(row['period'], time.min)),
+             'total_revenue': row['total_revenue'], 'count': row['count']}
+            for row in data
+        ])
 
     # Thống kê theo THÁNG
     @action(methods=['get'], detail=False)
     def revenue_by_month(self, request):
-        bookings = self._get_base_queryset(request)
-        if bookings is None: return Response(status=403)
-
-        data = bookings.annotate(period=TruncMonth('created_date')) \
-            .values('period') \
-            .annotate(total_revenue=Sum('total_price'), count=Count('id')) \
-            .order_by('period')
-        return Response(data)
+        """Thống kê doanh thu theo tháng"""
+        return self._revenue(request, RevenueRollup.Granularity.MONTH, key='month')
 
     # Thống kê theo QUÝ (Yêu cầu nâng cao)
     @action(methods=['get'], detail=False)
     def revenue_by_quarter(self, request):
-        bookings = self._get_base_queryset(request)
-        if bookings is None: return Response(status=403)
-
-        data = bookings.annotate(period=TruncQuarter('created_date')) \
-            .values('period') \
-            .annotate(total_revenue=Sum('total_price'), count=Count('id')) \
-            .order_by('period')
-        return Response(data)
+        """Thống kê doanh thu theo quý"""
+        return self._revenue(request, RevenueRollup.Granularity.QUARTER)
 
     # Thống kê theo NĂM (Yêu cầu nâng cao)
     @action(methods=['get'], detail=False)
     def revenue_by_year(self, request):
-        bookings = self._get_base_queryset(request)
-        if bookings is None: return Response(status=403)
-
-        data = bookings.annotate(period=TruncYear('created_date')) \
-            .values('period') \
-            .annotate(total_revenue=Sum('total_price'), count=Count('id')) \
-            .order_by('period')
-        return Response(data)
+        """Thống kê doanh thu theo năm"""
+        return self._revenue(request, RevenueRollup.Granularity.YEAR)
 
-# 6. API Thống kê (Dành cho Admin & Provider)
-class StatsViewSet(viewsets.ViewSet):
-    permission_classes = [permissions.IsAuthenticated]
 
-    @action(methods=['get'], detail=False)
-    def revenue_by_month(self, request):
-        """Thống kê doanh thu theo tháng"""
-        user = request.user
-
-        # Lọc dữ liệu booking
-        bookings = Booking.objects.filter(status='CONFIRMED')  # Chỉ tính đơn đã xác nhận
-
-        if user.role == 'PROVIDER':
-            bookings = bookings.filter(service__provider=user)
-        elif user.role != 'ADMIN':
-            return Response({"error": "Không có quyền truy cập"}, status=status.HTTP_403_FORBIDDEN)
+# === 7. METRICS (Chỉ Admin): thời gian xử lý, số truy vấn theo từng route (xem travel/metrics.py) ===
+class MetricsViewSet(viewsets.ViewSet):
+    permission_classes = [IsAdmin]
 
-        # Query thống kê
-        data = bookings.annotate(month=TruncMonth('created_date')) \
-            .values('month') \
-            .annotate(total_revenue=Sum('total_price'), count=Count('id')) \
-            .order_by('month')
+    def list(self, request):
+        return Response({
+            'enabled': getattr(settings, 'METRICS_ENABLED', False),
+            'buckets_ms': metrics.BUCKETS_MS,
+            'routes': metrics.snapshot(),
+        })
 
-        return Response(data)
+    @action(methods=['post'], detail=False)
+    def reset(self, request):
+        metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -63,6 +63,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Đo số truy vấn / thời gian SQL, serializer theo request -> header Server-Timing (xem travel/metrics.py)
+    'travel.metrics.MetricsMiddleware',
+    # Nén phản hồi lớn bằng brotli / gzip theo Accept-Encoding (xem travel/compression.py)
+    'travel.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -109,17 +113,58 @@ AUTH_USER_MODEL = 'travel.User'
 AUTH_PASSWORD_VALIDATORS = []
 
 CORS_ORIGIN_ALLOW_ALL = True
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'if-none-match')
+
+# Thời gian lưu Idempotency-Key cho đặt / hủy đơn (giây), xem travel/idempotency.py
+IDEMPOTENCY_KEY_TTL = 24 * 3600
+
+# Đơn PENDING chưa thanh toán sau thời gian này (giây) sẽ bị hủy và hoàn chỗ
+# bởi lệnh `python manage.py expire_pending_bookings` (chạy định kỳ bằng cron hoặc --every)
+BOOKING_HOLD_TTL = 15 * 60
+
+# Thời gian tối đa (giây) cache kết quả xác thực access token, không vượt quá lúc token hết hạn
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+
+# Số dòng tối đa mỗi lần nhập dịch vụ hàng loạt (POST /services/import/, xem travel/imports.py)
+SERVICE_IMPORT_MAX_ROWS = 10000
+
+# Các mốc chia khoảng giá (VNĐ) cho API /services/facets/, app có thể gửi ?price_buckets= để đổi
+SERVICE_PRICE_BUCKETS = [1000000, 3000000, 5000000, 10000000]
+
+# Số dịch vụ tương tự lưu cho mỗi dịch vụ (`manage.py rebuild_recommendations`, xem travel/recommendations.py)
+RECOMMENDATION_TOP_K = 20
+
+# Đo hiệu năng theo request (travel/metrics.py). Tắt (False) thì middleware tự gỡ, không tốn thêm gì.
+# Mặc định chỉ bật khi DEBUG, trên production bật bằng tay khi cần đo
+METRICS_ENABLED = DEBUG
+METRICS_SERVER_TIMING = DEBUG  # Gửi header Server-Timing (có thời gian SQL) về cho client
+METRICS_SLOW_REQUEST_MS = 500  # Ghi log request xử lý lâu hơn mốc này
+METRICS_SLOW_QUERY_MS = 100    # Ghi log câu SQL chạy lâu hơn mốc này
 
 import os  # Kiểm tra trên cùng file có dòng này chưa, nếu chưa thì thêm vào
 
 # --- CẤU HÌNH MEDIA (Nơi lưu file ảnh) ---
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Số luồng tạo ảnh thu nhỏ WebP/JPEG sau khi tải ảnh lên (xem travel/images.py)
+IMAGE_WORKERS = 2
 
 # --- CẤU HÌNH CKEDITOR (Sửa lỗi ImproperlyConfigured) ---
 # Thư mục con bên trong media để chứa ảnh của bài viết
 CKEDITOR_UPLOAD_PATH = "uploads/"
 
+# --- CẤU HÌNH CACHE (cache phản hồi danh mục / dịch vụ, xem travel/cache.py) ---
+# LocMem chỉ dùng cho 1 tiến trình; chạy nhiều worker thì đổi sang Redis, ví dụ:
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'travel',
+    }
+}
+RESPONSE_CACHE_TIMEOUT = 300  # Giây
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -159,7 +204,8 @@ STATIC_URL = 'static/'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         # DÒNG QUAN TRỌNG NHẤT (Thêm dòng này vào đầu tiên):
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
+        # Bản có cache của oauth2_provider.contrib.rest_framework.OAuth2Authentication (xem travel/authentication.py)
+        'travel.authentication.CachedOAuth2Authentication',
 
         # Các dòng mặc định khác (giữ nguyên hoặc thêm vào):
         'rest_framework.authentication.SessionAuthentication',
@@ -170,4 +216,14 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # JSON bằng orjson, MessagePack khi client gửi Accept: application/msgpack (xem travel/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'travel.renderers.ORJSONRenderer',
+        'travel.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
+
+# Chỉ nén phản hồi từ 1 KB trở lên, mức nén brotli (0-11)
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_BROTLI_QUALITY = 4
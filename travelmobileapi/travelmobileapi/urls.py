@@ -26,6 +26,9 @@ urlpatterns = [
     # 2. Cổng chính vào API của app Travel
     path('', include('travel.urls')),
 
+    # 2b. Bản async (chạy bằng uvicorn / ASGI) của các API đọc: danh mục, dịch vụ, bình luận, current-user
+    path('async/', include('travel.async_urls')),
+
     # 3. Cổng OAuth2 (Dùng để đăng nhập Facebook/Google sau này)
     path('o/', include('oauth2_provider.urls', namespace='oauth2_provider')),
 